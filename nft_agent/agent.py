@@ -1,13 +1,38 @@
 import os
-from final_curation_prompt import FINAL_CURATION_PROMPT
-from analysis_prompt import ANALYSIS_PROMPT
-from final_curation_json import FINAL_JSON_SAMPLE
-from search import perform_all_searches
+from dotenv import load_dotenv
+load_dotenv()
+
+from search import perform_all_searches, close_searcher
+from llm import close_llm
+from gateways import close_resolver
+from job_queue import get_job_queue, close_job_queue, PRIORITY_INTERACTIVE, PRIORITY_BATCH
+from analyzer import analyze_nft_data
+from curator import generate_curation, CurationParseError, CARD_SAMPLES
+from pipeline import awaken, AwakeningError
+from collection_context import get_collection_contexts
+from metrics import start_metrics_server, stop_metrics_server, write_metrics_file, current_trace, METRICS_FILE
+from loop_monitor import start_loop_monitor, stop_loop_monitor, write_loop_report, LOOP_REPORT_FILE
+from onchain_card import art_fields_from_dump
+from artwork import artwork_id_from_analysis, artwork_id_from_dump, is_artwork_id
+from job_store import (
+    JobStore,
+    InvalidTransition,
+    JobRunning,
+    ANALYZING,
+    ANALYZED,
+    SEARCHING,
+    SEARCHED,
+    CURATING,
+    CURATED,
+    FAILED,
+)
+import re
 import json
+import time
+import asyncio
 
 from datetime import datetime
 from uuid import uuid4
-from openai import OpenAI
 from uagents import Context, Protocol, Agent
 from uagents_core.contrib.protocols.chat import (
     ChatAcknowledgement,
@@ -17,9 +42,6 @@ from uagents_core.contrib.protocols.chat import (
     TextContent,
     chat_protocol_spec,
 )
-from dotenv import load_dotenv
-load_dotenv()
-asi1_api_key = os.getenv("ASI1_API_KEY")
 
 
 ##
@@ -29,6 +51,7 @@ asi1_api_key = os.getenv("ASI1_API_KEY")
 #Message 1: User sends NFT data → Analysis → Store results
 #Message 2: User sends "search" → Load results → Search → Done
 #Message 3: (Later) User sends "curate" → Generate curation
+#Or: User sends "awaken <NFT data>" → all three steps, pipelined, in one go
 
 def create_text_chat(text: str, end_session: bool = False) -> ChatMessage:
     content = [TextContent(type="text", text=text)]
@@ -36,59 +59,120 @@ def create_text_chat(text: str, end_session: bool = False) -> ChatMessage:
         content.append(EndSessionContent(type="end-session"))
     return ChatMessage(timestamp=datetime.utcnow(), msg_id=uuid4(), content=content)
 
+# "awaken 0x<address> <data>" credits the address in card_1_onchain
+ADDRESS_PATTERN = re.compile(r"^0x[0-9a-fA-F]{40}$")
+
 # the subject that this assistant is an expert in
 subject_matter = "Art and NFTs"
 
-client = OpenAI(
-    # By default, we are using the ASI-1 LLM endpoint and model
-    base_url='https://api.asi1.ai/v1',
+agent = Agent()
 
-    # You can get an ASI-1 api key by creating an account at https://asi1.ai/dashboard/api-keys
-    api_key= asi1_api_key,
-)
 
-agent = Agent()
+@agent.on_interval(period=3600.0)
+async def evict_expired_jobs(ctx: Context):
+    # drop per-sender job state that has been idle past its TTL
+    evicted = JobStore(ctx.storage).evict_expired()
+    if evicted:
+        ctx.logger.info(f"Evicted {evicted} expired job(s)")
 
-# We create a new protocol which is compatible with the chat protocol spec. This ensures
-# compatibility between agents
-protocol = Protocol(spec=chat_protocol_spec)
 
-async def handle_search_step(ctx: Context, sender: str):
-    """
-    Step 2: Execute search based on stored analysis
-    This runs in a separate message, so it gets a fresh timeout window
-    """
-    # Load analysis from storage
-    analysis_json = ctx.storage.get("analysis")
-    
-    if not analysis_json:
-        await ctx.send(
-            sender,
-            create_text_chat(
-                "❌ No analysis found. Please send NFT data first before using 'search'.",
-                end_session=True
-            )
-        )
-        return
-    
-    analysis = json.loads(analysis_json)
-    
-    ctx.logger.info("🔍 Starting Step 2: Search...")
+@agent.on_event("startup")
+async def startup(ctx: Context):
+    # steps that were running when the agent last stopped will never finish
+    recovered = JobStore(ctx.storage).recover_interrupted()
+    if recovered:
+        ctx.logger.info(f"♻️ Marked {recovered} interrupted job(s) as failed")
+    # Prometheus scrape endpoint (only when METRICS_PORT is set)
+    server = await start_metrics_server()
+    if server is not None:
+        host, port = server.sockets[0].getsockname()[:2]
+        ctx.logger.info(f"📈 Metrics on http://{host}:{port}/metrics")
+    # event-loop stall detector (only when LOOP_MONITOR is set)
+    monitor = start_loop_monitor()
+    if monitor is not None:
+        ctx.logger.info(f"🐢 Loop monitor on: callbacks over {monitor.threshold * 1000:.0f} ms go to {LOOP_REPORT_FILE}")
+
+
+@agent.on_interval(period=60.0)
+async def export_metrics(ctx: Context):
+    # textfile snapshot for node_exporter-style collection (only when METRICS_FILE is set)
+    if METRICS_FILE:
+        write_metrics_file()
+    write_loop_report()
+
+
+@agent.on_event("shutdown")
+async def shutdown(ctx: Context):
+    # stop the job workers, then release the pooled search and LLM connections
+    await close_job_queue()
+    await stop_metrics_server()
+    write_metrics_file()
+    stop_loop_monitor()
+    await close_searcher()
+    await close_llm()
+    await close_resolver()
+
+
+# Long steps go through the job queue so the message handler returns at once:
+# acknowledgements and greetings for other senders go out immediately. A fixed
+# worker pool runs queued steps by priority, each under a job deadline that
+# bounds all of its retried calls, and the step sends its results to the sender.
+async def enqueue_step(ctx: Context, sender: str, kind: str, factory, artwork_id: str = None,
+                       priority: int = PRIORITY_INTERACTIVE):
+    job = get_job_queue().submit(kind, factory, sender, artwork_id, priority, logger=ctx.logger)
+    ctx.logger.info(f"📥 Queued {kind} job {job['job_id']} (priority {priority}, position {job['position']})")
     await ctx.send(
         sender,
         create_text_chat(
-            "🔍 **Step 2: Searching for context...**\n\n"
-            "Fetching Twitter, websites, and Google results...",
+            f"📥 **Queued {kind}** as job `{job['job_id']}` (position {job['position']}).\n\n"
+            f"Send **'status {job['job_id']}'** to check on it.",
             end_session=False
         )
     )
-    
-    # Run searches - NOW with Twitter included (fresh timeout!)
-    search_results = await perform_all_searches(ctx, analysis)
-    
-    # Store results for Step 3 (later)
-    ctx.storage.set("search_results", json.dumps(search_results))
-    
+    return job
+
+
+def format_job_status(job: dict) -> str:
+    line = f"`{job['job_id']}` {job['kind']}"
+    if job.get("artwork_id"):
+        line += f" `{job['artwork_id']}`"
+    line += f": **{job['state']}**"
+    if job.get("position"):
+        line += f" (position {job['position']})"
+    elif job.get("started_at"):
+        elapsed = (job.get("finished_at") or time.time()) - job["started_at"]
+        line += f" ({elapsed:.0f}s)"
+    if job.get("stages"):
+        line += "\n  " + ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in job["stages"].items())
+    if job.get("tokens") and any(job["tokens"].values()):
+        line += f"\n  tokens: {job['tokens']['prompt']} prompt / {job['tokens']['completion']} completion"
+    if job.get("error"):
+        line += f" - {job['error'][:200]}"
+    return line
+
+
+async def handle_status(ctx: Context, sender: str, job_id: str = None):
+    """Report one queued job, or this sender's recent jobs"""
+    queue = get_job_queue()
+    if job_id:
+        job = queue.status(job_id)
+        if job is None or job["sender"] != sender:
+            text = f"❓ No job `{job_id}` found."
+        else:
+            text = "📋 " + format_job_status(job)
+    else:
+        jobs = queue.list(sender)[:10]
+        text = "📋 **Your jobs:**\n\n" + "\n".join(f"- {format_job_status(job)}" for job in jobs) if jobs else "📋 No jobs yet."
+    await ctx.send(sender, create_text_chat(text, end_session=True))
+
+
+# We create a new protocol which is compatible with the chat protocol spec. This ensures
+# compatibility between agents
+protocol = Protocol(spec=chat_protocol_spec)
+
+
+async def send_search_results(ctx: Context, sender: str, search_results: dict):
+    """Send the Twitter, website and Google results as separate messages"""
     # Send Twitter results
     twitter_data = search_results.get("twitter_data", {})
     if twitter_data:
@@ -107,320 +191,272 @@ async def handle_search_step(ctx: Context, sender: str):
     if google_searches:
         google_response = f"🔍 **Google:** {len(google_searches)} queries\n\n```json\n{json.dumps(google_searches, indent=2)[:3000]}\n```"
         await ctx.send(sender, create_text_chat(google_response, end_session=False))
-    
-    # Done
+
+
+async def send_card(ctx: Context, sender: str, name: str, card):
+    """Send one curation card (cards go out as soon as they are complete)"""
+    card_text = json.dumps(card, indent=2)
+    if len(card_text) > 3500:
+        card_text = card_text[:3500] + "\n... (truncated, full in storage)"
     await ctx.send(
         sender,
-        create_text_chat(
-            "✨ **Step 2 Complete!**\n\n"
-            "(Step 3 'curate' coming later)",
-            end_session=True
-        )
+        create_text_chat(f"🃏 **{name}**\n\n```json\n{card_text}\n```", end_session=False)
     )
 
 
-### this is for the first analysis 
-async def analyze_nft_data(ctx: Context, data_dump: str) -> dict:
+async def handle_analysis_step(ctx: Context, sender: str, data_dump: str):
     """
-    Send everything to LLM - extract image URL and send for actual visual analysis.
+    Step 1: Analyze the NFT data dump and store the result in this sender's job
     """
+    jobs = JobStore(ctx.storage)
     try:
-        # Extract image URL from the JSON dump
-        image_url = None
-        
-        try:
-            # Parse the data dump as JSON
-            data = json.loads(data_dump)
-            
-            # Check multiple possible locations for image URL
-            # OpenSea NFT data structure
-            if isinstance(data, dict):
-                # Direct image fields
-                for key in ['image', 'image_url', 'imageUrl', 'image_original_url', 'display_image_url']:
-                    if key in data and data[key]:
-                        image_url = data[key]
-                        break
-                
-                # Check in metadata
-                if not image_url and 'metadata' in data:
-                    metadata = data['metadata']
-                    for key in ['image', 'image_url', 'imageUrl']:
-                        if key in metadata and metadata[key]:
-                            image_url = metadata[key]
-                            break
-                
-                # Check in token (indexer format)
-                if not image_url and 'token' in data:
-                    token = data['token']
-                    for key in ['image', 'image_url', 'imageUrl', 'display_image_url']:
-                        if key in token and token[key]:
-                            image_url = token[key]
-                            break
-                
-                # Animation URL as fallback
-                if not image_url:
-                    for key in ['animation_url', 'animationUrl']:
-                        if key in data and data[key]:
-                            image_url = data[key]
-                            break
-        
-        except json.JSONDecodeError:
-            # If it's not JSON, try regex to find URLs
-            import re
-            url_pattern = r'https?://[^\s<>"]+?\.(?:jpg|jpeg|png|gif|webp|svg)'
-            urls = re.findall(url_pattern, data_dump, re.IGNORECASE)
-            if urls:
-                image_url = urls[0]
-        
-        # Convert IPFS URLs to HTTP gateway URLs
-        if image_url and image_url.startswith('ipfs://'):
-            ipfs_hash = image_url.replace('ipfs://', '')
-            image_url = f'https://ipfs.io/ipfs/{ipfs_hash}'
-            ctx.logger.info(f"Converted IPFS URL to: {image_url}")
-        
-        # Format the prompt
-        prompt = ANALYSIS_PROMPT.format(data_dump=data_dump)
-        
-        ctx.logger.info("Sending data to LLM for analysis...")
-        
-        # Build messages with vision support if we have an image
-        if image_url:
-            ctx.logger.info(f"✓ Including image for visual analysis: {image_url}")
-            messages = [
-                {
-                    "role": "system",
-                    "content": "You are an expert NFT analyst with vision capabilities. You can see and analyze the artwork image. Return ONLY valid JSON."
-                },
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": prompt
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": image_url,
-                                "detail": "high"
-                            }
-                        }
-                    ]
-                }
-            ]
-        else:
-            ctx.logger.warning("⚠️ No image URL found - text-only analysis")
-            messages = [
-                {
-                    "role": "system",
-                    "content": "You are an expert NFT analyst. No image was provided. Return ONLY valid JSON."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
-        
-        # Call LLM with vision support
-        response = client.chat.completions.create(
-            model="asi1-extended",
-            messages=messages,
-            max_tokens=20000,
-            temperature=0.8
+        job = jobs.create(sender, artwork_id_from_dump(data_dump), data_dump)
+    except JobRunning as e:
+        await ctx.send(sender, create_text_chat(f"⏳ {e}, please wait.", end_session=True))
+        return
+    try:
+        ctx.logger.info(f"🎨 Starting Step 1: Initial Analysis for {job['artwork_id']}...")
+        await ctx.send(
+            sender,
+            create_text_chat("🎨 **Step 1: Analyzing NFT data...**\n\nExtracting key information, analyzing artwork, and preparing search queries.", end_session=False)
         )
-        
-        result = response.choices[0].message.content
-        
-        # Parse JSON
-        try:
-            analysis = json.loads(result)
-        except json.JSONDecodeError:
-            # Try to extract JSON from response
-            start = result.find('{')
-            end = result.rfind('}') + 1
-            if start != -1 and end > start:
-                analysis = json.loads(result[start:end])
-            else:
-                raise ValueError("LLM did not return valid JSON")
-        
-        ctx.logger.info("Analysis complete")
-        return analysis
-        
+        # Later tokens of an already researched collection reuse its artist analysis
+        contexts = get_collection_contexts()
+        art = art_fields_from_dump(data_dump)
+        async with contexts.claim(data_dump, art) as context:
+            analysis = await analyze_nft_data(ctx, data_dump, context=context)
+            if "error" not in analysis:
+                collection_id = context["id"] if context else contexts.remember_analysis(data_dump, analysis, art)
+    
+        if "error" in analysis:
+            jobs.transition(job, FAILED, error=analysis["error"])
+            await ctx.send(
+                sender,
+                create_text_chat(f"❌ Error during analysis: {analysis['error']}", end_session=True)
+            )
+            return
+    
+        # Store analysis for Step 2, re-keying content-hash ids to the real artwork id
+        job = jobs.transition(job, ANALYZED, analysis=analysis, collection_id=collection_id)
+        if job["artwork_id"].startswith("dump_"):
+            job = jobs.rename(job, artwork_id_from_analysis(analysis) or job["artwork_id"])
+        artwork_id = job["artwork_id"]
+    
+        # Send analysis results
+        analysis_response = (
+            f"✅ **Step 1 Complete: Initial Analysis** (`{artwork_id}`)\n\n"
+            f"```json\n{json.dumps(analysis, indent=2)[:3000]}\n```\n\n"
+            "📊 **Next:** Send the message **'search'** to fetch Twitter, websites, and Google results "
+            f"(or **'search {artwork_id}'** once you have several artworks in flight)."
+        )
+        await ctx.send(
+            sender,
+            create_text_chat(analysis_response, end_session=True)
+        )
+    except asyncio.CancelledError:
+        jobs.interrupt(job, "Cancelled")
+        raise
     except Exception as e:
-        ctx.logger.exception('Error during analysis')
-        return {
-            "error": str(e),
-            "extracted_info": {},
-            "image_analysis": {
-                "image_url": None,
-                "needs_metadata_fetch": False,
-                "visual_description": "Analysis failed"
-            },
-            "categorized_links": {},
-            "search_queries": {"twitter": [], "web": []},
-            "key_themes": [],
-            "focus_areas": [],
-            "data_quality_notes": f"Error: {str(e)}"
-        }
+        ctx.logger.exception('Error during analysis step')
+        if job["state"] != ANALYZED:
+            jobs.transition(job, FAILED, error=str(e))
+        await ctx.send(
+            sender,
+            create_text_chat(f"❌ An error occurred while processing the request: {str(e)}", end_session=True)
+        )
 
-# This handles final curation
-async def handle_curate_step(ctx: Context, sender: str, awakened_by: str = "Unknown"):
+
+async def handle_search_step(ctx: Context, sender: str, artwork_id: str = None):
     """
-    Step 3: Generate final curation using stored analysis and search results
-    NOW: Only uses analysis (required) and search_results (optional)
-    Removed: data_dump to save tokens
+    Step 2: Execute search based on the analysis stored in the sender's job
     """
-    # Load stored data - only analysis is required now
-    analysis_json = ctx.storage.get("analysis")
-    search_results_json = ctx.storage.get("search_results")
+    # Load analysis from this sender's job (latest artwork unless one is named)
+    jobs = JobStore(ctx.storage)
+    job = jobs.get(sender, artwork_id)
     
-    if not analysis_json:
+    if not job or not job.get("analysis"):
         await ctx.send(
             sender,
             create_text_chat(
-                "❌ No analysis found. Please run Step 1 (send NFT data) first.",
+                "❌ No analysis found. Please send NFT data first before using 'search'.",
                 end_session=True
             )
         )
         return
     
-    analysis = json.loads(analysis_json)
-    search_results = json.loads(search_results_json) if search_results_json else {}
+    try:
+        job = jobs.transition(job, SEARCHING)
+    except InvalidTransition:
+        await ctx.send(
+            sender,
+            create_text_chat(f"⏳ `{job['artwork_id']}` is still {job['state']}, please wait.", end_session=True)
+        )
+        return
+    
+    analysis = job["analysis"]
+    
+    # Run searches - NOW with Twitter included (fresh timeout!)
+    try:
+        ctx.logger.info("🔍 Starting Step 2: Search...")
+        await ctx.send(
+            sender,
+            create_text_chat(
+                "🔍 **Step 2: Searching for context...**\n\n"
+                "Fetching Twitter, websites, and Google results...",
+                end_session=False
+            )
+        )
+        contexts = get_collection_contexts()
+        context = contexts.get(job.get("collection_id"))
+        if context and context.get("search_results"):
+            search_results = context["search_results"]
+            ctx.logger.info(f"♻️ Search results shared from collection {context['id']}")
+        else:
+            search_results = await perform_all_searches(ctx, analysis)
+            contexts.remember_search(job.get("collection_id"), search_results)
+    except asyncio.CancelledError:
+        jobs.interrupt(job, "Cancelled")
+        raise
+    except Exception as e:
+        ctx.logger.exception('Error during search')
+        jobs.transition(job, FAILED, error=str(e))
+        await ctx.send(sender, create_text_chat(f"❌ Error during search: {str(e)}", end_session=True))
+        return
+    
+    # Store results for Step 3 (later)
+    job = jobs.transition(job, SEARCHED, search_results=search_results)
+    
+    await send_search_results(ctx, sender, search_results)
     
-    ctx.logger.info("🎭 Starting Step 3: Final Curation...")
+    # Done
     await ctx.send(
         sender,
         create_text_chat(
-            "🎭 **Step 3: Generating Final Curation...**\n\n"
-            "Creating comprehensive curator analysis...",
-            end_session=False
+            "✨ **Step 2 Complete!**\n\n"
+            "(Step 3 'curate' coming later)",
+            end_session=True
         )
     )
+
+
+# This handles final curation
+async def handle_curate_step(ctx: Context, sender: str, awakened_by: str = "Unknown", artwork_id: str = None):
+    """
+    Step 3: Generate final curation using the analysis and search results stored in the sender's job
+    NOW: Only uses analysis (required) and search_results (optional)
+    Removed: data_dump to save tokens
+    """
+    # Load stored data - only analysis is required now
+    jobs = JobStore(ctx.storage)
+    job = jobs.get(sender, artwork_id)
     
-    try:
-        # Format search results concisely
-        search_results_text = json.dumps(search_results, indent=2) if search_results else "No search results"
-        
-        # Much simpler prompt now - no data_dump
-        final_prompt = FINAL_CURATION_PROMPT.format(
-            analysis=json.dumps(analysis, indent=2),
-            search_results=search_results_text,
-            awakened_by=awakened_by,
-            FINAL_JSON_SAMPLE=FINAL_JSON_SAMPLE
+    if not job or not job.get("analysis"):
+        await ctx.send(
+            sender,
+            create_text_chat(
+                "❌ No analysis found. Please run Step 1 (send NFT data) first.",
+                end_session=True
+            )
         )
-        
-        # Log token estimate
-        estimated_input_tokens = len(final_prompt) / 4  # rough estimate
-        ctx.logger.info(f"Estimated input tokens: ~{int(estimated_input_tokens)}")
-        
-        ctx.logger.info("Sending to LLM for final curation...")
-        
-        # Call LLM with very high token limit
-        response = client.chat.completions.create(
-            model="asi1-extended",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a high art curator. Return ONLY raw JSON - no markdown blocks, no explanations. Start with { and end with }."
-                },
-                {
-                    "role": "user",
-                    "content": final_prompt
-                }
-            ],
-            max_tokens=64000,  # Increased significantly
-            temperature=0.8
+        return
+    
+    try:
+        job = jobs.transition(job, CURATING)
+    except InvalidTransition:
+        await ctx.send(
+            sender,
+            create_text_chat(f"⏳ `{job['artwork_id']}` is still {job['state']}, please wait.", end_session=True)
         )
-        
-        raw_result = response.choices[0].message.content
-        
-        # Store raw response
-        ctx.storage.set("raw_curation_response", raw_result)
-        
-        # Log response info
-        ctx.logger.info(f"Raw response: {len(raw_result)} chars")
-        ctx.logger.info(f"Starts: {raw_result[:100]}")
-        ctx.logger.info(f"Ends: {raw_result[-100:]}")
-        
+        return
+    
+    analysis = job["analysis"]
+    search_results = job.get("search_results") or {}
+    raw_result = None
+    
+    async def send_debug(raw: str, estimated_input_tokens: int):
+        nonlocal raw_result
+        raw_result = raw
+        # Real counts from the API usage field, when it reports them
+        trace = current_trace()
+        usage = ""
+        if trace is not None and any(trace.tokens.values()):
+            usage = f" (API usage: {trace.tokens['prompt']} prompt / {trace.tokens['completion']} completion)"
         # Send debug info
         await ctx.send(
             sender,
             create_text_chat(
                 f"📊 **Debug:**\n"
-                f"- Input tokens: ~{int(estimated_input_tokens)}\n"
-                f"- Response: {len(raw_result)} chars\n"
-                f"- Start: {raw_result[:150]}\n"
-                f"- End: {raw_result[-150:]}",
+                f"- Input tokens: ~{estimated_input_tokens}{usage}\n"
+                f"- Response: {len(raw)} chars\n"
+                f"- Start: {raw[:150]}\n"
+                f"- End: {raw[-150:]}",
+                end_session=False
+            )
+        )
+    
+    async def on_card(name: str, card):
+        # Each card goes out as soon as the model closes it
+        await send_card(ctx, sender, name, card)
+    
+    try:
+        ctx.logger.info("🎭 Starting Step 3: Final Curation...")
+        await ctx.send(
+            sender,
+            create_text_chat(
+                "🎭 **Step 3: Generating Final Curation...**\n\n"
+                "Creating comprehensive curator analysis...",
                 end_session=False
             )
         )
         
-        # Parse with multiple strategies
-        curation_json = None
-        
-        # Strategy 1: Direct parse
-        try:
-            curation_json = json.loads(raw_result)
-            ctx.logger.info("✓ Direct parse succeeded")
-        except json.JSONDecodeError as e:
-            ctx.logger.warning(f"Direct parse failed: {e}")
-            
-            # Strategy 2: Remove markdown
-            try:
-                cleaned = raw_result
-                if "```json" in cleaned:
-                    cleaned = cleaned.split("```json")[1].split("```")[0]
-                elif "```" in cleaned:
-                    cleaned = cleaned.split("```")[1].split("```")[0]
-                curation_json = json.loads(cleaned.strip())
-                ctx.logger.info("✓ Markdown removal succeeded")
-            except (json.JSONDecodeError, IndexError) as e:
-                ctx.logger.warning(f"Markdown removal failed: {e}")
-                
-                # Strategy 3: Extract JSON boundaries
-                try:
-                    start = raw_result.find('{')
-                    end = raw_result.rfind('}') + 1
-                    if start != -1 and end > start:
-                        json_str = raw_result[start:end]
-                        curation_json = json.loads(json_str)
-                        ctx.logger.info("✓ Boundary extraction succeeded")
-                except (json.JSONDecodeError, ValueError) as e:
-                    ctx.logger.error(f"All strategies failed: {e}")
-                    
-                    # Send raw response for inspection
-                    await ctx.send(
-                        sender,
-                        create_text_chat(
-                            f"❌ **Parsing failed!**\n\n"
-                            f"Error: {str(e)}\n\n"
-                            f"First 800 chars:\n```\n{raw_result[:800]}\n```\n\n"
-                            f"Last 800 chars:\n```\n{raw_result[-800:]}\n```",
-                            end_session=True
-                        )
-                    )
-                    return
+        contexts = get_collection_contexts()
+        context = contexts.get(job.get("collection_id"))
+        curation_json, cached = await generate_curation(
+            ctx, job["artwork_id"], analysis, search_results, awakened_by,
+            on_response=send_debug, on_card=on_card,
+            art=art_fields_from_dump(job.get("data_dump")),
+            shared_cards=context.get("cards") if context else None
+        )
+        contexts.remember_cards(job.get("collection_id"), curation_json)
         
         # Success!
-        ctx.storage.set("curation", json.dumps(curation_json))
+        job = jobs.transition(job, CURATED, curation=curation_json, error=None)
         ctx.logger.info("✅ Curation complete!")
         
-        # Send truncated preview
-        preview = json.dumps(curation_json, indent=2)
-        if len(preview) > 3500:
-            preview = preview[:3500] + "\n... (truncated, full in storage)"
-        
+        missing = [key for key in CARD_SAMPLES if key not in curation_json]
+        note = f"\n\n⚠️ Incomplete response, missing: {', '.join(missing)}" if missing else ""
         await ctx.send(
             sender,
             create_text_chat(
-                f"✨ **Step 3 Complete!**\n\n```json\n{preview}\n```",
+                f"✨ **Step 3 Complete!**{' (cached)' if cached else ''}\n\n"
+                f"{len(curation_json)} section(s) curated for `{job['artwork_id']}`.{note}",
+                end_session=True
+            )
+        )
+    
+    except asyncio.CancelledError:
+        jobs.interrupt(job, "Cancelled")
+        raise
+    
+    except CurationParseError as e:
+        # Send raw response for inspection
+        jobs.transition(job, FAILED, error=f"Parsing failed: {e}", raw_curation_response=e.raw_result)
+        await ctx.send(
+            sender,
+            create_text_chat(
+                f"❌ **Parsing failed!**\n\n"
+                f"Error: {str(e)}\n\n"
+                f"First 800 chars:\n```\n{e.raw_result[:800]}\n```\n\n"
+                f"Last 800 chars:\n```\n{e.raw_result[-800:]}\n```",
                 end_session=True
             )
         )
         
     except Exception as e:
         ctx.logger.exception('Error during curation')
-        raw = ctx.storage.get("raw_curation_response")
+        raw = raw_result
+        if job["state"] == CURATING:
+            jobs.transition(job, FAILED, error=str(e), raw_curation_response=raw)
         debug = f"\n\n**Raw (first 500):**\n```\n{raw[:500] if raw else 'N/A'}\n```" if raw else ""
         
         await ctx.send(
@@ -432,6 +468,105 @@ async def handle_curate_step(ctx: Context, sender: str, awakened_by: str = "Unkn
         )
 
 
+# This runs all three steps as one request
+async def handle_awaken_step(ctx: Context, sender: str, data_dump: str, awakened_by: str = "Unknown"):
+    """
+    Steps 1-3 back to back: analysis, search and curation without waiting for the user
+    Searches start as soon as the analysis names the links and queries, and the
+    on-chain cards are built while they run (see pipeline.awaken)
+    """
+    jobs = JobStore(ctx.storage)
+    try:
+        job = jobs.create(sender, artwork_id_from_dump(data_dump), data_dump)
+    except JobRunning as e:
+        await ctx.send(sender, create_text_chat(f"⏳ {e}, please wait.", end_session=True))
+        return
+    started = time.monotonic()
+    raw_result = None
+    
+    ctx.logger.info(f"🌅 Starting awakening for {job['artwork_id']}...")
+    
+    async def on_stage(stage: str, payload):
+        nonlocal job
+        if stage == "search_started":
+            await ctx.send(sender, create_text_chat(f"🔍 **Step 2 started early** ({payload} ready)", end_session=False))
+        elif stage == "analyzed":
+            job = jobs.transition(job, ANALYZED, analysis=payload)
+            if job["artwork_id"].startswith("dump_"):
+                job = jobs.rename(job, artwork_id_from_analysis(payload) or job["artwork_id"])
+            job = jobs.transition(job, SEARCHING)
+            await ctx.send(
+                sender,
+                create_text_chat(
+                    f"✅ **Step 1 Complete: Initial Analysis** (`{job['artwork_id']}`)\n\n"
+                    f"```json\n{json.dumps(payload, indent=2)[:3000]}\n```",
+                    end_session=False
+                )
+            )
+        elif stage == "searched":
+            job = jobs.transition(job, SEARCHED, search_results=payload)
+            await send_search_results(ctx, sender, payload)
+            job = jobs.transition(job, CURATING)
+            await ctx.send(sender, create_text_chat("🎭 **Step 3: Generating Final Curation...**", end_session=False))
+    
+    async def on_response(raw: str, estimated_input_tokens: int):
+        nonlocal raw_result
+        raw_result = raw
+    
+    async def on_card(name: str, card):
+        await send_card(ctx, sender, name, card)
+    
+    try:
+        await ctx.send(
+            sender,
+            create_text_chat(
+                "🌅 **Awakening: analysis → search → curation**\n\n"
+                "🎨 **Step 1: Analyzing NFT data...**",
+                end_session=False
+            )
+        )
+        result = await awaken(
+            ctx, data_dump, awakened_by, art=art_fields_from_dump(data_dump), artwork_id=job["artwork_id"],
+            on_stage=on_stage, on_card=on_card, on_response=on_response
+        )
+        curation_json = result["curation"]
+        job = jobs.transition(job, CURATED, curation=curation_json, error=None)
+        ctx.logger.info(f"✅ Awakening complete in {time.monotonic() - started:.1f}s")
+        
+        missing = [key for key in CARD_SAMPLES if key not in curation_json]
+        note = f"\n\n⚠️ Incomplete response, missing: {', '.join(missing)}" if missing else ""
+        await ctx.send(
+            sender,
+            create_text_chat(
+                f"✨ **Awakening Complete!**{' (cached curation)' if result['cached'] else ''}\n\n"
+                f"{len(curation_json)} section(s) curated for `{job['artwork_id']}` "
+                f"in {time.monotonic() - started:.0f}s.{note}",
+                end_session=True
+            )
+        )
+    
+    except asyncio.CancelledError:
+        jobs.interrupt(job, "Cancelled")
+        raise
+    
+    except Exception as e:
+        if isinstance(e, CurationParseError):
+            error, raw = f"Parsing failed: {e}", e.raw_result
+        else:
+            ctx.logger.exception('Error during awakening')
+            error, raw = str(e), raw_result
+        stage = e.stage if isinstance(e, AwakeningError) else {
+            ANALYZING: "analysis", SEARCHING: "search", CURATING: "curation"
+        }.get(job["state"], "awakening")
+        if job["state"] in (ANALYZING, SEARCHING, CURATING):
+            jobs.transition(job, FAILED, error=error, raw_curation_response=raw)
+        debug = f"\n\n**Raw (first 500):**\n```\n{raw[:500]}\n```" if raw else ""
+        await ctx.send(
+            sender,
+            create_text_chat(f"❌ Error during {stage}: {error}{debug}", end_session=True)
+        )
+
+
 # We define the handler for the chat messages that are sent to your agent
 @protocol.on_message(ChatMessage)
 async def handle_message(ctx: Context, sender: str, msg: ChatMessage):
@@ -454,53 +589,64 @@ async def handle_message(ctx: Context, sender: str, msg: ChatMessage):
 
     try:
         # Route based on command
-        command = text.lower().strip()
-        
-        if command == "search":
+        parts = text.split()
+        if not parts:
+            # Whitespace only: nothing to route, answer as for a new session
+            await ctx.send(
+                sender,
+                create_text_chat(f"Hi! Im a {subject_matter} expert, how can I help?", end_session=False),
+            )
+            return
+        command = parts[0].lower()
+        args = parts[1:]
+        # "backfill <command>" queues the same work behind interactive requests
+        priority = PRIORITY_INTERACTIVE
+        if command == "backfill" and args:
+            priority = PRIORITY_BATCH
+            text = text.split(None, 1)[1]
+            command = args[0].lower()
+            args = args[1:]
+        # Optional artwork id (chainId_contract_tokenId) picks one of several jobs
+        artwork_id = next((arg for arg in args if is_artwork_id(arg)), None)
+        
+        if command == "status" and len(args) <= 1:
+            # Format: "status" or "status <job_id>"
+            await handle_status(ctx, sender, args[0] if args else None)
+            return
+
+        elif command == "awaken" and args:
+            # ========== STEPS 1-3: PIPELINED ==========
+            # Format: "awaken [0xabcd...] <NFT data>"
+            data_dump = text.split(None, 1)[1]
+            awakened_by = "Unknown"
+            first, *rest = data_dump.split(None, 1)
+            if ADDRESS_PATTERN.match(first) and rest:
+                awakened_by, data_dump = first, rest[0]
+            await enqueue_step(ctx, sender, "awaken", lambda: handle_awaken_step(ctx, sender, data_dump, awakened_by),
+                               artwork_id_from_dump(data_dump), priority)
+            return
+
+        elif command == "search" and len(args) <= 1:
             # ========== STEP 2: SEARCH ==========
-            await handle_search_step(ctx, sender)
+            # Format: "search" or "search <artwork_id>"
+            await enqueue_step(ctx, sender, "search", lambda: handle_search_step(ctx, sender, artwork_id),
+                               artwork_id, priority)
             return
 
-        elif command.startswith("curate"):
+        elif command == "curate" and len(args) <= 2:
             # ========== STEP 3: CURATE ==========
             # Optional: Extract awakened_by address from command
-            # Format: "curate 0xabcd..." or just "curate"
-            parts = text.split()
-            awakened_by = parts[1] if len(parts) > 1 else "Unknown"
-            await handle_curate_step(ctx, sender, awakened_by)
+            # Format: "curate [artwork_id] [0xabcd...]" or just "curate"
+            others = [arg for arg in args if arg != artwork_id]
+            awakened_by = others[0] if others else "Unknown"
+            await enqueue_step(ctx, sender, "curate", lambda: handle_curate_step(ctx, sender, awakened_by, artwork_id),
+                               artwork_id, priority)
             return    
         
         # Otherwise, treat as NFT data for analysis
         # ========== STEP 1: INITIAL ANALYSIS ==========
-        ctx.logger.info("🎨 Starting Step 1: Initial Analysis...")
-        await ctx.send(
-            sender,
-            create_text_chat("🎨 **Step 1: Analyzing NFT data...**\n\nExtracting key information, analyzing artwork, and preparing search queries.", end_session=False)
-        )
-        # IMPORTANT: Store the original data_dump for Step 3
-        ctx.storage.set("data_dump", text)        
-        analysis = await analyze_nft_data(ctx, text)
-        
-        if "error" in analysis:
-            await ctx.send(
-                sender,
-                create_text_chat(f"❌ Error during analysis: {analysis['error']}", end_session=True)
-            )
-            return
-        
-       # Store analysis for Step 2
-        ctx.storage.set("analysis", json.dumps(analysis))
-        
-        # Send analysis results
-        analysis_response = (
-            "✅ **Step 1 Complete: Initial Analysis**\n\n"
-            f"```json\n{json.dumps(analysis, indent=2)[:3000]}\n```\n\n"
-            "📊 **Next:** Send the message **'search'** to fetch Twitter, websites, and Google results."
-        )
-        await ctx.send(
-            sender,
-            create_text_chat(analysis_response, end_session=True)
-        )
+        await enqueue_step(ctx, sender, "analysis", lambda: handle_analysis_step(ctx, sender, text),
+                           artwork_id_from_dump(text), priority)
         return
         
 
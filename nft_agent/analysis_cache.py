@@ -0,0 +1,102 @@
+import os
+import re
+import json
+from typing import Any, Dict, Optional
+from disk_cache import DiskCache, stable_hash
+from analysis_prompt import ANALYSIS_PROMPT, TOKEN_ANALYSIS_PROMPT
+
+# The analysis is one 20k-token vision call, so keep results for a week by default
+ANALYSIS_CACHE_TTL = int(os.getenv("ANALYSIS_CACHE_TTL", str(7 * 24 * 3600)))
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "5000"))
+ANALYSIS_CACHE_MAX_BYTES = int(os.getenv("ANALYSIS_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Changing the prompt must invalidate old analyses
+PROMPT_VERSION = stable_hash([ANALYSIS_PROMPT, TOKEN_ANALYSIS_PROMPT])[:12]
+
+# Fields that change between two dumps of the same token without changing the artwork:
+# market data and fetch/update times. Compared lowercase with separators removed, and
+# matched exactly so stable fields that merely look alike (mintTimestamp, mintPrice) count.
+VOLATILE_KEYS = {
+    "lastsale", "lastsaleprice", "lastsaleat", "lastsaletimestamp", "price", "prices", "priceusd",
+    "currentprice", "floorprice", "floorpriceusd", "bestoffer", "bestlisting", "listings", "listedat",
+    "offers", "orders", "sellorders", "stats", "volume",
+    "timestamp", "lastupdated", "lastupdatedat", "lastrefreshed", "lastrefreshedat", "updatedat",
+    "refreshedat", "fetchedat", "lastfetchedat", "indexedat", "lastindexedat", "cachedat", "lastrequestedat",
+}
+
+_SEPARATORS = re.compile(r"[^a-z0-9]")
+
+
+def is_volatile_key(key: str) -> bool:
+    name = _SEPARATORS.sub("", str(key).lower())
+    return name in VOLATILE_KEYS
+
+
+def _strip_volatile(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: _strip_volatile(item) for key, item in value.items() if not is_volatile_key(key)}
+    if isinstance(value, list):
+        return [_strip_volatile(item) for item in value]
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def normalize_dump(data_dump: str) -> Any:
+    """
+    Canonical form of a data dump for cache keys
+
+    JSON dumps lose their volatile fields (prices, sales, listings, update
+    timestamps) at any depth, and key order stops mattering once hashed with
+    stable_hash. Anything that is not JSON is compared with its whitespace
+    collapsed.
+    """
+    try:
+        data = json.loads(data_dump)
+    except (json.JSONDecodeError, TypeError):
+        return " ".join(str(data_dump).split())
+    return _strip_volatile(data)
+
+
+class AnalysisCache:
+    """
+    Store of finished step-1 analyses
+
+    Keyed by the normalized dump plus the content hash of the image the
+    model looked at, so the frontend and the indexer re-sending the same
+    token (with a fresh price or timestamp) skip the vision call, while a
+    changed description or a re-pointed image produces a new analysis.
+    """
+
+    def __init__(self, ttl: int = ANALYSIS_CACHE_TTL, max_entries: int = ANALYSIS_CACHE_MAX_ENTRIES,
+                 max_bytes: int = ANALYSIS_CACHE_MAX_BYTES):
+        self.cache = DiskCache("analyses", ttl=ttl, max_entries=max_entries, max_bytes=max_bytes)
+
+    @staticmethod
+    def key(data_dump: str, image_hash: Optional[str], variant: str = "") -> str:
+        """
+        Args:
+            data_dump: NFT data as sent by the user
+            image_hash: sha256 of the original image bytes, the image URL
+                if it could not be fetched, or None for a text-only analysis
+            variant: Distinguishes analyses of the same inputs made differently
+                (e.g. token-only analyses merged with a collection context)
+        """
+        return f"{PROMPT_VERSION}:{variant}:{stable_hash(normalize_dump(data_dump))}:{image_hash or 'no-image'}"
+
+    def get(self, data_dump: str, image_hash: Optional[str], variant: str = "") -> Optional[Dict]:
+        return self.cache.get(self.key(data_dump, image_hash, variant))
+
+    def set(self, data_dump: str, image_hash: Optional[str], analysis: Dict, variant: str = ""):
+        self.cache.set(self.key(data_dump, image_hash, variant), analysis)
+
+
+_analysis_cache: Optional[AnalysisCache] = None
+
+
+def get_analysis_cache() -> AnalysisCache:
+    """Return the agent-wide analysis cache"""
+    global _analysis_cache
+    if _analysis_cache is None:
+        _analysis_cache = AnalysisCache()
+    return _analysis_cache
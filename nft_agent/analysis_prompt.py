@@ -116,3 +116,55 @@ IMPORTANT:
 - Note that tokenuri is the metadata url
 - Note that arweave and ipfs are storage sites, not marketplaces
 """
+
+# Used once the artist and collection were researched for an earlier token
+# (see collection_context): the model only works on this token.
+TOKEN_ANALYSIS_PROMPT = """
+You are an expert NFT art analyst. The artist and collection behind this token were already researched; that context is given below and will be reused as is. Work ONLY on what is specific to this token.
+
+## COLLECTION CONTEXT (already known - do not repeat it):
+{collection_context}
+
+## DATA DUMP (this token):
+{data_dump}
+
+## YOUR TASKS:
+
+1. **EXTRACT TOKEN INFORMATION** from anywhere in the data:
+   - NFT name and token ID
+   - Current owner address (0x...) or name (if available)
+   - Token URI (metadata url)
+   - Any pricing or transfer history of this token
+
+2. **ANALYZE THE IMAGE** (you have visual access to the image):
+   - **Describe the artwork visually** (200-300 words): style, composition, colors, technique, symbols, hidden details, emotional tone
+   - Relate it to the collection's themes where it genuinely does, and say what sets this piece apart from the rest of the collection
+   - Make sure your analysis is cultural context aware so you don't only use a western lens on eastern art styles
+   - Emphasise metaphorical qualities viewers may miss
+   - Include the image URL; prefer an arweave or ipfs url over https://i2.seadn.io
+
+3. **NOTE DATA QUALITY** for this token: What's available? What's missing?
+
+## OUTPUT FORMAT (return ONLY valid JSON):
+
+{{
+    "extracted_info": {{
+        "name": "NFT name or Unknown",
+        "token_id": "123 or null",
+        "current_owner": "0x... or Unknown",
+        "tokenuri": "https://..."
+    }},
+    "image_analysis": {{
+        "image_url": "Full URL to image (convert IPFS urls from ipfs://... to https://ipfs.io/ipfs/... if needed) or null",
+        "needs_metadata_fetch": true/false,
+        "visual_description": "200-300 word description of the artwork, or 'No image found'"
+    }},
+    "data_quality_notes": "Brief note on completeness"
+}}
+
+IMPORTANT:
+- Return ONLY the JSON object, no other text
+- You have VISUAL ACCESS to the image - describe what you actually see
+- If no image is available, note that in visual_description
+- If data is missing, use null or "Unknown"
+"""
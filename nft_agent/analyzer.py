@@ -0,0 +1,211 @@
+import json
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from uagents import Context
+from analysis_prompt import ANALYSIS_PROMPT, TOKEN_ANALYSIS_PROMPT
+from llm import get_llm
+from image_cache import prepare_image, get_image_cache
+from analysis_cache import get_analysis_cache
+from image_extract import extract_image_url
+from llm_json import IncrementalObjectParser, parse_llm_json
+from metrics import timed, record_parse, parse_outcome
+
+
+### this is for the first analysis 
+async def analyze_nft_data(ctx: Context, data_dump: str,
+                           on_section: Optional[Callable[[str, Any], Awaitable[None]]] = None,
+                           context: Optional[Dict] = None) -> dict:
+    """
+    Send everything to LLM - extract image URL and send for actual visual analysis.
+
+    With on_section the completion is streamed and each top-level section
+    (extracted_info, categorized_links, search_queries, ...) is handed over
+    as soon as it closes, so later stages can start before the analysis ends.
+
+    Results are cached by the normalized dump plus the image's content hash
+    (see analysis_cache); on a hit every section is handed over at once.
+
+    With a collection context (see collection_context) the model is only
+    asked about this token's image and history, with a far smaller output
+    budget; the artist-level sections are taken from the context, handed
+    over first, and merged into the result.
+    """
+    with timed("analysis", collection=context["id"] if context else None) as span:
+        analysis, cached = await _analyze(ctx, data_dump, on_section, context)
+        if "error" in analysis:
+            span["outcome"] = "error"
+        elif cached:
+            span["outcome"] = "cached"
+        return analysis
+
+
+def _with_context(token_analysis: Dict, context: Dict) -> dict:
+    """Full analysis shape from a token-only analysis plus the collection's shared sections"""
+    info = dict(context.get("extracted_info") or {})
+    for key, value in (token_analysis.get("extracted_info") or {}).items():
+        if value not in (None, "", "Unknown", "null"):
+            info[key] = value
+    shared = context.get("analysis") or {}
+    return {
+        "extracted_info": info,
+        "image_analysis": token_analysis.get("image_analysis") or {},
+        **shared,
+        "data_quality_notes": token_analysis.get("data_quality_notes", ""),
+    }
+
+
+async def _cached_analysis(ctx: Context, data_dump: str, image_hash, on_section, variant: str) -> Optional[dict]:
+    analysis = get_analysis_cache().get(data_dump, image_hash, variant)
+    if analysis is None:
+        return None
+    ctx.logger.info("⚡ Analysis from cache - skipping the vision call")
+    if on_section is not None:
+        for key, value in analysis.items():
+            await on_section(key, value)
+    return analysis
+
+
+async def _analyze(ctx: Context, data_dump: str, on_section, context: Optional[Dict]) -> Tuple[dict, bool]:
+    try:
+        # Best image URL anywhere in the dump (permanent storage preferred)
+        image_url = extract_image_url(data_dump)
+        # Token-only analyses depend on the collection they were merged with
+        variant = f"collection:{context['id']}" if context else ""
+
+        # A known image is identified by content without loading it again. An
+        # image never fetched (or that failed to load) is keyed by its URL, so
+        # a repeat request does not wait on a dead gateway to reach its entry.
+        image_hash = get_image_cache().content_hash(image_url) if image_url else None
+        checked = image_hash or image_url
+        analysis = await _cached_analysis(ctx, data_dump, checked, on_section, variant)
+        if analysis is not None:
+            return analysis, True
+        image_part = None
+        if image_url:
+            image_part = await prepare_image(ctx, image_url)
+            # Falls back to the URL itself when the image could not be fetched
+            image_hash = get_image_cache().content_hash(image_url) or image_url
+            if image_hash != checked:
+                analysis = await _cached_analysis(ctx, data_dump, image_hash, on_section, variant)
+                if analysis is not None:
+                    return analysis, True
+        
+        # Format the prompt
+        if context:
+            collection_context = dict(context.get("extracted_info") or {})
+            for key in ("key_themes", "focus_areas"):
+                collection_context[key] = (context.get("analysis") or {}).get(key)
+            prompt = TOKEN_ANALYSIS_PROMPT.format(
+                collection_context=json.dumps(collection_context, indent=2, ensure_ascii=False),
+                data_dump=data_dump
+            )
+            # Links, queries, themes: known from the collection, so later stages can start now
+            if on_section is not None:
+                for key, value in (context.get("analysis") or {}).items():
+                    await on_section(key, value)
+            ctx.logger.info(f"Sending data to LLM for token analysis (collection {context['id']})...")
+        else:
+            prompt = ANALYSIS_PROMPT.format(data_dump=data_dump)
+            ctx.logger.info("Sending data to LLM for analysis...")
+        # The token-only answer is a few sections, the full one also links, queries and themes
+        max_tokens = 6000 if context else 20000
+        
+        # Build messages with vision support if we have an image
+        if image_url:
+            ctx.logger.info(f"✓ Including image for visual analysis: {image_url}")
+            messages = [
+                {
+                    "role": "system",
+                    "content": "You are an expert NFT analyst with vision capabilities. You can see and analyze the artwork image. Return ONLY valid JSON."
+                },
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": prompt
+                        },
+                        {
+                            "type": "image_url",
+                            # Fetched once, downscaled and inlined (falls back to the gateway URL)
+                            "image_url": image_part
+                        }
+                    ]
+                }
+            ]
+        else:
+            ctx.logger.warning("⚠️ No image URL found - text-only analysis")
+            messages = [
+                {
+                    "role": "system",
+                    "content": "You are an expert NFT analyst. No image was provided. Return ONLY valid JSON."
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ]
+        
+        # Call LLM with vision support
+        if on_section is None:
+            response = await get_llm().chat(
+                model="asi1-extended",
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=0.8
+            )
+            result = response.choices[0].message.content
+            streamed = {}
+        else:
+            result, streamed = await _stream_analysis(messages, on_section, max_tokens)
+        
+        # Parse JSON (fences skipped, truncated output repaired)
+        parsed = parse_llm_json(result)
+        record_parse("analysis", "streamed" if parsed.value is None and streamed else parse_outcome(parsed))
+        if parsed.value is None and not streamed:
+            raise ValueError("LLM did not return valid JSON")
+        if parsed.truncated:
+            ctx.logger.warning("⚠️ Analysis response was cut off; using the repaired partial JSON")
+        # Sections the stream parser saw close are complete by construction
+        analysis = dict(parsed.value if isinstance(parsed.value, dict) else {}, **streamed)
+        if context:
+            analysis = _with_context(analysis, context)
+        if isinstance(parsed.value, dict) and not parsed.truncated:
+            # Repaired or stream-only partial analyses are used once, not remembered
+            get_analysis_cache().set(data_dump, image_hash, analysis, variant)
+        
+        ctx.logger.info("Analysis complete")
+        return analysis, False
+        
+    except Exception as e:
+        ctx.logger.exception('Error during analysis')
+        return {
+            "error": str(e),
+            "extracted_info": {},
+            "image_analysis": {
+                "image_url": None,
+                "needs_metadata_fetch": False,
+                "visual_description": "Analysis failed"
+            },
+            "categorized_links": {},
+            "search_queries": {"twitter": [], "web": []},
+            "key_themes": [],
+            "focus_areas": [],
+            "data_quality_notes": f"Error: {str(e)}"
+        }, False
+
+
+async def _stream_analysis(messages, on_section, max_tokens: int = 20000):
+    """Streamed completion; returns (raw text, sections that closed while streaming)"""
+    parser = IncrementalObjectParser()
+    chunks = []
+    stream = get_llm().stream_chat(
+        model="asi1-extended",
+        messages=messages,
+        max_tokens=max_tokens,
+        temperature=0.8
+    )
+    async for text, _ in stream:
+        chunks.append(text)
+        for key, value in parser.feed(text):
+            await on_section(key, value)
+    return "".join(chunks), parser.members
@@ -0,0 +1,98 @@
+import re
+import json
+import hashlib
+from typing import Dict, Optional
+
+# Chain names the analysis step may return, mapped to EVM chain ids
+CHAIN_IDS = {
+    "ethereum": 1,
+    "mainnet": 1,
+    "optimism": 10,
+    "bsc": 56,
+    "polygon": 137,
+    "matic": 137,
+    "base": 8453,
+    "arbitrum": 42161,
+    "zora": 7777777,
+    "sepolia": 11155111,
+}
+
+# Same shape as the indexer's Art.id: chainId_contract_tokenId
+ARTWORK_ID_PATTERN = re.compile(r"^(\d+)_(0x[0-9a-fA-F]{40})_(\d+)$")
+# Fallback id for dumps that carry no on-chain identity
+DUMP_ID_PATTERN = re.compile(r"^dump_[0-9a-f]{16}$")
+
+
+def is_artwork_id(value: str) -> bool:
+    """True if value looks like an artwork id this agent hands out"""
+    return bool(ARTWORK_ID_PATTERN.match(value) or DUMP_ID_PATTERN.match(value))
+
+
+def chain_id_for(chain) -> Optional[int]:
+    """
+    Resolve a chain id from an int, a numeric string or a chain name
+
+    Args:
+        chain: e.g. 1, "1", "Ethereum", "Polygon"
+
+    Returns:
+        The chain id or None if unknown
+    """
+    if chain is None:
+        return None
+    if isinstance(chain, int):
+        return chain
+    text = str(chain).strip().lower()
+    if text.isdigit():
+        return int(text)
+    return CHAIN_IDS.get(text)
+
+
+def make_artwork_id(chain, contract, token_id) -> Optional[str]:
+    """
+    Build chainId_contract_tokenId, or None if any part is missing/invalid
+    """
+    chain_id = chain_id_for(chain)
+    if chain_id is None or not contract or token_id in (None, ""):
+        return None
+    token = str(token_id).strip()
+    if not token.isdigit():
+        return None
+    artwork_id = f"{chain_id}_{str(contract).strip().lower()}_{token}"
+    return artwork_id if ARTWORK_ID_PATTERN.match(artwork_id) else None
+
+
+def artwork_id_from_analysis(analysis: Dict) -> Optional[str]:
+    """Artwork id from analysis["extracted_info"]"""
+    info = analysis.get("extracted_info") or {}
+    return make_artwork_id(info.get("chain"), info.get("contract"), info.get("token_id"))
+
+
+def artwork_id_from_dump(data_dump: str) -> str:
+    """
+    Best-effort artwork id for a raw data dump, before any analysis
+
+    Understands the indexer Art shape (id / chainId, contract, tokenId) and
+    OpenSea's nft shape (chain, contract, identifier). Anything else gets a
+    stable id derived from the dump's content.
+    """
+    try:
+        data = json.loads(data_dump)
+    except (json.JSONDecodeError, TypeError):
+        data = None
+
+    if isinstance(data, dict):
+        candidates = [data] + [data[k] for k in ("nft", "token", "art", "Art_by_pk") if isinstance(data.get(k), dict)]
+        for item in candidates:
+            if isinstance(item.get("id"), str) and ARTWORK_ID_PATTERN.match(item["id"]):
+                return item["id"].lower()
+            artwork_id = make_artwork_id(
+                item.get("chainId", item.get("chain_id", item.get("chain"))),
+                item.get("contract") or item.get("contract_address"),
+                item.get("tokenId", item.get("token_id", item.get("identifier"))),
+            )
+            if artwork_id:
+                return artwork_id
+
+    digest = hashlib.sha256(data_dump.encode("utf-8")).hexdigest()[:16]
+    return f"dump_{digest}"
@@ -0,0 +1,352 @@
+"""
+Batch curation: analysis → search → curation for many artworks in one run
+
+Usage:
+    python batch.py --ids 1_0x7104..._1 1_0x7104..._2
+    python batch.py --ids-file ids.txt
+    python batch.py --jsonl dumps.jsonl
+
+Artwork ids are looked up in the indexer (Art_by_pk); a JSONL file holds one
+NFT data dump per line, exactly as it would be sent to the agent (a line
+holding a batch of NFTs, such as an OpenSea {"nfts": [...]} page, is split
+into one item per NFT). Each stage runs with its own concurrency, and every
+finished stage is appended to a checkpoint file so an interrupted run picks
+up where it stopped.
+
+Tokens of the same collection (contract + minter) share one artist analysis,
+one set of search results and the artist cards (see collection_context): the
+first token pays for them, the rest only for their own image and history.
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+import logging
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+load_dotenv()
+
+import httpx
+from analyzer import analyze_nft_data
+from search import perform_all_searches, close_searcher
+from curator import generate_curation
+from onchain_card import art_fields_from_dump
+from collection_context import get_collection_contexts
+from llm import close_llm
+from gateways import close_resolver
+from artwork import artwork_id_from_analysis, artwork_id_from_dump
+from image_extract import split_batch
+from resilience import job_deadline
+from metrics import job_trace, write_metrics_file
+from loop_monitor import start_loop_monitor, stop_loop_monitor
+
+INDEXER_GRAPHQL_URL = os.getenv("INDEXER_GRAPHQL_URL", "https://indexer.hyperindex.xyz/28644e9/v1/graphql")
+
+ART_BY_PK_QUERY = """
+query ArtByPk($id: String!) {
+  Art_by_pk(id: $id) {
+    id chainId contract tokenId minter blockNumber txHash
+    tokenURI name image_url animation_url external_url
+  }
+}
+"""
+
+# Pipeline stages, in order
+ANALYZED = "analyzed"
+SEARCHED = "searched"
+CURATED = "curated"
+FAILED = "failed"
+
+
+class BatchContext:
+    """Stand-in for the uagents Context: the pipeline stages only use its logger"""
+
+    def __init__(self, logger: logging.Logger):
+        self.logger = logger
+
+
+class Checkpoint:
+    """
+    Append-only JSONL record of finished stages
+
+    Each line carries everything needed to resume the artwork from that stage.
+    On load, the last successful line per input wins; failures are retried.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.progress: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A line cut off by the interruption itself
+                        continue
+                    if record.get("stage") != FAILED:
+                        self.progress[record["source_id"]] = record
+        self._file = open(path, "a", encoding="utf-8")
+
+    def record(self, item: Dict, stage: str, error: Optional[str] = None):
+        line = dict(item, stage=stage)
+        if error:
+            line["error"] = error
+        self._file.write(json.dumps(line) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+async def fetch_art(client: httpx.AsyncClient, artwork_id: str) -> Optional[Dict]:
+    """Load one Art record from the indexer"""
+    response = await client.post(
+        INDEXER_GRAPHQL_URL,
+        json={"query": ART_BY_PK_QUERY, "variables": {"id": artwork_id}},
+    )
+    response.raise_for_status()
+    body = response.json()
+    if body.get("errors"):
+        raise RuntimeError("GraphQL error: " + " | ".join(e.get("message", "") for e in body["errors"]))
+    return (body.get("data") or {}).get("Art_by_pk")
+
+
+async def run_batch(
+    items: List[Dict],
+    checkpoint: Checkpoint,
+    analysis_concurrency: int = 4,
+    search_concurrency: int = 8,
+    curation_concurrency: int = 4,
+    awakened_by: str = "Unknown",
+    curation_mode: Optional[str] = None,
+    logger: Optional[logging.Logger] = None,
+) -> Dict:
+    """
+    Push every item through analysis → search → curation
+
+    Args:
+        items: Dicts with "source_id" and either "data_dump" or an indexer
+            "artwork_id" to fetch
+        checkpoint: Where finished stages are recorded / resumed from
+
+    Returns:
+        Summary with counts, elapsed seconds and artworks per minute
+    """
+    logger = logger or logging.getLogger("batch")
+    ctx = BatchContext(logger)
+    contexts = get_collection_contexts()
+    counts = {ANALYZED: 0, SEARCHED: 0, CURATED: 0, FAILED: 0, "skipped": 0}
+
+    # Bounded queues give backpressure between stages
+    to_analyze: asyncio.Queue = asyncio.Queue(maxsize=analysis_concurrency * 2)
+    to_search: asyncio.Queue = asyncio.Queue(maxsize=search_concurrency * 2)
+    to_curate: asyncio.Queue = asyncio.Queue(maxsize=curation_concurrency * 2)
+
+    indexer = httpx.AsyncClient(timeout=30)
+
+    def fail(item: Dict, stage: str, error: str):
+        counts[FAILED] += 1
+        logger.warning(f"❌ {item['source_id']} failed during {stage}: {error}")
+        checkpoint.record(item, FAILED, error=f"{stage}: {error}")
+
+    async def analysis_worker():
+        while True:
+            item = await to_analyze.get()
+            # Each stage of each artwork gets its own deadline for retried calls, and its own trace
+            with job_deadline(), job_trace(item["source_id"], "analysis", artwork_id=item.get("artwork_id")):
+                try:
+                    if not item.get("data_dump"):
+                        art = await fetch_art(indexer, item["artwork_id"])
+                        if not art:
+                            fail(item, "fetch", "Artwork not found in indexer")
+                            continue
+                        item["data_dump"] = json.dumps(art)
+                    art = art_fields_from_dump(item["data_dump"])
+                    async with contexts.claim(item["data_dump"], art) as context:
+                        analysis = await analyze_nft_data(ctx, item["data_dump"], context=context)
+                        if "error" in analysis:
+                            fail(item, "analysis", analysis["error"])
+                            continue
+                        item["collection_id"] = (
+                            context["id"] if context else contexts.remember_analysis(item["data_dump"], analysis, art)
+                        )
+                    item["analysis"] = analysis
+                    if item["artwork_id"].startswith("dump_"):
+                        item["artwork_id"] = artwork_id_from_analysis(analysis) or item["artwork_id"]
+                    checkpoint.record(item, ANALYZED)
+                    counts[ANALYZED] += 1
+                    await to_search.put(item)
+                except Exception as e:
+                    fail(item, "analysis", str(e))
+                finally:
+                    to_analyze.task_done()
+
+    async def search_worker():
+        while True:
+            item = await to_search.get()
+            with job_deadline(), job_trace(item["source_id"], "search", artwork_id=item.get("artwork_id")):
+                try:
+                    context = contexts.get(item.get("collection_id"))
+                    if context and context.get("search_results"):
+                        item["search_results"] = context["search_results"]
+                    else:
+                        item["search_results"] = await perform_all_searches(ctx, item["analysis"])
+                        contexts.remember_search(item.get("collection_id"), item["search_results"])
+                    checkpoint.record(item, SEARCHED)
+                    counts[SEARCHED] += 1
+                    await to_curate.put(item)
+                except Exception as e:
+                    fail(item, "search", str(e))
+                finally:
+                    to_search.task_done()
+
+    async def curation_worker():
+        while True:
+            item = await to_curate.get()
+            with job_deadline(), job_trace(item["source_id"], "curation", artwork_id=item.get("artwork_id")):
+                try:
+                    context = contexts.get(item.get("collection_id"))
+                    curation, cached = await generate_curation(
+                        ctx, item["artwork_id"], item["analysis"], item["search_results"], awakened_by,
+                        mode=curation_mode, art=art_fields_from_dump(item.get("data_dump")),
+                        shared_cards=context.get("cards") if context else None
+                    )
+                    contexts.remember_cards(item.get("collection_id"), curation)
+                    item["curation"] = curation
+                    checkpoint.record(item, CURATED)
+                    counts[CURATED] += 1
+                    logger.info(f"✅ Curated {item['artwork_id']}{' (cached)' if cached else ''}")
+                except Exception as e:
+                    fail(item, "curation", str(e))
+                finally:
+                    to_curate.task_done()
+
+    async def feed():
+        # Resume each item at the stage after its last checkpointed one
+        for item in items:
+            done = checkpoint.progress.get(item["source_id"])
+            if done and done["stage"] == CURATED:
+                counts["skipped"] += 1
+            elif done and done["stage"] == SEARCHED:
+                await to_curate.put(done)
+            elif done and done["stage"] == ANALYZED:
+                await to_search.put(done)
+            else:
+                await to_analyze.put(item)
+
+    workers = (
+        [asyncio.create_task(analysis_worker()) for _ in range(analysis_concurrency)]
+        + [asyncio.create_task(search_worker()) for _ in range(search_concurrency)]
+        + [asyncio.create_task(curation_worker()) for _ in range(curation_concurrency)]
+    )
+    started = time.monotonic()
+    try:
+        await feed()
+        # Items only move forward, so draining the stages in order drains the pipeline
+        await to_analyze.join()
+        await to_search.join()
+        await to_curate.join()
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        await indexer.aclose()
+
+    elapsed = time.monotonic() - started
+    summary = dict(counts)
+    summary["elapsed_seconds"] = round(elapsed, 1)
+    summary["artworks_per_minute"] = round(counts[CURATED] / (elapsed / 60), 2) if elapsed > 0 else 0.0
+    return summary
+
+
+def split_dump(line: str) -> List[str]:
+    """One dump per NFT: batch dumps (e.g. an OpenSea {"nfts": [...]} page) are split up"""
+    try:
+        data = json.loads(line)
+    except json.JSONDecodeError:
+        return [line]
+    records = split_batch(data)
+    if len(records) == 1 and records[0] is data:
+        return [line]
+    return [json.dumps(record) for record in records]
+
+
+def load_items(args) -> List[Dict]:
+    """Turn the command line inputs into pipeline items"""
+    items = []
+    ids = list(args.ids or [])
+    if args.ids_file:
+        with open(args.ids_file, encoding="utf-8") as f:
+            ids.extend(line.strip() for line in f if line.strip())
+    for artwork_id in ids:
+        items.append({"source_id": artwork_id, "artwork_id": artwork_id.lower()})
+    if args.jsonl:
+        with open(args.jsonl, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                for data_dump in split_dump(line):
+                    artwork_id = artwork_id_from_dump(data_dump)
+                    items.append({"source_id": artwork_id, "artwork_id": artwork_id, "data_dump": data_dump})
+    return items
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Curate many artworks end-to-end")
+    parser.add_argument("--ids", nargs="*", help="Artwork ids (chainId_contract_tokenId)")
+    parser.add_argument("--ids-file", help="File with one artwork id per line")
+    parser.add_argument("--jsonl", help="File with one NFT data dump per line")
+    parser.add_argument("--checkpoint", default="batch_checkpoint.jsonl", help="Progress file used to resume")
+    parser.add_argument("--analysis-concurrency", type=int, default=4)
+    parser.add_argument("--search-concurrency", type=int, default=8)
+    parser.add_argument("--curation-concurrency", type=int, default=4)
+    parser.add_argument("--awakened-by", default="Unknown")
+    parser.add_argument("--curation-mode", choices=["single", "parallel"], help="Overrides CURATION_MODE")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    logger = logging.getLogger("batch")
+
+    items = load_items(args)
+    if not items:
+        parser.error("Nothing to do: pass --ids, --ids-file or --jsonl")
+
+    checkpoint = Checkpoint(args.checkpoint)
+    # Reports callbacks that block the loop (when LOOP_MONITOR is set)
+    start_loop_monitor()
+    try:
+        summary = await run_batch(
+            items,
+            checkpoint,
+            analysis_concurrency=args.analysis_concurrency,
+            search_concurrency=args.search_concurrency,
+            curation_concurrency=args.curation_concurrency,
+            awakened_by=args.awakened_by,
+            curation_mode=args.curation_mode,
+            logger=logger,
+        )
+    finally:
+        checkpoint.close()
+        await close_searcher()
+        await close_llm()
+        await close_resolver()
+        # Stage latencies, token usage and cache hit rates of the run (when METRICS_FILE is set)
+        write_metrics_file()
+        stop_loop_monitor()
+
+    logger.info(
+        f"📦 Batch done: {summary[CURATED]} curated, {summary['skipped']} already done, "
+        f"{summary[FAILED]} failed in {summary['elapsed_seconds']}s "
+        f"→ {summary['artworks_per_minute']} artworks/minute"
+    )
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
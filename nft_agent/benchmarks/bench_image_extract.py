@@ -0,0 +1,147 @@
+"""
+Micro-benchmark: image URL extraction on large OpenSea payloads
+
+Usage:
+    python benchmarks/bench_image_extract.py
+    python benchmarks/bench_image_extract.py --nfts 500 --traits 40 --repeat 200
+
+Compares image_extract against the fixed key scan analyze_nft_data used
+before, on a single OpenSea v2 NFT, the same NFT as non-JSON text, and a
+page of NFTs ({"nfts": [...]}). Times are per dump and exclude json.loads,
+which is reported on its own line.
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_extract import extract_image_url, extract_image_urls  # noqa: E402
+
+
+def legacy_extract(data_dump: str):
+    """The lookup analyze_nft_data did inline before image_extract existed"""
+    image_url = None
+    try:
+        data = json.loads(data_dump)
+        if isinstance(data, dict):
+            for key in ['image', 'image_url', 'imageUrl', 'image_original_url', 'display_image_url']:
+                if key in data and data[key]:
+                    image_url = data[key]
+                    break
+            if not image_url and 'metadata' in data:
+                metadata = data['metadata']
+                for key in ['image', 'image_url', 'imageUrl']:
+                    if key in metadata and metadata[key]:
+                        image_url = metadata[key]
+                        break
+            if not image_url and 'token' in data:
+                token = data['token']
+                for key in ['image', 'image_url', 'imageUrl', 'display_image_url']:
+                    if key in token and token[key]:
+                        image_url = token[key]
+                        break
+            if not image_url:
+                for key in ['animation_url', 'animationUrl']:
+                    if key in data and data[key]:
+                        image_url = data[key]
+                        break
+    except json.JSONDecodeError:
+        url_pattern = r'https?://[^\s<>"]+?\.(?:jpg|jpeg|png|gif|webp|svg)'
+        urls = re.findall(url_pattern, data_dump, re.IGNORECASE)
+        if urls:
+            image_url = urls[0]
+    return image_url
+
+
+def opensea_nft(index: int, traits: int) -> dict:
+    """An OpenSea v2 /nfts/{identifier} response with realistic bulk"""
+    cid = f"bafybeig{index:06d}" + "q" * 44
+    return {
+        "nft": {
+            "identifier": str(index),
+            "collection": "stream-of-consciousness",
+            "contract": "0x7104d7b5c0a9f5e0e2d1c8b2a7f5e0e2d1c8b2a7",
+            "token_standard": "erc721",
+            "name": f"Fragment #{index}",
+            "description": "A meditation on memory and light. " * 20,
+            "image_url": f"https://i2.seadn.io/ethereum/0x7104/{index:064x}.png?w=1000",
+            "display_image_url": f"https://i2.seadn.io/ethereum/0x7104/{index:064x}.png?w=500",
+            "display_animation_url": None,
+            "metadata_url": f"ipfs://{cid}/{index}.json",
+            "opensea_url": f"https://opensea.io/assets/ethereum/0x7104/{index}",
+            "updated_at": "2024-05-01T12:00:00.000000",
+            "is_disabled": False,
+            "is_nsfw": False,
+            "animation_url": None,
+            "is_suspicious": False,
+            "creator": "0x3b2a7f5e0e2d1c8b2a7f5e0e2d1c8b2a7f5e0e2d",
+            "traits": [
+                {"trait_type": f"Layer {t}", "display_type": None, "max_value": None,
+                 "value": f"value-{t}", "trait_count": t * 3}
+                for t in range(traits)
+            ],
+            "owners": [{"address": f"0x{o:040x}", "quantity": 1} for o in range(10)],
+            "rarity": {"strategy_id": "openrarity", "strategy_version": "1.0", "rank": index},
+            "metadata": {
+                "name": f"Fragment #{index}",
+                "image": f"ipfs://{cid}/{index}.png",
+                "attributes": [{"trait_type": f"Layer {t}", "value": f"value-{t}"} for t in range(traits)],
+            },
+        }
+    }
+
+
+def timeit(fn, arg, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(arg)
+        samples.append((time.perf_counter() - started) * 1e6)
+    samples.sort()
+    return {
+        "median_us": round(statistics.median(samples), 1),
+        "p95_us": round(samples[int(len(samples) * 0.95) - 1], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark image URL extraction")
+    parser.add_argument("--nfts", type=int, default=200, help="NFTs in the page dump")
+    parser.add_argument("--traits", type=int, default=30, help="Traits per NFT")
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    single = opensea_nft(1, args.traits)
+    single_dump = json.dumps(single)
+    text_dump = "Artwork metadata: " + single_dump.replace('"', " ").replace("{", " ").replace("}", " ")
+    page = {"nfts": [opensea_nft(i, args.traits)["nft"] for i in range(args.nfts)], "next": "cursor"}
+    page_dump = json.dumps(page)
+
+    print(f"single NFT: {len(single_dump) / 1024:.1f} KB, page: {args.nfts} NFTs / {len(page_dump) / 1024:.0f} KB\n")
+    print(f"  picked (legacy):    {legacy_extract(single_dump)}")
+    print(f"  picked (extractor): {extract_image_url(single)}\n")
+
+    rows = [
+        ("json.loads single", json.loads, single_dump),
+        ("legacy single (incl. json.loads)", legacy_extract, single_dump),
+        ("extractor single", extract_image_url, single),
+        ("legacy text", legacy_extract, text_dump),
+        ("extractor text", extract_image_url, text_dump),
+        ("json.loads page", json.loads, page_dump),
+        ("extractor page (all NFTs)", extract_image_urls, page),
+    ]
+    for label, fn, arg in rows:
+        result = timeit(fn, arg, args.repeat)
+        line = f"{label:<36} median {result['median_us']:>10.1f} µs   p95 {result['p95_us']:>10.1f} µs"
+        if fn is extract_image_urls:
+            line += f"   ({result['median_us'] / args.nfts:.1f} µs per NFT)"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""
+Offline end-to-end benchmark against local stand-ins for Bright Data and ASI-1
+
+Usage:
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --scenario search --requests 200 --concurrency 32
+    python benchmarks/bench_pipeline.py --scenario message --latency-ms 400 --error-rate 0.05
+    python benchmarks/bench_pipeline.py --json run.json --baseline baseline.json --tolerance 0.2
+
+Scenarios:
+    search    perform_all_searches for one analysis per request
+    curation  generate_curation for one analysis + search results per request
+    awaken    pipeline.awaken: analysis → search → curation, overlapped
+    message   handle_message("awaken <dump>") through the job queue, timed
+              until the final end-of-session message reaches the sender
+
+No keys or network are needed: BRIGHTDATA_BASE_URL, ASI1_BASE_URL and the
+IPFS/Arweave gateways point at stub_servers.StubServers, which replays
+benchmarks/fixtures (or --fixtures) with the injected latency and errors.
+Caches live in a fresh temporary CACHE_DIR unless --cache-dir is given.
+
+Reports throughput, p50/p95/p99 latency, the memory high-water mark
+(ru_maxrss, plus the tracemalloc peak with --tracemalloc) and event-loop
+blocking measured by a probe task. With --baseline, exits 1 when throughput
+or p95/p99 latency regressed by more than --tolerance.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import resource
+import tempfile
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from stub_servers import StubServers, StubConfig, FIXTURES_DIR  # noqa: E402
+
+SCENARIOS = ("search", "curation", "awaken", "message")
+
+
+def percentile(samples, q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, int(round(q / 100 * len(samples) + 0.5)) - 1))
+    return samples[index]
+
+
+class LoopProbe:
+    """
+    Measures event-loop blocking: a task that sleeps `interval` and records
+    how late it wakes up. Lateness is time the loop spent on other work
+    without yielding.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.lags = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, time.perf_counter() - started - self.interval))
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    def report(self) -> dict:
+        lags = sorted(self.lags)
+        return {
+            "loop_lag_max_ms": round(lags[-1] * 1000, 1) if lags else 0.0,
+            "loop_lag_p99_ms": round(percentile(lags, 99) * 1000, 1),
+            "loop_blocked_ms": round(sum(lag for lag in lags if lag > 0.005) * 1000, 1),
+        }
+
+
+class BenchStorage:
+    """Dict-backed stand-in for ctx.storage"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value):
+        self.data[key] = value
+
+    def has(self, key):
+        return key in self.data
+
+    def remove(self, key):
+        self.data.pop(key, None)
+
+
+class BenchContext:
+    """Stand-in for the uagents Context: logger, storage, and send() that records replies"""
+
+    def __init__(self, logger: logging.Logger):
+        self.logger = logger
+        self.storage = BenchStorage()
+        self.sent = 0
+        self._finished = {}
+
+    async def send(self, destination, message):
+        self.sent += 1
+        content = getattr(message, "content", None) or []
+        if any(getattr(item, "type", None) == "end-session" for item in content):
+            text = " ".join(getattr(item, "text", "") for item in content if getattr(item, "type", None) == "text")
+            waiter = self._finished.get(destination)
+            if waiter is not None and not waiter.done():
+                waiter.set_result(text)
+
+    def expect_end(self, destination) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._finished[destination] = future
+        return future
+
+
+def load_fixture(fixtures_dir: str, name: str, n: int):
+    with open(os.path.join(fixtures_dir, name), encoding="utf-8") as f:
+        return json.loads(f.read().replace("__N__", str(n)))
+
+
+def setup_environment(args, base_url: str):
+    """Point every upstream at the stand-ins; must run before the agent modules are imported"""
+    os.environ["BRIGHTDATA_BASE_URL"] = base_url
+    os.environ["ASI1_BASE_URL"] = base_url + "/v1"
+    os.environ["IPFS_GATEWAYS"] = base_url + "/ipfs/"
+    os.environ["ARWEAVE_GATEWAYS"] = base_url + "/ar/"
+    os.environ.setdefault("ASI1_API_KEY", "bench")
+    os.environ.setdefault("SERP_API_KEY", "bench")
+    os.environ["CACHE_DIR"] = args.cache_dir or tempfile.mkdtemp(prefix="nft-bench-")
+    os.environ.setdefault("JOB_WORKERS", str(args.concurrency))
+    if args.curation_mode:
+        os.environ["CURATION_MODE"] = args.curation_mode
+
+
+async def run(args) -> dict:
+    from search import perform_all_searches, close_searcher
+    from curator import generate_curation
+    from pipeline import awaken
+    from llm import close_llm
+    from gateways import close_resolver
+
+    logger = logging.getLogger("bench")
+    ctx = BenchContext(logger)
+    agent = None
+    if args.scenario == "message":
+        import agent
+
+    def artwork(n: int) -> str:
+        return f"1_0x7104d7b5c0a9f5e0e2d1c8b2a7f5e0e2d1c8b2a7_{n}"
+
+    async def one(n: int):
+        if args.scenario == "search":
+            await perform_all_searches(ctx, load_fixture(args.fixtures, "analysis.json", n))
+        elif args.scenario == "curation":
+            analysis = load_fixture(args.fixtures, "analysis.json", n)
+            search_results = {
+                "twitter_data": {"success": True, "source": "https://x.com/artist", "data": load_fixture(args.fixtures, "twitter.json", n)},
+                "website_content": [],
+                "google_searches": [{"success": True, "query": "q", "results": load_fixture(args.fixtures, "serp.json", n)[0]["organic_results"]}],
+            }
+            await generate_curation(ctx, artwork(n), analysis, search_results)
+        elif args.scenario == "awaken":
+            dump = json.dumps(load_fixture(args.fixtures, "nft.json", n))
+            await awaken(ctx, dump, artwork_id=artwork(n))
+        else:
+            sender = f"agent-bench-{n}"
+            finished = ctx.expect_end(sender)
+            dump = json.dumps(load_fixture(args.fixtures, "nft.json", n))
+            ack_started = time.perf_counter()
+            await agent.handle_message(ctx, sender, agent.create_text_chat(f"awaken {dump}"))
+            acks.append(time.perf_counter() - ack_started)
+            text = await finished
+            if text.startswith("❌"):
+                raise RuntimeError(text[:200])
+
+    acks = []
+    latencies = []
+    errors = []
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async def timed_one(n: int, record: bool):
+        async with slots:
+            started = time.perf_counter()
+            try:
+                await one(n)
+            except Exception as e:
+                if record:
+                    errors.append(str(e)[:200])
+                return
+            if record:
+                latencies.append(time.perf_counter() - started)
+
+    try:
+        # Warm-up: connection pools, imports and lazily built singletons
+        await asyncio.gather(*(timed_one(n, False) for n in range(1_000_000, 1_000_000 + args.warmup)))
+
+        if args.tracemalloc:
+            tracemalloc.start()
+        probe = LoopProbe()
+        probe.start()
+        started = time.perf_counter()
+        await asyncio.gather(*(timed_one(n, True) for n in range(args.requests)))
+        elapsed = time.perf_counter() - started
+        await probe.stop()
+        traced_peak = tracemalloc.get_traced_memory()[1] if args.tracemalloc else None
+        if args.tracemalloc:
+            tracemalloc.stop()
+    finally:
+        if agent is not None:
+            from job_queue import close_job_queue
+            await close_job_queue()
+        await close_searcher()
+        await close_llm()
+        await close_resolver()
+
+    latencies.sort()
+    result = {
+        "scenario": args.scenario,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "ok": len(latencies),
+        "errors": len(errors),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 3) if elapsed > 0 else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        # Linux reports ru_maxrss in KiB
+        "rss_high_water_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    if traced_peak is not None:
+        result["tracemalloc_peak_mb"] = round(traced_peak / 1024 / 1024, 2)
+    if acks:
+        acks.sort()
+        result["ack_p95_ms"] = round(percentile(acks, 95) * 1000, 2)
+    result.update(probe.report())
+    if errors:
+        result["first_error"] = errors[0]
+    result["stub_requests"] = {route: count for route, (count, _) in args.stubs.stats().items()}
+    result["stub_injected_errors"] = {route: injected for route, (_, injected) in args.stubs.stats().items() if injected}
+    return result
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list:
+    """Regressions beyond tolerance (throughput down, tail latency up)"""
+    problems = []
+    if baseline.get("throughput_rps") and result["throughput_rps"] < baseline["throughput_rps"] * (1 - tolerance):
+        problems.append(f"throughput {result['throughput_rps']} rps < baseline {baseline['throughput_rps']} rps")
+    for key in ("p95_ms", "p99_ms"):
+        if baseline.get(key) and result[key] > baseline[key] * (1 + tolerance):
+            problems.append(f"{key} {result[key]} > baseline {baseline[key]}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline against local Bright Data / ASI-1 stand-ins")
+    parser.add_argument("--scenario", choices=SCENARIOS, default="awaken")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--latency-ms", type=float, default=200, help="Bright Data / gateway response time")
+    parser.add_argument("--jitter-ms", type=float, default=100, help="Uniform extra latency per response")
+    parser.add_argument("--llm-latency-ms", type=float, default=500, help="ASI-1 time to first token")
+    parser.add_argument("--llm-tps", type=float, default=2000, help="ASI-1 tokens per second (0: instant)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of upstream requests answered 503")
+    parser.add_argument("--repeat-inputs", action="store_true", help="Same links and queries every time (warm caches)")
+    parser.add_argument("--curation-mode", choices=["single", "parallel"])
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="Directory of recorded responses")
+    parser.add_argument("--cache-dir", help="Reuse this CACHE_DIR instead of a fresh temporary one")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--tracemalloc", action="store_true", help="Also report the Python allocation peak (slower)")
+    parser.add_argument("--json", help="Write the result to this file")
+    parser.add_argument("--baseline", help="Earlier --json result to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR, format="%(asctime)s %(message)s")
+
+    args.stubs = StubServers(
+        StubConfig(latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000, error_rate=args.error_rate,
+                   llm_latency=args.llm_latency_ms / 1000, llm_tokens_per_second=args.llm_tps,
+                   unique=not args.repeat_inputs, seed=args.seed),
+        fixtures_dir=args.fixtures,
+    )
+    base_url = args.stubs.start()
+    setup_environment(args, base_url)
+    import search
+    args.stubs.twitter_dataset_id = search.TWITTER_DATASET_ID
+
+    try:
+        result = asyncio.run(run(args))
+    finally:
+        args.stubs.stop()
+
+    for key, value in result.items():
+        print(f"{key:<22} {value}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            problems = compare(result, json.load(f), args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION: {problem}")
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
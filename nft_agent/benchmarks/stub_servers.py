@@ -0,0 +1,248 @@
+"""
+Local stand-ins for Bright Data, ASI-1 and an IPFS gateway, replaying fixtures
+
+One HTTP/1.1 server (keep-alive, chunked SSE for streamed completions) runs
+on its own event loop in a background thread, so its work does not show up
+in the benchmarked loop's timings. Routes:
+
+    POST /datasets/v3/scrape?dataset_id=...  Twitter dataset -> twitter.json, any other -> serp.json
+    POST /request                            Web Unlocker -> website.html
+    POST /v1/chat/completions                analysis.json or curation.json (by system prompt),
+                                             streamed as SSE when "stream" is true
+    GET  /ipfs/<path>, /ar/<path>            a small PNG
+
+Fixture files live in one directory (benchmarks/fixtures by default); drop
+recorded responses in with the same names to replay them. "__N__" in a
+fixture is replaced by a per-request counter so every artwork gets its own
+links and queries (and misses the caches), and "__QUERY__" in serp.json by
+the searched keyword.
+"""
+import os
+import json
+import time
+import zlib
+import random
+import struct
+import asyncio
+import threading
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def tiny_png(width: int = 64, height: int = 64) -> bytes:
+    """A valid grey RGB PNG, built without PIL"""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+    rows = b"".join(b"\x00" + b"\x80\x80\x80" * width for _ in range(height))
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b""))
+
+
+class StubConfig:
+    """Latency and error injection for the stand-in servers"""
+
+    def __init__(self, latency: float = 0.2, jitter: float = 0.1, error_rate: float = 0.0,
+                 llm_latency: float = 0.5, llm_tokens_per_second: float = 2000.0,
+                 unique: bool = True, seed: Optional[int] = None):
+        self.latency = latency                              # Bright Data / gateway response time (s)
+        self.jitter = jitter                                # uniform extra latency (s)
+        self.error_rate = error_rate                        # share of requests answered with a 503
+        self.llm_latency = llm_latency                      # ASI-1 time to first token (s)
+        self.llm_tokens_per_second = llm_tokens_per_second  # streamed / non-streamed generation speed
+        self.unique = unique                                # fresh "__N__" per analysis, or always 0
+        self.random = random.Random(seed)
+
+
+class StubServers:
+    """
+    Fixture-replaying HTTP server in a background thread
+
+    Usage:
+        stubs = StubServers(StubConfig(latency=0.3))
+        base_url = stubs.start()
+        ...
+        stubs.stop()
+    """
+
+    def __init__(self, config: Optional[StubConfig] = None, fixtures_dir: str = FIXTURES_DIR,
+                 twitter_dataset_id: str = ""):
+        self.config = config or StubConfig()
+        self.twitter_dataset_id = twitter_dataset_id
+        self.fixtures = {}
+        for name in ("analysis.json", "curation.json", "twitter.json", "serp.json", "website.html"):
+            with open(os.path.join(fixtures_dir, name), encoding="utf-8") as f:
+                self.fixtures[name] = f.read()
+        self.image = tiny_png()
+        self.requests: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self._counter = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self.base_url = ""
+
+    def start(self) -> str:
+        """Start serving on a free localhost port; returns the base URL"""
+        self._thread = threading.Thread(target=self._run, name="stub-servers", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self.base_url
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        server = self._loop.run_until_complete(asyncio.start_server(self._connection, "127.0.0.1", 0))
+        self.base_url = "http://127.0.0.1:%d" % server.sockets[0].getsockname()[1]
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            server.close()
+            # Kept-alive connections are still waiting for their next request
+            pending = asyncio.all_tasks(self._loop)
+            for task in pending:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self._loop.close()
+
+    def _next_n(self) -> str:
+        self._counter += 1
+        return str(self._counter if self.config.unique else 0)
+
+    async def _delay(self, base: float):
+        await asyncio.sleep(base + self.config.random.uniform(0, self.config.jitter))
+
+    def _inject_error(self, route: str) -> bool:
+        if self.config.error_rate and self.config.random.random() < self.config.error_rate:
+            self.errors[route] = self.errors.get(route, 0) + 1
+            return True
+        return False
+
+    async def _connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", "0")))
+                await self._dispatch(method, target, body, writer)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method: str, target: str, body: bytes, writer: asyncio.StreamWriter):
+        parts = urlsplit(target)
+        path = parts.path
+        if path.startswith("/datasets/v3/scrape"):
+            dataset = parse_qs(parts.query).get("dataset_id", [""])[0]
+            route = "twitter" if dataset == self.twitter_dataset_id else "serp"
+        elif path == "/request":
+            route = "unlocker"
+        elif path.endswith("/chat/completions"):
+            route = "llm"
+        elif path.startswith(("/ipfs/", "/ipns/", "/ar/")):
+            route = "gateway"
+        else:
+            await self._respond(writer, 404, b"not found", "text/plain")
+            return
+        self.requests[route] = self.requests.get(route, 0) + 1
+
+        if route == "llm":
+            await self._chat(json.loads(body or b"{}"), writer)
+            return
+        await self._delay(self.config.latency)
+        if self._inject_error(route):
+            await self._respond(writer, 503, b'{"error": "injected"}', "application/json")
+            return
+        if route == "gateway":
+            await self._respond(writer, 200, self.image, "image/png")
+        elif route == "unlocker":
+            page = self.fixtures["website.html"].replace("__N__", self._next_n())
+            await self._respond(writer, 200, page.encode("utf-8"), "text/html; charset=utf-8")
+        elif route == "twitter":
+            data = self.fixtures["twitter.json"].replace("__N__", self._next_n())
+            await self._respond(writer, 200, data.encode("utf-8"), "application/json")
+        else:
+            request = json.loads(body or b"{}")
+            keyword = (request.get("input") or [{}])[0].get("keyword", "")
+            data = self.fixtures["serp.json"].replace("__QUERY__", json.dumps(keyword)[1:-1])
+            await self._respond(writer, 200, data.replace("__N__", self._next_n()).encode("utf-8"), "application/json")
+
+    async def _chat(self, request: Dict, writer: asyncio.StreamWriter):
+        messages = request.get("messages") or []
+        system = next((m.get("content") for m in messages if m.get("role") == "system"), "") or ""
+        if "curator" in system.lower():
+            content = self.fixtures["curation.json"]
+        else:
+            content = self.fixtures["analysis.json"].replace("__N__", self._next_n())
+        prompt_chars = len(json.dumps(messages))
+        usage = {"prompt_tokens": prompt_chars // 4, "completion_tokens": len(content) // 4,
+                 "total_tokens": (prompt_chars + len(content)) // 4}
+        model = request.get("model", "asi1-extended")
+
+        await self._delay(self.config.llm_latency)
+        if self._inject_error("llm"):
+            await self._respond(writer, 503, b'{"error": {"message": "injected"}}', "application/json")
+            return
+
+        seconds_per_char = 1.0 / (4 * self.config.llm_tokens_per_second) if self.config.llm_tokens_per_second else 0.0
+        if not request.get("stream"):
+            await asyncio.sleep(len(content) * seconds_per_char)
+            payload = {
+                "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage,
+            }
+            await self._respond(writer, 200, json.dumps(payload).encode("utf-8"), "application/json")
+            return
+
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nTransfer-Encoding: chunked\r\n\r\n")
+
+        async def event(data: str):
+            frame = f"data: {data}\n\n".encode("utf-8")
+            writer.write(b"%x\r\n%s\r\n" % (len(frame), frame))
+            await writer.drain()
+
+        def chunk(delta: Dict, finish_reason: Optional[str] = None) -> str:
+            return json.dumps({"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                               "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]})
+
+        step = 64
+        for start in range(0, len(content), step):
+            piece = content[start:start + step]
+            await asyncio.sleep(len(piece) * seconds_per_char)
+            await event(chunk({"content": piece}))
+        await event(chunk({}, "stop"))
+        if (request.get("stream_options") or {}).get("include_usage"):
+            await event(json.dumps({"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                                    "model": model, "choices": [], "usage": usage}))
+        await event("[DONE]")
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, body: bytes, content_type: str):
+        reason = {200: "OK", 404: "Not Found", 503: "Service Unavailable"}.get(status, "OK")
+        writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\n"
+                     f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+        await writer.drain()
+
+    def stats(self) -> Dict[str, Tuple[int, int]]:
+        """(requests, injected errors) per route"""
+        return {route: (count, self.errors.get(route, 0)) for route, count in sorted(self.requests.items())}
@@ -0,0 +1,209 @@
+import os
+import json
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Tuple
+from disk_cache import DiskCache
+from job_queue import worker_released
+from artwork import chain_id_for
+from onchain_card import art_fields_from_dump
+from curator import card_problems
+
+# Artist research does not go stale quickly, so keep it for a month by default
+COLLECTION_CONTEXT_TTL = int(os.getenv("COLLECTION_CONTEXT_TTL", str(30 * 24 * 3600)))
+COLLECTION_CONTEXT_MAX_ENTRIES = int(os.getenv("COLLECTION_CONTEXT_MAX_ENTRIES", "2000"))
+# How long tokens of a collection wait for the first token to establish its context (s)
+COLLECTION_CONTEXT_WAIT = float(os.getenv("COLLECTION_CONTEXT_WAIT", "600"))
+
+# Analysis sections about the artist and collection rather than the token
+SHARED_ANALYSIS_SECTIONS = ("categorized_links", "search_queries", "key_themes", "focus_areas")
+SHARED_INFO_FIELDS = ("collection", "contract", "minter", "chain")
+# Cards written from artist-level inputs only (see CARD_GROUPS in curator)
+SHARED_CARDS = ("card_4_about_artist", "card_6_social_discourse")
+
+# Wrappers and field names a dump may carry the minter under
+_WRAPPERS = ("nft", "token", "art", "Art_by_pk")
+_CHAIN_FIELDS = ("chainId", "chain_id", "chain")
+_CONTRACT_FIELDS = ("contract", "contract_address")
+_MINTER_FIELDS = ("minter", "minter_address", "creator", "creator_address")
+
+
+def _address(value) -> str:
+    """Lowercase 0x address, or "" for placeholders ("Unknown", "0x... or null") and names"""
+    text = str(value or "").strip().lower()
+    return text if text.startswith("0x") and len(text) == 42 and all(c in "0123456789abcdef" for c in text[2:]) else ""
+
+
+def identify(data_dump: Optional[str], art: Optional[Dict] = None,
+             analysis: Optional[Dict] = None) -> Tuple[Optional[int], str, str]:
+    """
+    (chain id, contract, minter) of the collection a token belongs to
+
+    Each part comes from the indexer Art fields first, then the dump (top
+    level and the usual wrappers), then the analysis. Unknown parts are None
+    for the chain and "" for addresses.
+    """
+    art = art if art is not None else art_fields_from_dump(data_dump)
+    items = [art]
+    if data_dump:
+        try:
+            data = json.loads(data_dump)
+        except (json.JSONDecodeError, TypeError):
+            data = None
+        if isinstance(data, dict):
+            items += [data] + [data[k] for k in _WRAPPERS if isinstance(data.get(k), dict)]
+    items.append((analysis or {}).get("extracted_info") or {})
+
+    chain_id, contract, minter = None, "", ""
+    for item in items:
+        if chain_id is None:
+            chain_id = next((chain_id_for(item[field]) for field in _CHAIN_FIELDS
+                             if chain_id_for(item.get(field)) is not None), None)
+        contract = contract or next((_address(item[field]) for field in _CONTRACT_FIELDS
+                                     if _address(item.get(field))), "")
+        minter = minter or next((_address(item[field]) for field in _MINTER_FIELDS if _address(item.get(field))), "")
+    return chain_id, contract, minter
+
+
+class CollectionContexts:
+    """
+    Artist and collection research shared by every token of a collection
+
+    Keyed by chainId_contract plus minter, so a shared contract (a platform
+    storefront, an open edition factory) keeps one context per artist. The
+    first token of a collection gets the full analysis; its artist-level
+    sections, its search results and its artist cards are stored as they
+    become available. Later tokens only ask the model about their own image
+    and history, reuse the search results, and skip the artist cards.
+
+    A context is a dict with "id", "extracted_info" (collection-level fields),
+    "analysis" (SHARED_ANALYSIS_SECTIONS), "search_results" (or None) and
+    "cards" (SHARED_CARDS written so far).
+    """
+
+    def __init__(self, ttl: int = COLLECTION_CONTEXT_TTL, max_entries: int = COLLECTION_CONTEXT_MAX_ENTRIES,
+                 wait: float = COLLECTION_CONTEXT_WAIT):
+        self.cache = DiskCache("collections", ttl=ttl, max_entries=max_entries)
+        self.wait = wait
+        self._pending: Dict[str, asyncio.Event] = {}
+
+    def get(self, context_id: Optional[str]) -> Optional[Dict]:
+        return self.cache.get(f"context:{context_id}") if context_id else None
+
+    def lookup(self, data_dump: Optional[str], art: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        Context for the collection a dump belongs to, if one was stored
+
+        A dump that does not name the chain or the minter still matches when
+        exactly one stored context of its contract fits the parts it does
+        name; a contract shared by several artists then needs the minter.
+        """
+        chain_id, contract, minter = identify(data_dump, art)
+        if not contract:
+            return None
+        candidates = [
+            context_id for context_id in self.cache.get(f"contract:{contract}") or []
+            if (chain_id is None or context_id.startswith(f"{chain_id}_"))
+            and (not minter or context_id.endswith(f":{minter}"))
+        ]
+        return self.get(candidates[0]) if len(candidates) == 1 else None
+
+    @asynccontextmanager
+    async def claim(self, data_dump: Optional[str], art: Optional[Dict] = None):
+        """
+        Yield the stored context, or None to the one caller that should build it
+
+        While the first token of a collection is being analyzed, other tokens
+        of the same collection wait for it (up to COLLECTION_CONTEXT_WAIT)
+        instead of running the same artist research concurrently, without
+        holding a job queue slot meanwhile. If it fails, they fall back to
+        full analyses. Tokens whose chain or contract is unknown never wait:
+        nothing tells their collections apart.
+
+        Usage:
+            async with contexts.claim(data_dump, art) as context:
+                analysis = await analyze_nft_data(ctx, data_dump, context=context)
+                if context is None:
+                    contexts.remember_analysis(data_dump, analysis, art)
+        """
+        context = self.lookup(data_dump, art)
+        chain_id, contract, minter = identify(data_dump, art)
+        if context is not None or chain_id is None or not contract:
+            yield context
+            return
+        claim_key = f"{chain_id}_{contract}:{minter}"
+        pending = self._pending.get(claim_key)
+        if pending is not None:
+            try:
+                async with worker_released():
+                    await asyncio.wait_for(pending.wait(), self.wait)
+            except asyncio.TimeoutError:
+                pass
+            yield self.lookup(data_dump, art)
+            return
+        self._pending[claim_key] = event = asyncio.Event()
+        try:
+            yield None
+        finally:
+            del self._pending[claim_key]
+            event.set()
+
+    def remember_analysis(self, data_dump: Optional[str], analysis: Dict, art: Optional[Dict] = None) -> Optional[str]:
+        """
+        Store the artist-level parts of a full analysis
+
+        Returns:
+            The context id, or None if the token's chain or contract is unknown
+        """
+        chain_id, contract, minter = identify(data_dump, art, analysis)
+        if chain_id is None or not contract or "error" in analysis:
+            return None
+        context_id = f"{chain_id}_{contract}:{minter}"
+        if self.get(context_id) is None:
+            info = analysis.get("extracted_info") or {}
+            self.cache.set(f"context:{context_id}", {
+                "id": context_id,
+                "extracted_info": {field: info.get(field) for field in SHARED_INFO_FIELDS if field in info},
+                "analysis": {key: analysis[key] for key in SHARED_ANALYSIS_SECTIONS if key in analysis},
+                "search_results": None,
+                "cards": {},
+            })
+            known = self.cache.get(f"contract:{contract}") or []
+            if context_id not in known:
+                self.cache.set(f"contract:{contract}", known + [context_id])
+        return context_id
+
+    def _update(self, context_id: Optional[str], **fields):
+        context = self.get(context_id)
+        if context is not None:
+            context.update(fields)
+            self.cache.set(f"context:{context_id}", context)
+
+    def remember_search(self, context_id: Optional[str], search_results: Dict):
+        """Store the search results of the collection's first token"""
+        context = self.get(context_id)
+        if context is not None and not context.get("search_results"):
+            self._update(context_id, search_results=search_results)
+
+    def remember_cards(self, context_id: Optional[str], curation: Dict):
+        """Store the artist cards of a curation (well-formed ones only)"""
+        context = self.get(context_id)
+        if context is None:
+            return
+        cards = dict(context.get("cards") or {})
+        fresh = {key: curation[key] for key in SHARED_CARDS if key not in cards and isinstance(curation.get(key), dict)}
+        problems = card_problems(fresh)
+        cards.update({key: card for key, card in fresh.items() if key not in problems})
+        if cards != context.get("cards"):
+            self._update(context_id, cards=cards)
+
+
+_collection_contexts: Optional[CollectionContexts] = None
+
+
+def get_collection_contexts() -> CollectionContexts:
+    """Return the agent-wide collection context store"""
+    global _collection_contexts
+    if _collection_contexts is None:
+        _collection_contexts = CollectionContexts()
+    return _collection_contexts
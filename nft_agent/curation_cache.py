@@ -0,0 +1,65 @@
+import os
+from typing import Dict, Optional
+from disk_cache import DiskCache, stable_hash
+from final_curation_prompt import FINAL_CURATION_PROMPT, CARD_CURATION_PROMPT
+from final_curation_json import FINAL_JSON_SAMPLE
+from onchain_card import utc_timestamp
+
+# Curations are expensive (64k-token budget), so keep them for a week by default
+CURATION_CACHE_TTL = int(os.getenv("CURATION_CACHE_TTL", str(7 * 24 * 3600)))
+CURATION_CACHE_MAX_ENTRIES = int(os.getenv("CURATION_CACHE_MAX_ENTRIES", "2000"))
+
+# Changing the prompt or the card structure must invalidate old curations
+PROMPT_VERSION = stable_hash([FINAL_CURATION_PROMPT, CARD_CURATION_PROMPT, FINAL_JSON_SAMPLE])[:12]
+
+
+class CurationCache:
+    """
+    Content-addressed store of finished curations
+
+    Keyed by artwork id plus a hash of the analysis and search results that
+    went into the prompt, so the same inputs never pay for a second LLM run
+    while any change in the inputs produces a fresh curation.
+    """
+
+    def __init__(self, ttl: int = CURATION_CACHE_TTL, max_entries: int = CURATION_CACHE_MAX_ENTRIES):
+        self.cache = DiskCache("curations", ttl=ttl, max_entries=max_entries)
+
+    @staticmethod
+    def key(artwork_id: str, analysis: Dict, search_results: Dict) -> str:
+        inputs_hash = stable_hash({"analysis": analysis, "search_results": search_results or {}})
+        return f"{artwork_id}:{PROMPT_VERSION}:{inputs_hash}"
+
+    def get(self, artwork_id: str, analysis: Dict, search_results: Dict,
+            awakened_by: str = "Unknown") -> Optional[Dict]:
+        """
+        Look up a curation for these exact inputs
+
+        awakened_by is not part of the key; a hit is re-stamped with the
+        current caller and time (metadata.generated_at) so one curation
+        serves every awakening of the artwork as if made for it.
+        """
+        curation = self.cache.get(self.key(artwork_id, analysis, search_results))
+        if curation is None:
+            return None
+        preview = curation.get("card_1_onchain", {}).get("preview")
+        if isinstance(preview, dict):
+            preview["awakened_by"] = awakened_by
+        metadata = curation.get("metadata")
+        if isinstance(metadata, dict):
+            metadata["generated_at"] = utc_timestamp()
+        return curation
+
+    def set(self, artwork_id: str, analysis: Dict, search_results: Dict, curation: Dict):
+        self.cache.set(self.key(artwork_id, analysis, search_results), curation)
+
+
+_curation_cache: Optional[CurationCache] = None
+
+
+def get_curation_cache() -> CurationCache:
+    """Return the agent-wide curation cache"""
+    global _curation_cache
+    if _curation_cache is None:
+        _curation_cache = CurationCache()
+    return _curation_cache
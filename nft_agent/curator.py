@@ -0,0 +1,450 @@
+import os
+import json
+import time
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from uagents import Context
+from final_curation_prompt import FINAL_CURATION_PROMPT, CARD_CURATION_PROMPT
+from final_curation_json import FINAL_JSON_SAMPLE
+from curation_cache import get_curation_cache
+from llm import get_llm
+from llm_json import IncrementalObjectParser, parse_llm_json, shape_problems, missing_parts, deep_merge
+from onchain_card import build_onchain_sections, DETERMINISTIC_SECTIONS
+from prompt_budget import fit_inputs, count_tokens, to_prompt_json
+from metrics import timed, record_parse, parse_outcome
+
+
+# "single": one streamed completion for every card; "parallel": one completion per card group
+CURATION_MODE = os.getenv("CURATION_MODE", "single")
+
+# Follow up a curation with missing or malformed cards by regenerating just those parts
+CURATION_REPAIR = os.getenv("CURATION_REPAIR", "true").lower() in ("1", "true", "yes")
+
+CURATOR_SYSTEM_PROMPT = "You are a high art curator. Return ONLY raw JSON - no markdown blocks, no explanations. Start with { and end with }."
+
+# The card structure, keyed by top-level section
+CARD_SAMPLES = json.loads(FINAL_JSON_SAMPLE)
+# Sections the LLM writes; the on-chain card, notes and metadata are built in code
+LLM_SECTIONS = tuple(key for key in CARD_SAMPLES if key not in DETERMINISTIC_SECTIONS)
+
+# Parallel mode: (cards, inputs they need, output budget). Inputs name fields of
+# the analysis (extracted_info, image_analysis, ...) or of search_results
+# (twitter_data, website_content, google_searches).
+CARD_GROUPS = [
+    (("card_2_art_visuals",), ("extracted_info", "image_analysis", "key_themes"), 4000),
+    (("card_3_transfer_history",), ("extracted_info", "data_quality_notes"), 3000),
+    (("card_4_about_artist",), ("extracted_info", "categorized_links", "key_themes", "focus_areas",
+                                "twitter_data", "website_content", "google_searches"), 5000),
+    (("card_5_irl_exhibits",), ("extracted_info", "image_analysis", "website_content", "google_searches"), 4000),
+    (("card_6_social_discourse",), ("twitter_data",), 4000),
+    (("card_7_subversion_culture",), ("extracted_info", "image_analysis", "categorized_links", "key_themes",
+                                      "focus_areas", "twitter_data", "website_content", "google_searches"), 6000),
+]
+
+
+class CurationParseError(Exception):
+    """The model answered, but no JSON curation could be recovered from it"""
+
+    def __init__(self, message: str, raw_result: str):
+        super().__init__(message)
+        self.raw_result = raw_result
+
+
+def build_curation_prompt(analysis: Dict, search_results: Dict, awakened_by: str,
+                          sections: Tuple[str, ...] = LLM_SECTIONS) -> str:
+    """
+    Fill FINAL_CURATION_PROMPT with the analysis, search results and the sections to write
+
+    Inputs are compacted (HTML stripped, tweets ranked, bookkeeping fields
+    dropped) and trimmed to CURATION_INPUT_TOKEN_BUDGET first.
+    """
+    fitted = fit_inputs(analysis, search_results)
+
+    # Format search results concisely
+    search_results_text = to_prompt_json(fitted["search_results"]) if fitted["search_results"] else "No search results"
+
+    # Much simpler prompt now - no data_dump
+    return FINAL_CURATION_PROMPT.format(
+        analysis=to_prompt_json(fitted["analysis"]),
+        search_results=search_results_text,
+        awakened_by=awakened_by,
+        FINAL_JSON_SAMPLE=json.dumps({key: CARD_SAMPLES[key] for key in sections}, indent=2)
+    )
+
+
+def parse_curation(ctx: Context, raw_result: str) -> Dict:
+    """
+    Recover the curation JSON from the model output
+
+    Fences and prose are skipped and broken output is repaired (see
+    parse_llm_json). If the response was cut off, the section that was
+    still being written is dropped and every completed section is kept.
+
+    Raises:
+        CurationParseError: if the response holds no JSON object at all
+    """
+    result = parse_llm_json(raw_result)
+    record_parse("curation", parse_outcome(result))
+    if result.value is None:
+        ctx.logger.error("No JSON object found in curation response")
+        raise CurationParseError("No JSON object found in response", raw_result)
+
+    curation_json = result.value
+    if result.truncated:
+        if result.incomplete_key:
+            curation_json.pop(result.incomplete_key, None)
+        ctx.logger.warning(
+            f"⚠️ Response was cut off; kept {len(curation_json)} complete section(s)"
+            + (f", dropped partial {result.incomplete_key}" if result.incomplete_key else "")
+        )
+    elif result.repaired:
+        ctx.logger.info("✓ Parsed after repairing malformed JSON")
+    else:
+        ctx.logger.info("✓ Parse succeeded")
+    if not curation_json:
+        raise CurationParseError("No complete section in response", raw_result)
+    return curation_json
+
+
+def card_problems(cards: Dict) -> Dict[str, List[str]]:
+    """Shape problems per card, checked against the FINAL_JSON_SAMPLE structure"""
+    problems = {}
+    for key, value in cards.items():
+        if key in CARD_SAMPLES:
+            found = shape_problems(value, CARD_SAMPLES[key], key)
+            if found:
+                problems[key] = found
+    return problems
+
+
+async def generate_curation(
+    ctx: Context,
+    artwork_id: str,
+    analysis: Dict,
+    search_results: Dict,
+    awakened_by: str = "Unknown",
+    on_response: Optional[Callable[[str, int], Awaitable[None]]] = None,
+    on_card: Optional[Callable[[str, Any], Awaitable[None]]] = None,
+    mode: Optional[str] = None,
+    art: Optional[Dict] = None,
+    onchain: Optional[Dict] = None,
+    shared_cards: Optional[Dict] = None,
+) -> Tuple[Dict, bool]:
+    """
+    Produce the final curation for one artwork, from cache when possible
+
+    In "single" mode the whole curation is one streamed completion, parsed
+    incrementally so each top-level section (card_1_onchain, ...) is handed
+    to on_card as soon as it closes; if the generation is cut off, the
+    sections that did complete are kept. In "parallel" mode each card group
+    is its own concurrent completion (see CARD_GROUPS). Either way the LLM
+    only writes the interpretive cards: card_1_onchain, card_8_curation_notes
+    and metadata are built from the analysis and indexer fields in code and
+    sent to on_card first. Cards that come back missing or malformed are
+    then regenerated in one small follow-up request (see _repair_cards) and
+    sent to on_card again.
+
+    Args:
+        ctx: Anything with a .logger (uagents Context, or a batch stand-in)
+        artwork_id: chainId_contract_tokenId
+        analysis: Step 1 output
+        search_results: Step 2 output (may be empty)
+        awakened_by: Address credited in card_1_onchain
+        on_response: Optional async callback(raw_result, estimated_input_tokens),
+            called once the model has answered and before parsing
+        on_card: Optional async callback(section_name, section) for each
+            completed top-level section, in completion order
+        mode: "single" or "parallel" (defaults to CURATION_MODE)
+        art: Indexer Art fields (minter, blockNumber, txHash, ...) if known
+        onchain: build_onchain_sections output that was already built and
+            sent to on_card (e.g. while searching); it is not sent again
+        shared_cards: Cards written once for the whole collection (see
+            collection_context); sent to on_card and not generated again
+
+    Returns:
+        (curation, cached) - cached is True when no LLM call was made
+
+    Raises:
+        CurationParseError: the response could not be parsed
+    """
+    with timed("curation") as span:
+        curation, cached = await _curate(ctx, artwork_id, analysis, search_results, awakened_by,
+                                         on_response, on_card, mode, art, onchain, shared_cards)
+        span["outcome"] = "cached" if cached else "ok"
+        return curation, cached
+
+
+async def _curate(ctx, artwork_id, analysis, search_results, awakened_by, on_response, on_card,
+                  mode, art, onchain, shared_cards) -> Tuple[Dict, bool]:
+    # Same artwork with the same inputs was curated before: no LLM call needed
+    curation_cache = get_curation_cache()
+    cached = curation_cache.get(artwork_id, analysis, search_results, awakened_by)
+    if cached is not None:
+        ctx.logger.info(f"♻️ Curation cache hit for {artwork_id}")
+        if on_card is not None:
+            for key, value in cached.items():
+                if not onchain or key not in onchain:
+                    await on_card(key, value)
+        return cached, True
+
+    # Literal and lookup-only sections need no tokens at all
+    if onchain is None:
+        onchain = build_onchain_sections(analysis, awakened_by, art)
+        if on_card is not None:
+            for key, value in onchain.items():
+                await on_card(key, value)
+
+    # Artist cards already written for the collection are reused as they are
+    shared_cards = {key: value for key, value in (shared_cards or {}).items() if key in LLM_SECTIONS}
+    if shared_cards:
+        ctx.logger.info(f"♻️ Reusing collection cards: {', '.join(shared_cards)}")
+        if on_card is not None:
+            for key, value in shared_cards.items():
+                await on_card(key, value)
+    prebuilt = dict(onchain, **shared_cards)
+    sections = tuple(key for key in LLM_SECTIONS if key not in prebuilt)
+
+    async def on_llm_card(key, value):
+        if key not in prebuilt and on_card is not None:
+            await on_card(key, value)
+
+    mode = mode or CURATION_MODE
+    with timed(f"curation.{mode}"):
+        if mode == "parallel":
+            generated = await _generate_parallel(ctx, analysis, search_results, awakened_by, on_response, on_llm_card,
+                                                 sections)
+        else:
+            generated = await _generate_single(ctx, analysis, search_results, awakened_by, on_response, on_llm_card,
+                                               sections)
+
+    # Schema order; code-built and shared sections win over anything the model echoed back
+    merged = dict(generated, **prebuilt)
+    curation_json = {key: merged[key] for key in CARD_SAMPLES if key in merged}
+
+    problems = card_problems({key: value for key, value in curation_json.items() if key not in prebuilt})
+    for key, found in problems.items():
+        ctx.logger.warning(f"⚠️ {key} does not match the card structure: {'; '.join(found[:5])}")
+
+    if CURATION_REPAIR and (problems or any(key not in curation_json for key in LLM_SECTIONS)):
+        with timed("curation.repair"):
+            repaired = await _repair_cards(ctx, curation_json, analysis, search_results, awakened_by)
+        for key, card in repaired.items():
+            curation_json[key] = card
+            if on_card is not None:
+                await on_card(key, card)
+        curation_json = {key: curation_json[key] for key in CARD_SAMPLES if key in curation_json}
+        problems = card_problems({key: curation_json[key] for key in repaired})
+        for key, found in problems.items():
+            ctx.logger.warning(f"⚠️ {key} still incomplete after repair: {'; '.join(found[:5])}")
+
+    for key in problems:
+        if not isinstance(curation_json[key], dict):
+            # Not a card at all; leave it out rather than break the frontend
+            del curation_json[key]
+
+    # Only complete, well-formed curations are worth serving again
+    if not problems and all(key in curation_json for key in CARD_SAMPLES):
+        curation_cache.set(artwork_id, analysis, search_results, curation_json)
+    return curation_json, False
+
+
+async def _generate_single(ctx, analysis, search_results, awakened_by, on_response, on_card,
+                           sections: Tuple[str, ...] = LLM_SECTIONS) -> Dict:
+    """All cards in one streamed completion"""
+    final_prompt = build_curation_prompt(analysis, search_results, awakened_by, sections)
+
+    # Log token count
+    estimated_input_tokens = count_tokens(final_prompt)
+    ctx.logger.info(f"Prompt input tokens: ~{estimated_input_tokens}")
+
+    ctx.logger.info("Sending to LLM for final curation...")
+
+    # Stream the LLM response with very high token limit
+    parser = IncrementalObjectParser()
+    chunks = []
+    finish_reason = None
+    first_card_at = None
+    started = time.monotonic()
+    stream = get_llm().stream_chat(
+        model="asi1-extended",
+        messages=[
+            {
+                "role": "system",
+                "content": CURATOR_SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": final_prompt
+            }
+        ],
+        max_tokens=64000,  # Increased significantly
+        temperature=0.8
+    )
+    async for text, finish_reason in stream:
+        chunks.append(text)
+        for key, value in parser.feed(text):
+            if first_card_at is None:
+                first_card_at = time.monotonic() - started
+                ctx.logger.info(f"First card ({key}) after {first_card_at:.1f}s")
+            if on_card is not None:
+                await on_card(key, value)
+
+    raw_result = "".join(chunks)
+    if finish_reason == "length":
+        ctx.logger.warning("⚠️ Curation hit max_tokens - response is truncated")
+
+    # Log response info
+    ctx.logger.info(f"Raw response: {len(raw_result)} chars")
+    ctx.logger.info(f"Starts: {raw_result[:100]}")
+    ctx.logger.info(f"Ends: {raw_result[-100:]}")
+
+    if on_response is not None:
+        await on_response(raw_result, estimated_input_tokens)
+
+    try:
+        parsed = parse_curation(ctx, raw_result)
+    except CurationParseError:
+        if not parser.members:
+            raise
+        parsed = {}
+    # Sections the stream parser saw close are complete by construction
+    salvaged = dict(parsed, **parser.members)
+    if len(salvaged) > len(parsed):
+        record_parse("curation", "salvaged")
+        ctx.logger.warning(f"Salvaged {len(salvaged) - len(parsed)} streamed section(s) the final parse missed")
+    return salvaged
+
+
+async def _repair_cards(ctx, curation: Dict, analysis: Dict, search_results: Dict, awakened_by: str) -> Dict:
+    """
+    Regenerate only the missing or malformed parts of a curation
+
+    Every LLM card is compared with its sample (missing_parts). One small
+    follow-up completion is asked for exactly those parts, with the inputs
+    of the affected card groups. The answer is deep-merged into the cards
+    the first pass got right. A missing card costs about its group's output
+    budget, and a missing field far less.
+
+    Returns:
+        The repaired cards (merged into what was there), by key
+    """
+    targets = {}
+    for key in LLM_SECTIONS:
+        part = missing_parts(curation.get(key), CARD_SAMPLES[key])
+        if part is not None:
+            targets[key] = part
+    if not targets:
+        return {}
+
+    fields: List[str] = []
+    max_tokens = 0
+    for keys, group_fields, group_tokens in CARD_GROUPS:
+        for key in keys:
+            if key in targets:
+                fields.extend(field for field in group_fields if field not in fields)
+                if key in curation and isinstance(curation[key], dict):
+                    # Partial repair: a few fields, sized from the sample they fill
+                    max_tokens += min(group_tokens, max(500, 3 * count_tokens(json.dumps(targets[key]))))
+                else:
+                    max_tokens += group_tokens
+
+    paths = [problem.split(":")[0] for key in targets
+             for problem in shape_problems(curation.get(key), CARD_SAMPLES[key], key)]
+    ctx.logger.info(f"🔧 Regenerating {len(paths)} part(s) of {len(targets)} card(s) "
+                    f"(max_tokens={max_tokens}): {', '.join(paths[:8])}")
+    fitted = fit_inputs(analysis, search_results)
+    inputs = select_inputs(fitted["analysis"], fitted["search_results"], tuple(fields))
+    try:
+        cards, _, _ = await _generate_card_group(ctx, targets, inputs, awakened_by, max_tokens)
+    except Exception as e:
+        ctx.logger.warning(f"⚠️ Card repair failed: {e}")
+        return {}
+
+    repaired = {}
+    for key, patch in cards.items():
+        existing = curation.get(key)
+        repaired[key] = deep_merge(existing, patch) if isinstance(existing, dict) else patch
+    return repaired
+
+
+def select_inputs(analysis: Dict, search_results: Dict, fields: Tuple[str, ...]) -> Dict:
+    """Pick the named analysis / search_results fields a card group needs"""
+    inputs = {}
+    for field in fields:
+        if field in (analysis or {}):
+            inputs[f"analysis.{field}"] = analysis[field]
+        elif field in (search_results or {}):
+            inputs[f"search_results.{field}"] = search_results[field]
+    return inputs
+
+
+async def _generate_card_group(ctx, samples: Dict[str, Any], inputs: Dict, awakened_by: str,
+                               max_tokens: int) -> Tuple[Dict, str, int]:
+    """
+    One completion for a group of cards
+
+    samples maps each card to the structure the model should fill: the full
+    card sample, or only the missing part of it when repairing a card.
+
+    Returns:
+        (cards, raw_result, estimated_input_tokens)
+    """
+    card_prompt = CARD_CURATION_PROMPT.format(
+        inputs=to_prompt_json(inputs) if inputs else "No data",
+        awakened_by=awakened_by,
+        CARD_JSON_SAMPLE=json.dumps(samples, indent=2),
+    )
+    estimated_input_tokens = count_tokens(card_prompt)
+    response = await get_llm().chat(
+        model="asi1-extended",
+        messages=[
+            {"role": "system", "content": CURATOR_SYSTEM_PROMPT},
+            {"role": "user", "content": card_prompt},
+        ],
+        max_tokens=max_tokens,
+        temperature=0.8
+    )
+    raw_result = response.choices[0].message.content
+    parsed = parse_curation(ctx, raw_result)
+    return {key: parsed[key] for key in samples if key in parsed}, raw_result, estimated_input_tokens
+
+
+async def _generate_parallel(ctx, analysis, search_results, awakened_by, on_response, on_card,
+                             sections: Tuple[str, ...] = LLM_SECTIONS) -> Dict:
+    """Every card group as its own concurrent completion, merged in schema order"""
+    groups = [(tuple(key for key in keys if key in sections), fields, max_tokens)
+              for keys, fields, max_tokens in CARD_GROUPS if any(key in sections for key in keys)]
+    ctx.logger.info(f"Sending {len(groups)} card groups to LLM in parallel...")
+    started = time.monotonic()
+    # Compact once; every group then takes its slice of the budgeted inputs
+    fitted = fit_inputs(analysis, search_results)
+
+    async def run_group(keys, fields, max_tokens):
+        inputs = select_inputs(fitted["analysis"], fitted["search_results"], fields)
+        try:
+            samples = {key: CARD_SAMPLES[key] for key in keys}
+            cards, raw_result, tokens = await _generate_card_group(ctx, samples, inputs, awakened_by, max_tokens)
+        except Exception as e:
+            # One bad group must not sink the others
+            ctx.logger.warning(f"⚠️ Card group {', '.join(keys)} failed: {e}")
+            return {}, getattr(e, "raw_result", ""), 0
+        ctx.logger.info(f"✓ {', '.join(cards)} after {time.monotonic() - started:.1f}s")
+        if on_card is not None:
+            for key, value in cards.items():
+                await on_card(key, value)
+        return cards, raw_result, tokens
+
+    results = await asyncio.gather(*(run_group(*group) for group in groups))
+
+    merged = {}
+    for cards, _, _ in results:
+        merged.update(cards)
+    raw_result = "\n".join(raw for _, raw, _ in results if raw)
+    ctx.logger.info(f"Parallel curation: {len(merged)}/{len(sections)} cards in {time.monotonic() - started:.1f}s")
+
+    if on_response is not None:
+        await on_response(raw_result, sum(tokens for _, _, tokens in results))
+
+    if not merged:
+        raise CurationParseError("No card group produced valid JSON", raw_result)
+    return merged
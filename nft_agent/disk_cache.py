@@ -0,0 +1,271 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from metrics import record_cache
+
+# Root directory for every on-disk cache the agent keeps
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+
+
+def stable_hash(value: Any) -> str:
+    """sha256 of a JSON value with sorted keys, so equal inputs hash equally"""
+    canonical = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """
+    Persistent JSON cache with per-entry TTL and LRU eviction
+
+    Every entry is one file named after the hash of its key, so lookups never
+    scan the directory. Recency is tracked with file mtimes (touched on each
+    hit), which lets the LRU order survive restarts. The cache is bounded by
+    entry count and, optionally, total bytes on disk.
+
+    An in-memory index of sizes and expiry times answers misses, expiry and
+    eviction without touching disk. The a* methods (aget, aget_entry, aset,
+    atouch) run the remaining file reads and writes in a worker thread, for
+    callers on the event loop.
+    """
+
+    def __init__(self, name: str, ttl: float, max_entries: int = 1000,
+                 max_bytes: Optional[int] = None, directory: str = CACHE_DIR):
+        self.name = name
+        self.directory = os.path.join(directory, name)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lru: Optional["OrderedDict[str, int]"] = None  # filename -> size
+        self._expires: Dict[str, float] = {}  # filename -> expires_at, once read or written
+        self._forgotten: List[str] = []  # dropped from the index, file not yet removed
+        self._total_bytes = 0
+
+    def _path(self, filename: str) -> str:
+        return os.path.join(self.directory, filename)
+
+    @staticmethod
+    def _filename(key: str) -> str:
+        return hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json"
+
+    def _load_index(self) -> "OrderedDict[str, int]":
+        """Build the LRU index from disk once, oldest access first"""
+        if self._lru is None:
+            os.makedirs(self.directory, exist_ok=True)
+            entries = []
+            for filename in os.listdir(self.directory):
+                if filename.endswith(".json"):
+                    stat = os.stat(self._path(filename))
+                    entries.append((stat.st_mtime, filename, stat.st_size))
+            entries.sort()
+            self._lru = OrderedDict((filename, size) for _, filename, size in entries)
+            self._total_bytes = sum(self._lru.values())
+        return self._lru
+
+    async def _aload_index(self) -> "OrderedDict[str, int]":
+        if self._lru is None:
+            await asyncio.to_thread(self._load_index)
+        return self._lru
+
+    def _lookup(self, filename: str, allow_stale: bool) -> bool:
+        """Whether the file may hold a usable entry, from the index alone (expired ones are dropped)"""
+        if filename not in self._lru:
+            return False
+        if not allow_stale and time.time() > self._expires.get(filename, float("inf")):
+            self._forget(filename)
+            return False
+        return True
+
+    def _read(self, filename: str) -> Optional[Dict]:
+        """Load an entry file and mark it recently used on disk; None if unreadable"""
+        try:
+            with open(self._path(filename), encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(self._path(filename))
+        except (OSError, json.JSONDecodeError):
+            return None
+        return entry
+
+    def _accept(self, key: str, filename: str, entry: Optional[Dict], allow_stale: bool) -> Optional[Dict]:
+        """Index bookkeeping and metrics for an entry read from disk"""
+        if entry is None:
+            self._forget(filename)
+            self._miss()
+            return None
+        if entry.get("key") != key:
+            # sha256 collision guard
+            self._miss()
+            return None
+        expires_at = entry.get("expires_at", 0)
+        if filename in self._lru:
+            self._expires[filename] = expires_at
+        entry["stale"] = time.time() > expires_at
+        if entry["stale"] and not allow_stale:
+            self._forget(filename)
+            self._miss()
+            return None
+        if filename in self._lru:
+            self._lru.move_to_end(filename)
+        self.hits += 1
+        record_cache(self.name, "stale" if entry["stale"] else "hit")
+        return entry
+
+    def get_entry(self, key: str, allow_stale: bool = False) -> Optional[Dict]:
+        """
+        Load the full cache entry (value plus metadata)
+
+        Args:
+            key: Cache key
+            allow_stale: Return expired entries too (e.g. for revalidation)
+
+        Returns:
+            Dict with "value", "stored_at", "expires_at", "meta" and "stale", or None
+        """
+        self._load_index()
+        filename = self._filename(key)
+        if not self._lookup(filename, allow_stale):
+            self._miss()
+            self._unlink_forgotten()
+            return None
+        entry = self._accept(key, filename, self._read(filename), allow_stale)
+        self._unlink_forgotten()
+        return entry
+
+    async def aget_entry(self, key: str, allow_stale: bool = False) -> Optional[Dict]:
+        """get_entry() with the file read in a worker thread"""
+        await self._aload_index()
+        filename = self._filename(key)
+        if not self._lookup(filename, allow_stale):
+            self._miss()
+            await self._aunlink_forgotten()
+            return None
+        entry = self._accept(key, filename, await asyncio.to_thread(self._read, filename), allow_stale)
+        await self._aunlink_forgotten()
+        return entry
+
+    def _miss(self):
+        self.misses += 1
+        record_cache(self.name, "miss")
+
+    def get(self, key: str) -> Any:
+        """Return the cached value, or None on a miss or expiry"""
+        entry = self.get_entry(key)
+        return entry["value"] if entry else None
+
+    async def aget(self, key: str) -> Any:
+        entry = await self.aget_entry(key)
+        return entry["value"] if entry else None
+
+    def _entry(self, key: str, value: Any, ttl: Optional[float], meta: Optional[Dict]) -> Dict:
+        now = time.time()
+        return {
+            "key": key,
+            "stored_at": now,
+            "expires_at": now + (self.ttl if ttl is None else ttl),
+            "meta": meta or {},
+            "value": value,
+        }
+
+    def _write(self, filename: str, entry: Dict) -> int:
+        """Write an entry file atomically; returns its size"""
+        data = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+        # Per-thread temp name: concurrent writers of one key must not share it
+        tmp = self._path(f"{filename}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self._path(filename))
+        return len(data)
+
+    def _stored(self, filename: str, entry: Dict, size: int):
+        """Index a written entry and pick the LRU entries to evict"""
+        self._total_bytes += size - self._lru.pop(filename, 0)
+        self._lru[filename] = size
+        self._expires[filename] = entry["expires_at"]
+        self._evict()
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, meta: Optional[Dict] = None):
+        """
+        Store a JSON-serializable value, evicting least recently used entries if full
+        """
+        self._load_index()
+        filename = self._filename(key)
+        entry = self._entry(key, value, ttl, meta)
+        self._stored(filename, entry, self._write(filename, entry))
+        self._unlink_forgotten()
+
+    async def aset(self, key: str, value: Any, ttl: Optional[float] = None, meta: Optional[Dict] = None):
+        """set() with the serialization and file writes in a worker thread"""
+        await self._aload_index()
+        filename = self._filename(key)
+        entry = self._entry(key, value, ttl, meta)
+        self._stored(filename, entry, await asyncio.to_thread(self._write, filename, entry))
+        await self._aunlink_forgotten()
+
+    def touch(self, key: str, ttl: Optional[float] = None, meta: Optional[Dict] = None) -> bool:
+        """
+        Extend an entry's lifetime without rewriting its value (e.g. after a 304)
+        """
+        entry = self.get_entry(key, allow_stale=True)
+        if entry is None:
+            return False
+        self.set(key, entry["value"], ttl=ttl, meta=dict(entry.get("meta") or {}, **(meta or {})))
+        return True
+
+    async def atouch(self, key: str, ttl: Optional[float] = None, meta: Optional[Dict] = None) -> bool:
+        entry = await self.aget_entry(key, allow_stale=True)
+        if entry is None:
+            return False
+        await self.aset(key, entry["value"], ttl=ttl, meta=dict(entry.get("meta") or {}, **(meta or {})))
+        return True
+
+    def delete(self, key: str):
+        self._load_index()
+        self._forget(self._filename(key))
+        self._unlink_forgotten()
+
+    def _forget(self, filename: str):
+        """Drop an entry from the index; its file goes with the next _unlink_forgotten"""
+        if filename in self._lru:
+            self._total_bytes -= self._lru.pop(filename)
+            self._expires.pop(filename, None)
+            self._forgotten.append(filename)
+
+    def _unlink(self, filenames: List[str]):
+        for filename in filenames:
+            try:
+                os.remove(self._path(filename))
+            except FileNotFoundError:
+                pass
+
+    def _take_forgotten(self) -> List[str]:
+        forgotten, self._forgotten = self._forgotten, []
+        return forgotten
+
+    def _unlink_forgotten(self):
+        if self._forgotten:
+            self._unlink(self._take_forgotten())
+
+    async def _aunlink_forgotten(self):
+        if self._forgotten:
+            await asyncio.to_thread(self._unlink, self._take_forgotten())
+
+    def _evict(self):
+        while self._lru and (
+            len(self._lru) > self.max_entries
+            or (self.max_bytes is not None and self._total_bytes > self.max_bytes)
+        ):
+            self._forget(next(iter(self._lru)))
+
+    def __len__(self) -> int:
+        return len(self._load_index())
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
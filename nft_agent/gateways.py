@@ -0,0 +1,273 @@
+import os
+import re
+import time
+import asyncio
+import httpx
+from typing import Dict, List, Optional, Tuple
+from contextlib import asynccontextmanager
+
+# Gateways raced for content-addressed URLs, best-scoring first. A local IPFS
+# node is listed first: when it is not running it fails fast and drops down.
+IPFS_GATEWAYS = [g.strip() for g in os.getenv(
+    "IPFS_GATEWAYS",
+    "http://127.0.0.1:8080/ipfs/,https://ipfs.io/ipfs/,https://dweb.link/ipfs/,"
+    "https://w3s.link/ipfs/,https://gateway.pinata.cloud/ipfs/"
+).split(",") if g.strip()]
+ARWEAVE_GATEWAYS = [g.strip() for g in os.getenv(
+    "ARWEAVE_GATEWAYS", "https://arweave.net/,https://ar-io.net/"
+).split(",") if g.strip()]
+
+# How many gateways are raced per request, and how long each may take to answer
+GATEWAY_RACE_WIDTH = int(os.getenv("GATEWAY_RACE_WIDTH", "3"))
+GATEWAY_TIMEOUT = float(os.getenv("GATEWAY_TIMEOUT", "30"))
+# Weight of the newest observation in the rolling latency / error averages
+GATEWAY_EWMA_ALPHA = float(os.getenv("GATEWAY_EWMA_ALPHA", "0.3"))
+
+# https://<gateway>/ipfs/<cid>/..., https://<cid>.ipfs.<gateway>/..., https://arweave.net/<txid>
+_PATH_GATEWAY = re.compile(r"^https?://[^/]+/(ipfs|ipns)/(.+)$", re.IGNORECASE)
+_SUBDOMAIN_GATEWAY = re.compile(r"^https?://([a-z0-9]+)\.(ipfs|ipns)\.[^/]+/?(.*)$", re.IGNORECASE)
+_ARWEAVE_HOSTS = {"arweave.net", "www.arweave.net", "ar-io.net", "arweave.dev"}
+_ARWEAVE_TX = re.compile(r"^https?://([^/]+)/([A-Za-z0-9_-]{43}(?:/.*)?)$")
+
+
+def parse_content_uri(url: str) -> Optional[Tuple[str, str]]:
+    """
+    Split a content-addressed URL into (protocol, path)
+
+    Recognises ipfs://, ipns://, ar:// and the usual gateway spellings of
+    the same content, so ("ipfs", "<cid>/1.png") can be fetched from any
+    gateway.
+
+    Returns:
+        ("ipfs" | "ipns" | "ar", path), or None for ordinary URLs
+    """
+    if not url:
+        return None
+    url = url.strip()
+    for scheme in ("ipfs", "ipns"):
+        if url.startswith(f"{scheme}://"):
+            path = url[len(scheme) + 3:]
+            # Tolerate the common ipfs://ipfs/<cid> mistake
+            if path.startswith(f"{scheme}/"):
+                path = path[len(scheme) + 1:]
+            return scheme, path
+    if url.startswith("ar://"):
+        return "ar", url[len("ar://"):]
+    match = _PATH_GATEWAY.match(url)
+    if match:
+        return match.group(1).lower(), match.group(2)
+    match = _SUBDOMAIN_GATEWAY.match(url)
+    if match:
+        path = match.group(1) + ("/" + match.group(3) if match.group(3) else "")
+        return match.group(2).lower(), path
+    match = _ARWEAVE_TX.match(url)
+    if match and match.group(1).lower() in _ARWEAVE_HOSTS:
+        return "ar", match.group(2)
+    return None
+
+
+def is_content_uri(url: str) -> bool:
+    return parse_content_uri(url) is not None
+
+
+class GatewayStats:
+    """Rolling latency and error rate of one gateway"""
+
+    # Optimistic prior, so untried gateways get a chance to prove themselves
+    DEFAULT_LATENCY = 1.0
+    # Seconds added per unit of error rate: a gateway that fails fast is still bad
+    ERROR_PENALTY = 5.0
+
+    def __init__(self, alpha: float = GATEWAY_EWMA_ALPHA):
+        self.alpha = alpha
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.successes = 0
+        self.failures = 0
+
+    def record(self, latency: float, ok: bool):
+        self.latency = latency if self.latency is None else self.alpha * latency + (1 - self.alpha) * self.latency
+        self.error_rate = self.alpha * (0.0 if ok else 1.0) + (1 - self.alpha) * self.error_rate
+        if ok:
+            self.successes += 1
+        else:
+            self.failures += 1
+
+    def record_lost(self, elapsed: float):
+        """A race this gateway lost: it would have taken at least `elapsed`"""
+        if self.latency is None or elapsed > self.latency:
+            self.latency = elapsed if self.latency is None else self.alpha * elapsed + (1 - self.alpha) * self.latency
+
+    @property
+    def score(self) -> float:
+        """Expected seconds to a good response; lower is better"""
+        latency = self.DEFAULT_LATENCY if self.latency is None else self.latency
+        return latency + self.ERROR_PENALTY * self.error_rate
+
+
+class GatewayResolver:
+    """
+    Fetch IPFS / Arweave content from whichever gateway answers first
+
+    Each request races the GATEWAY_RACE_WIDTH best-scoring gateways for its
+    protocol. The first 2xx response wins and the other attempts are
+    cancelled. Every attempt feeds the gateway's rolling latency and error
+    scores, so later races start with the fastest healthy gateways.
+    Ordinary URLs are fetched directly with the same client.
+    """
+
+    def __init__(self, ipfs_gateways: List[str] = IPFS_GATEWAYS, arweave_gateways: List[str] = ARWEAVE_GATEWAYS,
+                 race_width: int = GATEWAY_RACE_WIDTH, timeout: float = GATEWAY_TIMEOUT):
+        self.gateways = {"ipfs": ipfs_gateways, "ipns": [g.replace("/ipfs/", "/ipns/") for g in ipfs_gateways],
+                         "ar": arweave_gateways}
+        self.race_width = race_width
+        self.timeout = timeout
+        self.stats: Dict[str, GatewayStats] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Keep-alive client shared by every gateway, created on first use"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=5.0),
+                follow_redirects=True,
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _stats(self, gateway: str) -> GatewayStats:
+        stats = self.stats.get(gateway)
+        if stats is None:
+            stats = self.stats[gateway] = GatewayStats()
+        return stats
+
+    def ranked(self, protocol: str) -> List[str]:
+        """Gateways for a protocol, best score first (configured order breaks ties)"""
+        gateways = self.gateways.get(protocol, [])
+        return sorted(gateways, key=lambda g: (self._stats(g).score, gateways.index(g)))
+
+    def candidates(self, url: str) -> List[str]:
+        """Full URLs to try for url, best gateway first"""
+        parsed = parse_content_uri(url)
+        if parsed is None:
+            return [url]
+        protocol, path = parsed
+        return [gateway + path for gateway in self.ranked(protocol)]
+
+    def best_url(self, url: str) -> str:
+        """HTTP URL of url on the currently best gateway (for handing to third parties)"""
+        return self.candidates(url)[0]
+
+    async def _attempt(self, gateway: str, target: str) -> httpx.Response:
+        started = time.monotonic()
+        try:
+            response = await self.client.send(self.client.build_request("GET", target), stream=True)
+        except asyncio.CancelledError:
+            # Lost the race: it was at least this slow
+            self._stats(gateway).record_lost(time.monotonic() - started)
+            raise
+        except Exception:
+            self._stats(gateway).record(time.monotonic() - started, ok=False)
+            raise
+        if response.status_code >= 400:
+            self._stats(gateway).record(time.monotonic() - started, ok=False)
+            await response.aclose()
+            raise httpx.HTTPStatusError(f"HTTP {response.status_code} from {target}",
+                                        request=response.request, response=response)
+        self._stats(gateway).record(time.monotonic() - started, ok=True)
+        return response
+
+    async def _race(self, url: str) -> httpx.Response:
+        parsed = parse_content_uri(url)
+        if parsed is None:
+            response = await self.client.send(self.client.build_request("GET", url), stream=True)
+            if response.status_code >= 400:
+                await response.aclose()
+                raise httpx.HTTPStatusError(f"HTTP {response.status_code} from {url}",
+                                            request=response.request, response=response)
+            return response
+
+        protocol, path = parsed
+        gateways = self.ranked(protocol)
+        if not gateways:
+            raise ValueError(f"No gateways configured for {protocol}://")
+        racing = {asyncio.ensure_future(self._attempt(g, g + path)) for g in gateways[:self.race_width]}
+        waiting = list(gateways[self.race_width:])
+        errors = []
+        try:
+            while racing:
+                done, racing = await asyncio.wait(racing, return_when=asyncio.FIRST_COMPLETED)
+                winner = None
+                for task in done:
+                    if task.exception() is not None:
+                        errors.append(str(task.exception()))
+                    elif winner is None:
+                        winner = task.result()
+                    else:
+                        await task.result().aclose()
+                if winner is not None:
+                    return winner
+                # Each failure lets the next-best gateway into the race
+                while waiting and len(racing) < self.race_width:
+                    gateway = waiting.pop(0)
+                    racing.add(asyncio.ensure_future(self._attempt(gateway, gateway + path)))
+        finally:
+            for task in racing:
+                task.cancel()
+            for task in racing:
+                try:
+                    response = await task
+                except BaseException:
+                    continue
+                await response.aclose()
+        raise httpx.HTTPError(f"All gateways failed for {url}: " + " | ".join(errors[-3:]))
+
+    @asynccontextmanager
+    async def open(self, url: str):
+        """
+        Streamed GET of url through the fastest gateway
+
+        Usage:
+            async with get_resolver().open("ipfs://<cid>") as response:
+                async for chunk in response.aiter_bytes(): ...
+        """
+        response = await self._race(url)
+        try:
+            yield response
+        finally:
+            await response.aclose()
+
+    def health(self) -> Dict[str, Dict]:
+        """Current scores per gateway, for logging"""
+        return {
+            gateway: {
+                "latency": round(stats.latency, 3) if stats.latency is not None else None,
+                "error_rate": round(stats.error_rate, 3),
+                "score": round(stats.score, 3),
+                "successes": stats.successes,
+                "failures": stats.failures,
+            }
+            for gateway, stats in self.stats.items()
+        }
+
+
+_resolver: Optional[GatewayResolver] = None
+
+
+def get_resolver() -> GatewayResolver:
+    """Return the agent-wide gateway resolver"""
+    global _resolver
+    if _resolver is None:
+        _resolver = GatewayResolver()
+    return _resolver
+
+
+async def close_resolver():
+    """Close the gateway client (call on agent shutdown)"""
+    if _resolver is not None:
+        await _resolver.close()
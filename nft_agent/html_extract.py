@@ -0,0 +1,149 @@
+import os
+import re
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+from urllib.parse import urljoin, urlsplit
+
+# Character budget for the readable text kept per page
+WEBSITE_TEXT_BUDGET = int(os.getenv("WEBSITE_TEXT_BUDGET", "8000"))
+MAX_LINKS = int(os.getenv("WEBSITE_MAX_LINKS", "25"))
+
+_SPACES = re.compile(r"[ \t\r\f\v]+")
+_BLANK_LINES = re.compile(r"\n\s*\n+")
+
+
+def _tidy(text: str) -> str:
+    text = _SPACES.sub(" ", text)
+    lines = [line.strip() for line in text.split("\n")]
+    return _BLANK_LINES.sub("\n", "\n".join(line for line in lines if line)).strip()
+
+
+class HtmlExtractor(HTMLParser):
+    """
+    Streaming HTML-to-text extractor
+
+    Feed it the page chunk by chunk. It skips scripts, styles and page chrome
+    (nav, header, footer, forms), keeps the <title>, OpenGraph / Twitter card
+    and description meta tags, collects outbound links, and prefers text inside
+    <main> / <article> when the page has them. Once enough text is collected
+    .done turns True so the caller can stop reading the response.
+    """
+
+    SKIP = {"script", "style", "noscript", "svg", "nav", "header", "footer", "template", "iframe", "form", "aside"}
+    BLOCK = {"p", "div", "section", "article", "main", "li", "br", "tr", "blockquote",
+             "h1", "h2", "h3", "h4", "h5", "h6"}
+    MAIN = {"main", "article"}
+    META_NAMES = {"description", "author", "keywords"}
+
+    def __init__(self, base_url: str = "", max_chars: int = WEBSITE_TEXT_BUDGET, max_links: int = MAX_LINKS):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.base_host = urlsplit(base_url).netloc.lower()
+        self.max_chars = max_chars
+        self.max_links = max_links
+        self.title = ""
+        self.meta: Dict[str, str] = {}
+        self.links: List[str] = []
+        self.done = False
+        self._text: List[str] = []
+        self._main: List[str] = []
+        self._text_len = 0
+        self._main_len = 0
+        self._skip_depth = 0
+        self._main_depth = 0
+        self._in_title = False
+
+    def feed(self, data: str):
+        if not self.done:
+            super().feed(data)
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "meta":
+            self._handle_meta(dict(attrs))
+            return
+        if tag == "title":
+            self._in_title = True
+        if tag in self.SKIP:
+            self._skip_depth += 1
+            return
+        if tag in self.MAIN:
+            self._main_depth += 1
+        if tag == "a" and not self._skip_depth:
+            self._handle_link(dict(attrs).get("href"))
+        if tag in self.BLOCK:
+            self._append("\n")
+
+    def handle_startendtag(self, tag, attrs):
+        if tag == "meta":
+            self._handle_meta(dict(attrs))
+        elif tag == "br":
+            self._append("\n")
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        if tag in self.SKIP:
+            if self._skip_depth:
+                self._skip_depth -= 1
+            return
+        if tag in self.MAIN and self._main_depth:
+            self._main_depth -= 1
+        if tag in self.BLOCK:
+            self._append("\n")
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+            return
+        if not self._skip_depth:
+            self._append(data)
+
+    def _append(self, text: str):
+        self._text.append(text)
+        self._text_len += len(text)
+        if self._main_depth:
+            self._main.append(text)
+            self._main_len += len(text)
+        # Raw lengths overcount whitespace, so read a little past the budget
+        if self._main_len >= self.max_chars * 2 or self._text_len >= self.max_chars * 4:
+            self.done = True
+
+    def _handle_meta(self, attrs: Dict):
+        key = (attrs.get("property") or attrs.get("name") or "").lower()
+        content = (attrs.get("content") or "").strip()
+        if content and (key.startswith("og:") or key.startswith("twitter:") or key in self.META_NAMES):
+            self.meta.setdefault(key, content)
+
+    def _handle_link(self, href: Optional[str]):
+        if not href or len(self.links) >= self.max_links or href.startswith(("#", "mailto:", "javascript:")):
+            return
+        url = urljoin(self.base_url, href)
+        host = urlsplit(url).netloc.lower()
+        if host and host != self.base_host and url not in self.links:
+            self.links.append(url)
+
+    def result(self) -> Dict:
+        """Title, meta tags, outbound links and the budgeted readable text"""
+        main = _tidy("".join(self._main))
+        # Fall back to the whole page when there is no substantial <main>/<article>
+        text = main if len(main) >= 200 else _tidy("".join(self._text))
+        return {
+            "title": _tidy(self.title) or None,
+            "meta": self.meta,
+            "links": self.links,
+            "text": text[: self.max_chars],
+            "truncated": self.done or len(text) > self.max_chars,
+        }
+
+
+def html_to_text(html: str, max_chars: Optional[int] = None) -> str:
+    """Readable text from a complete HTML document (or plain text, passed through)"""
+    if "<" not in html:
+        return html.strip()[:max_chars] if max_chars else html.strip()
+    extractor = HtmlExtractor(max_chars=max_chars or len(html))
+    try:
+        extractor.feed(html)
+        extractor.close()
+    except Exception:
+        pass
+    return extractor.result()["text"]
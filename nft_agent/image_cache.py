@@ -0,0 +1,224 @@
+import os
+import io
+import base64
+import asyncio
+import hashlib
+from typing import Dict, Optional, Tuple
+from disk_cache import DiskCache
+from singleflight import SingleFlight
+from gateways import get_resolver
+
+try:
+    from PIL import Image
+except ImportError:  # optional: without Pillow, only small stills are inlined (untouched)
+    Image = None
+
+# Downscaling applied before an image is sent to the vision model
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "1024"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+IMAGE_DETAIL = os.getenv("IMAGE_DETAIL", "high")
+# Originals larger than this are not downloaded at all
+IMAGE_MAX_DOWNLOAD_BYTES = int(os.getenv("IMAGE_MAX_DOWNLOAD_BYTES", str(32 * 1024 * 1024)))
+# Without Pillow, JPEG/PNG/WebP stills up to this size are inlined as-is (base64 adds a third);
+# anything larger, and every GIF, is sent to the model as a gateway URL instead
+IMAGE_PASSTHROUGH_BYTES = int(os.getenv("IMAGE_PASSTHROUGH_BYTES", str(512 * 1024)))
+
+# Token images are immutable in practice, so keep them for a month
+IMAGE_CACHE_TTL = int(os.getenv("IMAGE_CACHE_TTL", str(30 * 24 * 3600)))
+IMAGE_CACHE_MAX_ENTRIES = int(os.getenv("IMAGE_CACHE_MAX_ENTRIES", "5000"))
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Formats a vision model accepts as a data URL
+_INLINE_TYPES = {"image/jpeg", "image/png", "image/webp", "image/gif"}
+# ...and those passed through without Pillow (a GIF may be a large animation)
+_PASSTHROUGH_TYPES = {"image/jpeg", "image/png", "image/webp"}
+
+_warned_no_pillow = False
+
+
+def _sniff_type(data: bytes, declared: Optional[str]) -> Optional[str]:
+    """Image MIME type from magic bytes, falling back to the Content-Type header"""
+    if data.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if declared:
+        return declared.split(";")[0].strip().lower()
+    return None
+
+
+def _data_url(data: bytes, content_type: str) -> str:
+    return f"data:{content_type};base64,{base64.b64encode(data).decode('ascii')}"
+
+
+def process_image(data: bytes, content_type: Optional[str], max_dimension: int = IMAGE_MAX_DIMENSION,
+                  quality: int = IMAGE_JPEG_QUALITY) -> Optional[Dict]:
+    """
+    Downscale an image and encode it as a data URL
+
+    Animations are reduced to their middle frame, which is more representative
+    than the first (often a blank or fade-in frame). Images with transparency
+    are kept as PNG, everything else becomes JPEG.
+
+    Args:
+        data: Original image bytes
+        content_type: Declared Content-Type, used when the bytes are not recognised
+        max_dimension: Longest side of the result in pixels
+        quality: JPEG quality
+
+    Returns:
+        Dict with "data_url", "width", "height", "frames", or None if the
+        format cannot be inlined (SVG, video, or without Pillow a GIF or a
+        still over IMAGE_PASSTHROUGH_BYTES)
+    """
+    content_type = _sniff_type(data, content_type)
+    if Image is None:
+        if content_type in _PASSTHROUGH_TYPES and len(data) <= IMAGE_PASSTHROUGH_BYTES:
+            return {"data_url": _data_url(data, content_type), "width": None, "height": None, "frames": None}
+        return None
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        frames = getattr(image, "n_frames", 1)
+        if frames > 1:
+            image.seek(frames // 2)
+        image.load()
+    except Exception:
+        return None
+
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    image = image.convert("RGBA" if has_alpha else "RGB")
+    image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+    out = io.BytesIO()
+    if has_alpha:
+        image.save(out, format="PNG", optimize=True)
+        out_type = "image/png"
+    else:
+        image.save(out, format="JPEG", quality=quality, optimize=True)
+        out_type = "image/jpeg"
+    return {
+        "data_url": _data_url(out.getvalue(), out_type),
+        "width": image.width,
+        "height": image.height,
+        "frames": frames,
+    }
+
+
+class ImageCache:
+    """
+    Fetch-once store of vision-ready images
+
+    Two on-disk layers: source URL → sha256 of the original bytes, and
+    content hash (+ processing settings) → downscaled data URL. Re-analysing
+    an artwork therefore never downloads the original again, and the same
+    image behind different gateway URLs is processed only once.
+    """
+
+    def __init__(self, ttl: int = IMAGE_CACHE_TTL, max_entries: int = IMAGE_CACHE_MAX_ENTRIES,
+                 max_bytes: int = IMAGE_CACHE_MAX_BYTES):
+        self.sources = DiskCache("image_sources", ttl=ttl, max_entries=max_entries)
+        self.images = DiskCache("images", ttl=ttl, max_entries=max_entries, max_bytes=max_bytes)
+        self._flights = SingleFlight()
+
+    @staticmethod
+    def _image_key(sha256: str) -> str:
+        # Passed-through images must not be served once Pillow is installed
+        if Image is None:
+            return f"{sha256}:raw:{IMAGE_PASSTHROUGH_BYTES}"
+        return f"{sha256}:{IMAGE_MAX_DIMENSION}:{IMAGE_JPEG_QUALITY}"
+
+    async def _download(self, url: str) -> Tuple[bytes, Optional[str]]:
+        """Stream the original from the fastest gateway, refusing anything over IMAGE_MAX_DOWNLOAD_BYTES"""
+        async with get_resolver().open(url) as response:
+            declared = response.headers.get("content-length")
+            if declared and declared.isdigit() and int(declared) > IMAGE_MAX_DOWNLOAD_BYTES:
+                raise ValueError(f"Image too large ({declared} bytes)")
+            chunks = []
+            received = 0
+            async for chunk in response.aiter_bytes():
+                received += len(chunk)
+                if received > IMAGE_MAX_DOWNLOAD_BYTES:
+                    raise ValueError(f"Image larger than {IMAGE_MAX_DOWNLOAD_BYTES} bytes")
+                chunks.append(chunk)
+            return b"".join(chunks), response.headers.get("content-type")
+
+    async def _load(self, url: str) -> Optional[Dict]:
+        data, content_type = await self._download(url)
+        sha256 = hashlib.sha256(data).hexdigest()
+        image = await self.images.aget(self._image_key(sha256))
+        if image is None:
+            # Decoding and resampling are CPU-bound; keep them off the event loop
+            processed = await asyncio.to_thread(process_image, data, content_type)
+            # Unsupported formats are remembered too, so they are not re-downloaded
+            image = dict(processed or {"data_url": None}, sha256=sha256, source_bytes=len(data))
+            await self.images.aset(self._image_key(sha256), image)
+        await self.sources.aset(url, {"sha256": sha256})
+        return image
+
+    def content_hash(self, url: str) -> Optional[str]:
+        """sha256 of the original bytes behind url, if it has been fetched before"""
+        source = self.sources.get(url)
+        return source["sha256"] if source else None
+
+    async def get(self, url: str) -> Optional[Dict]:
+        """
+        Vision-ready version of the image at url
+
+        Args:
+            url: http(s), ipfs://, ar:// or gateway image URL
+
+        Returns:
+            Dict with "data_url", "sha256", "width", "height", "frames",
+            "source_bytes" and "cached", or None if it cannot be inlined
+        """
+        source = await self.sources.aget(url)
+        if source:
+            image = await self.images.aget(self._image_key(source["sha256"]))
+            if image is not None:
+                return dict(image, cached=True) if image["data_url"] else None
+        image = await self._flights.do(url, lambda: self._load(url))
+        return dict(image, cached=False) if image["data_url"] else None
+
+
+_image_cache: Optional[ImageCache] = None
+
+
+def get_image_cache() -> ImageCache:
+    """Return the agent-wide image cache"""
+    global _image_cache
+    if _image_cache is None:
+        _image_cache = ImageCache()
+    return _image_cache
+
+
+async def prepare_image(ctx, image_url: str) -> Dict:
+    """
+    image_url content part for a vision prompt, inlined as a compact data URL when possible
+
+    Falls back to the gateway URL if the image cannot be fetched or processed,
+    so a slow gateway degrades the analysis instead of failing it.
+    """
+    global _warned_no_pillow
+    if Image is None and not _warned_no_pillow:
+        _warned_no_pillow = True
+        ctx.logger.warning(
+            f"⚠️ Pillow is not installed: image downscaling is disabled, only stills up to "
+            f"{IMAGE_PASSTHROUGH_BYTES // 1024} KB are inlined and the rest are sent as URLs (pip install Pillow)"
+        )
+    try:
+        image = await get_image_cache().get(image_url)
+    except Exception as e:
+        ctx.logger.warning(f"⚠️ Image pre-processing failed for {image_url}: {e}")
+        image = None
+    if image is None:
+        return {"url": get_resolver().best_url(image_url), "detail": IMAGE_DETAIL}
+    ctx.logger.info(
+        f"🖼️ Image {'from cache' if image['cached'] else 'processed'}: "
+        f"{image.get('width')}x{image.get('height')}, {len(image['data_url']) // 1024} KB data URL"
+    )
+    return {"url": image["data_url"], "detail": IMAGE_DETAIL}
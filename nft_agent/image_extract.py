@@ -0,0 +1,175 @@
+import re
+import json
+from typing import Any, Dict, List, NamedTuple, Optional, Union
+from gateways import parse_content_uri
+
+# Keys that hold an artwork image, with how much each is trusted. Originals
+# beat marketplace display copies; animations are only a last resort.
+IMAGE_KEYS = {
+    "image_original_url": 60, "original_image_url": 60, "imageoriginalurl": 60,
+    "image": 50, "image_url": 50, "imageurl": 50, "imageuri": 50, "image_uri": 50,
+    "display_image_url": 40, "displayimageurl": 40,
+    "media": 35,
+    "thumbnail_url": 10, "thumbnail": 10, "preview": 10, "cached_url": 10,
+    "animation_url": 5, "animationurl": 5, "display_animation_url": 3, "original_animation_url": 5,
+}
+# Bulky subtrees that never hold the artwork image; skipping them keeps large
+# OpenSea payloads cheap
+SKIP_KEYS = {"traits", "attributes", "owners", "rarity", "properties", "events", "orders", "offers", "listings"}
+# Wrappers whose list values hold one NFT each (OpenSea v2, Alchemy, indexer exports)
+BATCH_KEYS = ("nfts", "assets", "tokens", "ownedNfts", "items", "results", "Art")
+
+# Permanent storage beats marketplace CDNs, which the analysis prompt also asks for
+_CONTENT_BONUS = 40
+_CDN_PENALTY = 20
+_CDN_HOSTS = re.compile(r"(^|\.)(seadn\.io|openseauserdata\.com|googleusercontent\.com|cloudinary\.com|alchemyapi\.io|nft-cdn\.alchemy\.com)$")
+_HOST = re.compile(r"^[a-z]+://([^/?#]+)", re.IGNORECASE)
+_NON_IMAGE = re.compile(r"\.(mp4|webm|mov|m4v|mp3|wav|ogg|glb|gltf|html?|json)(\?|#|$)", re.IGNORECASE)
+_IMAGE_EXT = re.compile(r"\.(jpe?g|png|gif|webp|svg|avif)(\?|#|$)", re.IGNORECASE)
+# Fallback for dumps that are not JSON: URL-shaped tokens, filtered afterwards
+# (case-sensitive: IGNORECASE makes this scan several times slower)
+_URL_TOKEN = re.compile(r"(?:https?|ipfs|ar)://[^\s<>\"'\\]+")
+
+
+class ImageCandidate(NamedTuple):
+    url: str
+    key: str
+    depth: int
+    score: int
+
+
+def _score(url: str, key: str, depth: int) -> Optional[int]:
+    """Rank one candidate; None when the value is not a usable image reference"""
+    if url.startswith("data:"):
+        return IMAGE_KEYS.get(key, 0) - 10 if url.startswith("data:image/") else None
+    if not url.startswith(("http://", "https://", "ipfs://", "ipns://", "ar://")):
+        return None
+    if _NON_IMAGE.search(url):
+        return None
+    score = IMAGE_KEYS.get(key, 0) - depth
+    if parse_content_uri(url) is not None:
+        score += _CONTENT_BONUS
+    else:
+        host = _HOST.match(url)
+        if host and _CDN_HOSTS.search(host.group(1).lower()):
+            score -= _CDN_PENALTY
+    if _IMAGE_EXT.search(url):
+        score += 5
+    return score
+
+
+def find_image_candidates(data: Any, max_depth: int = 12) -> List[ImageCandidate]:
+    """
+    Every image reference in a parsed dump, best first
+
+    One iterative pass over arbitrarily nested dicts and lists. String values
+    under an image key (see IMAGE_KEYS, matched case-insensitively) become
+    candidates; nested {"url": ...} / {"gateway": ...} objects under an
+    image key count as that key. SKIP_KEYS subtrees are not entered.
+
+    Args:
+        data: Parsed JSON (dict or list)
+        max_depth: Nesting beyond this is ignored
+
+    Returns:
+        Candidates sorted by score, duplicates removed
+    """
+    found: Dict[str, ImageCandidate] = {}
+    stack = [(data, "", 0)]
+    while stack:
+        value, key, depth = stack.pop()
+        if isinstance(value, str):
+            if key:
+                url = value.strip()
+                score = _score(url, key, depth)
+                if score is not None and (url not in found or found[url].score < score):
+                    found[url] = ImageCandidate(url, key, depth, score)
+        elif isinstance(value, dict):
+            if depth >= max_depth:
+                continue
+            for child_key, child in value.items():
+                lowered = child_key.lower() if isinstance(child_key, str) else ""
+                if lowered in IMAGE_KEYS:
+                    stack.append((child, lowered, depth + 1))
+                elif key and lowered in ("url", "uri", "src", "gateway", "raw", "original"):
+                    # {"image": {"url": ...}} style media objects inherit the parent key
+                    stack.append((child, key, depth + 1))
+                elif isinstance(child, (dict, list)) and lowered not in SKIP_KEYS:
+                    stack.append((child, "", depth + 1))
+        elif isinstance(value, list):
+            if depth >= max_depth:
+                continue
+            for child in value:
+                if isinstance(child, (dict, list)) or key:
+                    stack.append((child, key, depth + 1))
+    return sorted(found.values(), key=lambda c: (-c.score, c.depth, c.url))
+
+
+def split_batch(data: Any) -> List[Any]:
+    """
+    The individual NFT records of a batch dump
+
+    A top-level list, or a dict holding a list of NFTs under one of the
+    BATCH_KEYS wrappers (e.g. OpenSea's {"nfts": [...], "next": ...}).
+    Anything else is a single NFT and comes back as a one-item list.
+    """
+    if isinstance(data, list):
+        return [item for item in data if isinstance(item, dict)]
+    if isinstance(data, dict):
+        for key in BATCH_KEYS:
+            items = data.get(key)
+            if isinstance(items, list) and items and all(isinstance(item, dict) for item in items):
+                return items
+    return [data]
+
+
+def _urls_in_text(text: str) -> List[str]:
+    """Image URLs in free text: content URIs, plus http(s) URLs with an image extension"""
+    urls = []
+    for match in _URL_TOKEN.finditer(text):
+        url = match.group(0).rstrip(".,;:)]}")
+        if parse_content_uri(url) is not None or _IMAGE_EXT.search(url):
+            urls.append(url)
+    return urls
+
+
+def _parse(data_dump: Union[str, Any]) -> Any:
+    if not isinstance(data_dump, str):
+        return data_dump
+    try:
+        return json.loads(data_dump)
+    except (json.JSONDecodeError, TypeError):
+        return None
+
+
+def extract_image_url(data_dump: Union[str, Any]) -> Optional[str]:
+    """
+    Best image URL of one NFT dump (JSON string, parsed JSON or free text)
+
+    For a batch dump, the first NFT's image is returned.
+    """
+    data = _parse(data_dump)
+    if data is None:
+        if not isinstance(data_dump, str):
+            return None
+        urls = _urls_in_text(data_dump)
+        if not urls:
+            return None
+        # Same storage preference as for JSON dumps
+        _, url = max(enumerate(urls), key=lambda item: (parse_content_uri(item[1]) is not None, -item[0]))
+        return url
+    records = split_batch(data)
+    candidates = find_image_candidates(records[0]) if records else []
+    return candidates[0].url if candidates else None
+
+
+def extract_image_urls(data_dump: Union[str, Any]) -> List[Optional[str]]:
+    """Best image URL per NFT of a (possibly batch) dump, in dump order"""
+    data = _parse(data_dump)
+    if data is None:
+        return [extract_image_url(data_dump)]
+    urls = []
+    for record in split_batch(data):
+        candidates = find_image_candidates(record)
+        urls.append(candidates[0].url if candidates else None)
+    return urls
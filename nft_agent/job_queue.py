@@ -0,0 +1,257 @@
+import os
+import time
+import asyncio
+import logging
+import itertools
+import contextvars
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from uuid import uuid4
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from resilience import job_deadline
+from metrics import job_trace
+from llm import LLM_MAX_CONCURRENCY
+from search import MAX_CONNECTIONS, MAX_PER_HOST
+
+# Worker slots: how many steps (analysis, search, curation) run at once. By
+# default enough for analyses and curations to use every LLM slot, or for
+# searches (each fanning out up to MAX_PER_HOST requests) to fill the HTTP
+# pool, whichever needs more; the LLM and HTTP limits still bound the calls.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", str(max(LLM_MAX_CONCURRENCY, MAX_CONNECTIONS // MAX_PER_HOST))))
+# Finished jobs kept for "status" lookups
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "1000"))
+
+# Lower runs first: a person waiting on a reply beats a backfill
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+# Queue job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+# (queue, {"held": bool}) of the job running in the current task, if any
+_slot: contextvars.ContextVar[Optional[Tuple["JobQueue", Dict]]] = contextvars.ContextVar("job_slot", default=None)
+
+
+class JobQueue:
+    """
+    In-process priority queue of pipeline steps with a fixed number of worker slots
+
+    Handlers submit a step and reply at once; as soon as a slot is free the
+    next job by priority (then submission order) starts, under a job
+    deadline. The step itself sends its results to the sender. A step that
+    has to wait on another one can hand its slot back for the wait (see
+    worker_released). Every job gets a short id whose progress can be
+    looked up with status(), and a metrics trace whose stage times and token
+    counts are copied onto the record.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, history: int = JOB_HISTORY):
+        self.workers = workers
+        self.history = history
+        self.jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._factories: Dict[str, Callable[[], Awaitable[None]]] = {}
+        self._loggers: Dict[str, logging.Logger] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+        self._seq = itertools.count()
+
+    def _ensure_started(self):
+        # Created lazily so the queue binds to the running event loop
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+            self._slots = asyncio.Semaphore(self.workers)
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    def submit(self, kind: str, factory: Callable[[], Awaitable[None]], sender: str,
+               artwork_id: Optional[str] = None, priority: int = PRIORITY_INTERACTIVE,
+               logger: Optional[logging.Logger] = None) -> Dict:
+        """
+        Queue one step
+
+        Args:
+            kind: Step name for status replies ("analysis", "search", "curate")
+            factory: Zero-argument coroutine function that runs the step
+            sender: Who asked for it
+            artwork_id: Artwork the step is about, if known
+            priority: PRIORITY_INTERACTIVE or PRIORITY_BATCH (lower runs first)
+            logger: Where failures of the step are logged
+
+        Returns:
+            The job record (job_id, kind, state, position, ...)
+        """
+        self._ensure_started()
+        job_id = uuid4().hex[:8]
+        job = {
+            "job_id": job_id,
+            "kind": kind,
+            "sender": sender,
+            "artwork_id": artwork_id,
+            "priority": priority,
+            "state": QUEUED,
+            "enqueued_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "error": None,
+        }
+        self.jobs[job_id] = job
+        self._factories[job_id] = factory
+        self._loggers[job_id] = logger or logging.getLogger("job_queue")
+        self._queue.put_nowait((priority, next(self._seq), job_id))
+        job["position"] = self.position(job_id)
+        return job
+
+    def position(self, job_id: str) -> Optional[int]:
+        """1-based place among queued jobs (None once the job has started)"""
+        job = self.jobs.get(job_id)
+        if job is None or job["state"] != QUEUED:
+            return None
+        # Jobs are kept in submission order, the queue's tie-break
+        ahead = 0
+        earlier = True
+        for other_id, other in self.jobs.items():
+            if other_id == job_id:
+                earlier = False
+            elif other["state"] == QUEUED and (
+                other["priority"] < job["priority"] or (earlier and other["priority"] == job["priority"])
+            ):
+                ahead += 1
+        return ahead + 1
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        """The job record with its current queue position, or None if unknown"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        return dict(job, position=self.position(job_id))
+
+    def list(self, sender: str) -> List[Dict]:
+        """This sender's jobs, newest first"""
+        return [self.status(job_id) for job_id, job in reversed(self.jobs.items()) if job["sender"] == sender]
+
+    def stats(self) -> Dict[str, int]:
+        counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0, CANCELLED: 0}
+        for job in self.jobs.values():
+            counts[job["state"]] += 1
+        return counts
+
+    async def _dispatch(self):
+        # Start the next job whenever a slot is free. The slot is only taken
+        # once there is work, so a job taking its slot back is never stuck
+        # behind an idle dispatcher.
+        while True:
+            item = await self._queue.get()
+            await self._slots.acquire()
+            # Something more urgent may have been queued while waiting for the slot
+            self._queue.put_nowait(item)
+            self._queue.task_done()
+            _, _, job_id = self._queue.get_nowait()
+            task = asyncio.create_task(self._run(job_id))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, job_id: str):
+        slot = {"held": True}
+        _slot.set((self, slot))
+        job = self.jobs.get(job_id)
+        factory = self._factories.pop(job_id, None)
+        logger = self._loggers.pop(job_id, None)
+        try:
+            if job is None or factory is None or job["state"] != QUEUED:
+                return
+            job["state"] = RUNNING
+            job["started_at"] = time.time()
+            trace = None
+            try:
+                with job_deadline(), job_trace(job_id, job["kind"], artwork_id=job["artwork_id"]) as trace:
+                    await factory()
+                job["state"] = DONE
+            except asyncio.CancelledError:
+                job["state"] = CANCELLED
+                raise
+            except Exception as e:
+                job["state"] = FAILED
+                job["error"] = str(e)
+                logger.exception(f"Job {job_id} ({job['kind']}) failed")
+            finally:
+                job["finished_at"] = time.time()
+                if trace is not None:
+                    job["stages"] = trace.stage_seconds()
+                    job["tokens"] = dict(trace.tokens)
+                self._trim()
+        finally:
+            if slot["held"]:
+                self._slots.release()
+            self._queue.task_done()
+
+    def _trim(self):
+        """Forget the oldest finished jobs beyond the history limit"""
+        finished = [job_id for job_id, job in self.jobs.items() if job["state"] in (DONE, FAILED, CANCELLED)]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self.jobs[job_id]
+
+    async def join(self):
+        """Wait until every queued job has finished"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def stop(self):
+        """Stop starting jobs (running jobs are cancelled, queued ones dropped)"""
+        tasks = list(self._running) + ([self._dispatcher] if self._dispatcher else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._dispatcher = None
+        for job in self.jobs.values():
+            if job["state"] == QUEUED:
+                job["state"] = CANCELLED
+        self._factories.clear()
+        self._loggers.clear()
+
+
+@asynccontextmanager
+async def worker_released():
+    """
+    Hand the running job's slot to the next queued job for the duration of the block
+
+    For steps that wait on another job (e.g. the first token of a collection
+    being analyzed) so the wait does not hold back other senders' steps.
+    The slot is taken back, waiting for a free one if need be, when the
+    block exits. Outside a queued job this does nothing.
+    """
+    current = _slot.get()
+    if current is None or not current[1]["held"]:
+        yield
+        return
+    queue, slot = current
+    slot["held"] = False
+    queue._slots.release()
+    try:
+        yield
+    finally:
+        await queue._slots.acquire()
+        slot["held"] = True
+
+
+_job_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    """Return the agent-wide job queue"""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue()
+    return _job_queue
+
+
+async def close_job_queue():
+    """Stop the worker pool (call on agent shutdown)"""
+    if _job_queue is not None:
+        await _job_queue.stop()
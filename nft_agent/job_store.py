@@ -0,0 +1,288 @@
+import os
+import json
+import time
+import uuid
+from typing import Dict, List, Optional
+from disk_cache import DiskCache
+
+# How long an idle job is kept before eviction
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", str(24 * 3600)))
+# A job left in a running state this long without an update is treated as dead
+# (well past JOB_DEADLINE_SECONDS, which bounds every step)
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", str(3600)))
+# Payload files are deleted with their job; this only bounds leftovers from a crash
+JOB_PAYLOAD_TTL = int(os.getenv("JOB_PAYLOAD_TTL", str(7 * 24 * 3600)))
+JOB_PAYLOAD_MAX_ENTRIES = int(os.getenv("JOB_PAYLOAD_MAX_ENTRIES", "20000"))
+
+# Job states, in pipeline order
+ANALYZING = "analyzing"
+ANALYZED = "analyzed"
+SEARCHING = "searching"
+SEARCHED = "searched"
+CURATING = "curating"
+CURATED = "curated"
+FAILED = "failed"
+
+# Which states a job may move to from each state. Steps can be re-run
+# (e.g. "search" again after a partial result), so completed states loop back.
+TRANSITIONS = {
+    ANALYZING: {ANALYZED, FAILED},
+    ANALYZED: {ANALYZING, SEARCHING, CURATING},
+    SEARCHING: {SEARCHED, FAILED},
+    SEARCHED: {ANALYZING, SEARCHING, CURATING},
+    CURATING: {CURATED, FAILED},
+    CURATED: {ANALYZING, SEARCHING, CURATING},
+    FAILED: {ANALYZING, SEARCHING, CURATING},
+}
+# States a step is still working in; nothing else may start until it leaves them
+RUNNING = {ANALYZING, SEARCHING, CURATING}
+
+INDEX_KEY = "jobs:index"
+# Step results kept outside the agent storage, which rewrites its whole file on every set
+PAYLOAD_FIELDS = ("data_dump", "analysis", "search_results", "curation", "raw_curation_response")
+
+
+class InvalidTransition(Exception):
+    """Raised when a job is moved to a state it cannot reach"""
+
+
+class JobRunning(InvalidTransition):
+    """Raised when a job is restarted while one of its steps is still running"""
+
+    def __init__(self, job: Dict):
+        super().__init__(f"`{job['artwork_id']}` is still {job['state']}")
+        self.job = job
+
+
+class JobStore:
+    """
+    Per-sender, per-artwork job state kept in the agent's storage
+
+    Each job lives under its own key (job:<sender>:<artwork_id>) so concurrent
+    users and artworks never overwrite each other. An index of job keys
+    drives TTL eviction and restart recovery, and each sender's most recent
+    artwork is remembered so plain "search" / "curate" commands still work.
+
+    The agent storage rewrites its whole file on every set, so it only holds
+    the small job records. The PAYLOAD_FIELDS (dump, analysis, search results,
+    curation) go to a DiskCache, each written once when its step finishes,
+    and the index is only rewritten when a job is added or removed.
+    """
+
+    def __init__(self, storage, ttl: int = JOB_TTL_SECONDS, stale_after: int = JOB_STALE_SECONDS,
+                 payloads: Optional[DiskCache] = None):
+        self.storage = storage
+        self.ttl = ttl
+        self.stale_after = stale_after
+        self.payloads = payloads if payloads is not None else get_job_payloads()
+
+    @staticmethod
+    def _job_key(sender: str, artwork_id: str) -> str:
+        return f"job:{sender}:{artwork_id}"
+
+    @staticmethod
+    def _active_key(sender: str) -> str:
+        return f"jobs:active:{sender}"
+
+    @staticmethod
+    def _payload_key(job: Dict, field: str) -> str:
+        # Keyed by a per-run id: a rename keeps them, a re-run never sees the last run's
+        return f"{job['payload_id']}:{field}"
+
+    def _index(self) -> List[str]:
+        raw = self.storage.get(INDEX_KEY)
+        # Older indexes map each key to its update time
+        return list(json.loads(raw)) if raw else []
+
+    def _save(self, job: Dict, changed=()):
+        """Write the job record, plus the payload fields in `changed`"""
+        if "payload_id" not in job:
+            # A record from before payloads moved out: store all of them once
+            job["payload_id"] = uuid.uuid4().hex
+            changed = [field for field in PAYLOAD_FIELDS if job.get(field) is not None]
+        for field in changed:
+            if field in PAYLOAD_FIELDS:
+                self.payloads.set(self._payload_key(job, field), job[field])
+        key = self._job_key(job["sender"], job["artwork_id"])
+        job["updated_at"] = time.time()
+        self.storage.set(key, json.dumps({k: v for k, v in job.items() if k not in PAYLOAD_FIELDS}))
+        index = self._index()
+        if key not in index:
+            self.storage.set(INDEX_KEY, json.dumps(index + [key]))
+
+    def _load(self, key: str) -> Optional[Dict]:
+        """The job record under key, without its payloads"""
+        raw = self.storage.get(key)
+        return json.loads(raw) if raw else None
+
+    def _delete_payloads(self, job: Optional[Dict]):
+        if job and "payload_id" in job:
+            for field in PAYLOAD_FIELDS:
+                self.payloads.delete(self._payload_key(job, field))
+
+    def _delete(self, key: str, payloads: bool = True):
+        job = self._load(key)
+        if job is not None:
+            self.storage.remove(key)
+            if payloads:
+                self._delete_payloads(job)
+        index = self._index()
+        if key in index:
+            index.remove(key)
+            self.storage.set(INDEX_KEY, json.dumps(index))
+
+    def _set_active(self, sender: str, artwork_id: str):
+        if self.active_artwork(sender) != artwork_id:
+            self.storage.set(self._active_key(sender), artwork_id)
+
+    def create(self, sender: str, artwork_id: str, data_dump: str) -> Dict:
+        """
+        Start (or restart) a job for this sender and artwork
+
+        Returns:
+            The new job record in the ANALYZING state
+
+        Raises:
+            JobRunning: if a step of the existing job is still running
+        """
+        existing = self.get(sender, artwork_id)
+        if existing and existing["state"] in RUNNING:
+            raise JobRunning(existing)
+        # The record itself is overwritten below
+        self._delete_payloads(existing)
+        now = time.time()
+        job = {
+            "sender": sender,
+            "artwork_id": artwork_id,
+            "state": ANALYZING,
+            "created_at": now,
+            "payload_id": uuid.uuid4().hex,
+            "data_dump": data_dump,
+            "analysis": None,
+            "search_results": None,
+            "curation": None,
+            "error": None,
+        }
+        self._save(job, changed=["data_dump"])
+        self._set_active(sender, artwork_id)
+        return job
+
+    def active_artwork(self, sender: str) -> Optional[str]:
+        """The artwork this sender touched most recently"""
+        return self.storage.get(self._active_key(sender))
+
+    def get(self, sender: str, artwork_id: Optional[str] = None) -> Optional[Dict]:
+        """
+        Load a job, defaulting to the sender's active artwork
+
+        Expired jobs are evicted on read and reported as missing. A job
+        stuck in a running state past stale_after is marked FAILED.
+        """
+        artwork_id = artwork_id or self.active_artwork(sender)
+        if not artwork_id:
+            return None
+        key = self._job_key(sender, artwork_id)
+        job = self._load(key)
+        if job is None:
+            return None
+        if time.time() - job.get("updated_at", 0) > self.ttl:
+            self._delete(key)
+            return None
+        if job["state"] in RUNNING and time.time() - job.get("updated_at", 0) > self.stale_after:
+            job = self.interrupt(job, f"No progress while {job['state']} for {self.stale_after}s")
+        if "payload_id" in job:
+            for field in PAYLOAD_FIELDS:
+                job[field] = self.payloads.get(self._payload_key(job, field))
+        return job
+
+    def list(self, sender: str) -> List[Dict]:
+        """All live jobs for a sender (job summaries, without payloads)"""
+        prefix = f"job:{sender}:"
+        jobs = []
+        cutoff = time.time() - self.ttl
+        for key in self._index():
+            job = self._load(key) if key.startswith(prefix) else None
+            if job and job.get("updated_at", 0) >= cutoff:
+                jobs.append({k: job[k] for k in ("artwork_id", "state", "updated_at")})
+        return jobs
+
+    def transition(self, job: Dict, state: str, **fields) -> Dict:
+        """
+        Move a job to a new state, storing any result fields with it
+
+        Raises:
+            InvalidTransition: if the current state cannot reach the new one
+        """
+        if state not in TRANSITIONS.get(job["state"], set()):
+            raise InvalidTransition(f"Cannot move job {job['artwork_id']} from {job['state']} to {state}")
+        job.update(fields)
+        job["state"] = state
+        self._save(job, changed=fields)
+        return job
+
+    def interrupt(self, job: Dict, reason: str) -> Dict:
+        """
+        Mark a job FAILED if one of its steps was running (cancelled, restarted
+        or stuck), so the sender can run the step again
+        """
+        if job["state"] in RUNNING:
+            job = self.transition(job, FAILED, error=reason)
+        return job
+
+    def recover_interrupted(self, reason: str = "Interrupted by an agent restart") -> int:
+        """
+        Fail every job left running by a previous process (call on startup)
+
+        Returns:
+            Number of jobs marked FAILED
+        """
+        recovered = 0
+        for key in self._index():
+            job = self._load(key)
+            if job and job["state"] in RUNNING:
+                self.interrupt(job, reason)
+                recovered += 1
+        return recovered
+
+    def rename(self, job: Dict, artwork_id: str) -> Dict:
+        """
+        Re-key a job once analysis has revealed the real artwork id
+        """
+        if artwork_id == job["artwork_id"]:
+            return job
+        # A job already under the new id is replaced
+        self._delete_payloads(self._load(self._job_key(job["sender"], artwork_id)))
+        self._delete(self._job_key(job["sender"], job["artwork_id"]), payloads=False)
+        job["artwork_id"] = artwork_id
+        self._save(job)
+        self._set_active(job["sender"], artwork_id)
+        return job
+
+    def evict_expired(self) -> int:
+        """
+        Drop every job idle for longer than the TTL
+
+        Returns:
+            Number of jobs evicted
+        """
+        cutoff = time.time() - self.ttl
+        index = self._index()
+        expired = [key for key in index if (self._load(key) or {}).get("updated_at", 0) < cutoff]
+        for key in expired:
+            self._delete_payloads(self._load(key))
+            if self.storage.has(key):
+                self.storage.remove(key)
+        if expired:
+            self.storage.set(INDEX_KEY, json.dumps([key for key in index if key not in expired]))
+        return len(expired)
+
+
+_job_payloads: Optional[DiskCache] = None
+
+
+def get_job_payloads() -> DiskCache:
+    """Return the agent-wide store of job payloads"""
+    global _job_payloads
+    if _job_payloads is None:
+        _job_payloads = DiskCache("jobs", ttl=JOB_PAYLOAD_TTL, max_entries=JOB_PAYLOAD_MAX_ENTRIES)
+    return _job_payloads
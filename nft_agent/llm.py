@@ -0,0 +1,127 @@
+import os
+import asyncio
+from typing import Optional
+import openai
+from openai import AsyncOpenAI
+from resilience import call_with_retry
+from metrics import record_tokens
+
+# ASI-1 endpoint and concurrency settings
+ASI1_BASE_URL = os.getenv("ASI1_BASE_URL", "https://api.asi1.ai/v1")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "600"))
+# Ask streamed completions for a final usage chunk (turned off automatically if the API rejects it)
+LLM_STREAM_USAGE = os.getenv("LLM_STREAM_USAGE", "true").lower() in ("1", "true", "yes")
+
+
+class LLMClient:
+    """Async ASI-1 client with a cap on in-flight completions"""
+
+    def __init__(self, api_key: str, base_url: str = ASI1_BASE_URL,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY):
+        # You can get an ASI-1 api key by creating an account at https://asi1.ai/dashboard/api-keys
+        # Retries are done by call_with_retry (backoff, Retry-After, circuit breaker), not the SDK
+        self.client = AsyncOpenAI(base_url=base_url, api_key=api_key, timeout=LLM_TIMEOUT, max_retries=0)
+        self.max_concurrency = max_concurrency
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._stream_usage = LLM_STREAM_USAGE
+
+    async def chat(self, **kwargs):
+        """
+        Create a chat completion without blocking the event loop
+
+        Throttling, 5xx and connection errors are retried with backoff; the
+        concurrency slot is released while waiting between attempts.
+
+        Args:
+            **kwargs: Passed straight to chat.completions.create (model, messages, ...)
+
+        Returns:
+            The ChatCompletion response
+        """
+        async def attempt():
+            async with self._slots:
+                return await self.client.chat.completions.create(**kwargs)
+
+        response = await call_with_retry(_endpoint(kwargs), attempt, attempt_timeout=LLM_TIMEOUT,
+                                         retry_on=(openai.APIConnectionError,))
+        record_tokens(kwargs.get("model", "default"), getattr(response, "usage", None))
+        return response
+
+    async def stream_chat(self, **kwargs):
+        """
+        Stream a chat completion, yielding text deltas as they arrive
+
+        The concurrency slot is held until the stream is exhausted or closed.
+        Opening the stream is retried like chat(); a stream that breaks after
+        text has been yielded is not restarted. Token usage is recorded from
+        the final usage chunk when the API sends one.
+
+        Args:
+            **kwargs: Passed straight to chat.completions.create (stream is forced on)
+
+        Yields:
+            (text_delta, finish_reason) - finish_reason is None until the last chunk
+        """
+        async def attempt():
+            await self._slots.acquire()
+            try:
+                if self._stream_usage:
+                    try:
+                        return await self.client.chat.completions.create(
+                            stream=True, stream_options={"include_usage": True}, **kwargs)
+                    except openai.BadRequestError as e:
+                        if "stream_options" not in str(e):
+                            raise
+                        # Endpoint without usage chunks: stop asking
+                        self._stream_usage = False
+                return await self.client.chat.completions.create(stream=True, **kwargs)
+            except BaseException:
+                self._slots.release()
+                raise
+
+        stream = await call_with_retry(_endpoint(kwargs), attempt, attempt_timeout=LLM_TIMEOUT,
+                                       retry_on=(openai.APIConnectionError,))
+        try:
+            async for chunk in stream:
+                # With include_usage the last chunk carries token counts and no choices
+                record_tokens(kwargs.get("model", "default"), getattr(chunk, "usage", None))
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                text = choice.delta.content if choice.delta else None
+                if text or choice.finish_reason:
+                    yield text or "", choice.finish_reason
+        finally:
+            await stream.close()
+            self._slots.release()
+
+    async def aclose(self):
+        """Close the underlying HTTP client"""
+        await self.client.close()
+
+
+def _endpoint(kwargs) -> str:
+    """Circuit breaker name: one per model, so an overloaded model does not block the others"""
+    return f"asi1:{kwargs.get('model', 'default')}"
+
+
+_llm: Optional[LLMClient] = None
+
+
+def get_llm() -> LLMClient:
+    """
+    Return the agent-wide LLM client so the concurrency limit is shared
+    """
+    global _llm
+    if _llm is None:
+        _llm = LLMClient(os.getenv("ASI1_API_KEY"))
+    return _llm
+
+
+async def close_llm():
+    """Release the LLM client's connections (call on agent shutdown)"""
+    global _llm
+    if _llm is not None:
+        await _llm.aclose()
+        _llm = None
@@ -0,0 +1,344 @@
+import re
+import json
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+
+class IncrementalObjectParser:
+    """
+    Incremental parser for one streamed JSON object
+
+    Feed it text chunks as they arrive; every time a top-level member
+    ("card_2_art_visuals": {...}) closes, it is parsed and returned. Text
+    before the first "{" (e.g. a markdown fence) is ignored. Members that
+    completed before a truncated ending are kept in .members.
+    """
+
+    def __init__(self):
+        self.members: Dict[str, Any] = {}
+        self.closed = False
+        self._buffer = ""
+        self._pos = 0             # next character to scan
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Consume a chunk of model output
+
+        Returns:
+            (key, value) pairs for the top-level members completed by this chunk
+        """
+        if self.closed:
+            return []
+        self._buffer += chunk
+        completed = []
+        buffer = self._buffer
+        i = self._pos
+        while i < len(buffer):
+            ch = buffer[i]
+            if self._depth == 0:
+                # Still looking for the opening brace
+                if ch == "{":
+                    self._depth = 1
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._member_start is None:
+                    self._member_start = i
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                if self._depth == 1:
+                    member = self._close_member(i)
+                    if member:
+                        completed.append(member)
+                    self._depth = 0
+                    self.closed = True
+                    i += 1
+                    break
+                self._depth -= 1
+            elif ch == "," and self._depth == 1:
+                member = self._close_member(i)
+                if member:
+                    completed.append(member)
+            i += 1
+
+        # Drop text that can no longer be part of an unfinished member
+        keep_from = self._member_start if self._member_start is not None else i
+        self._buffer = buffer[keep_from:]
+        if self._member_start is not None:
+            self._member_start = 0
+        self._pos = i - keep_from
+        return completed
+
+    def _close_member(self, end: int) -> Optional[Tuple[str, Any]]:
+        start = self._member_start
+        self._member_start = None
+        if start is None:
+            return None
+        try:
+            parsed = json.loads("{" + self._buffer[start:end] + "}")
+        except json.JSONDecodeError:
+            return None
+        key, value = next(iter(parsed.items()))
+        self.members[key] = value
+        return key, value
+
+
+
+class ParseResult(NamedTuple):
+    """
+    Outcome of parse_llm_json
+
+    value: the recovered object (None if nothing could be recovered)
+    repaired: the text needed fixing (trailing commas, unclosed brackets...)
+    truncated: the object was cut off before its closing brace
+    incomplete_key: top-level member that was still being written at the
+        cutoff; its value is only partially there
+    """
+    value: Optional[Dict[str, Any]]
+    repaired: bool = False
+    truncated: bool = False
+    incomplete_key: Optional[str] = None
+
+
+_decoder = json.JSONDecoder(strict=False)
+_PARTIAL_UNICODE_ESCAPE = re.compile(r"\\u[0-9a-fA-F]{0,3}$")
+_LITERAL_CHARS = frozenset("0123456789+-.eEtruefalsn")
+_WHITESPACE = frozenset(" \t\r\n")
+
+
+def repair_json(text: str, start: int = 0) -> Tuple[str, bool, Optional[str]]:
+    """
+    Rewrite the object starting at text[start] ("{") into valid JSON, in one pass
+
+    Drops trailing commas and closes mismatched brackets. When the text ends
+    early it closes an open string value, cuts an unfinished key or literal
+    back to the last complete value, and closes every open bracket. Text
+    after the outermost object is ignored.
+
+    Returns:
+        (json_text, truncated, incomplete_key)
+    """
+    out: List[str] = []
+    stack: List[str] = []          # open "{" / "["
+    expect_key: List[bool] = []    # per open container: next string is an object key
+    in_string = False
+    string_is_key = False
+    escape = False
+    pending_comma = False
+    in_literal = False
+    literal_start = 0
+    safe = (0, 0)                  # (len(out), len(stack)) where closing brackets gives valid JSON
+    top_key: Optional[str] = None  # top-level member whose value is being written
+    key_start = 0
+
+    def value_done():
+        nonlocal safe, top_key
+        expect_key[-1] = False
+        if len(stack) == 1:
+            top_key = None
+        safe = (len(out), len(stack))
+
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+                if not string_is_key:
+                    value_done()
+                else:
+                    expect_key[-1] = False
+                    if len(stack) == 1:
+                        top_key = json.loads("".join(out[key_start:]))
+            continue
+
+        if in_literal and ch not in _LITERAL_CHARS:
+            in_literal = False
+            value_done()
+        if ch in _WHITESPACE:
+            continue
+        if pending_comma:
+            pending_comma = False
+            if ch not in "}]":
+                out.append(",")
+                expect_key[-1] = stack[-1] == "{"
+        if ch == '"':
+            in_string = True
+            string_is_key = stack[-1] == "{" and expect_key[-1]
+            key_start = len(out)
+            out.append(ch)
+        elif ch in "{[":
+            if stack and stack[-1] == "{" and expect_key[-1]:
+                break  # a container where a key belongs: not JSON any more
+            out.append(ch)
+            stack.append(ch)
+            expect_key.append(ch == "{")
+            safe = (len(out), len(stack))
+        elif ch in "}]":
+            # Close whatever is actually open, even if the model used the wrong bracket
+            opener = stack.pop()
+            expect_key.pop()
+            out.append("}" if opener == "{" else "]")
+            if not stack:
+                return "".join(out), False, None
+            value_done()
+        elif ch == ",":
+            pending_comma = True
+        elif ch == ":":
+            out.append(ch)
+        else:
+            if not in_literal:
+                in_literal = True
+                literal_start = len(out)
+            out.append(ch)
+
+    # The text ended inside the object; whatever member was open is partial
+    incomplete_key = top_key
+    if in_string and not string_is_key:
+        if escape:
+            out.pop()
+        tail = "".join(out[-6:])
+        partial = _PARTIAL_UNICODE_ESCAPE.search(tail)
+        if partial:
+            del out[len(out) - (len(tail) - partial.start()):]
+        out.append('"')
+        value_done()
+    elif in_literal and _is_complete_literal("".join(out[literal_start:])):
+        value_done()
+    length, depth = safe
+    del out[length:]
+    del stack[depth:]
+    closers = "".join("}" if opener == "{" else "]" for opener in reversed(stack))
+    return "".join(out) + closers, True, incomplete_key
+
+
+def _is_complete_literal(token: str) -> bool:
+    try:
+        json.loads(token)
+        return True
+    except json.JSONDecodeError:
+        return False
+
+
+def parse_llm_json(text: str) -> ParseResult:
+    """
+    Recover the outermost JSON object from model output
+
+    Markdown fences and prose around the object are skipped without
+    copying the text. Well-formed output is decoded in one C-speed pass;
+    only broken output goes through repair_json (trailing commas, unclosed
+    strings or brackets after a max_tokens cutoff).
+
+    Returns:
+        ParseResult; value is None when the text holds no object at all
+    """
+    start = text.find("{") if text else -1
+    while start != -1:
+        try:
+            value, _ = _decoder.raw_decode(text, start)
+            if isinstance(value, dict):
+                return ParseResult(value)
+        except json.JSONDecodeError:
+            pass
+        repaired, truncated, incomplete_key = repair_json(text, start)
+        try:
+            value = _decoder.decode(repaired)
+        except json.JSONDecodeError:
+            value = None
+        if isinstance(value, dict):
+            return ParseResult(value, True, truncated, incomplete_key)
+        # A stray "{" in leading prose: try the next one
+        start = text.find("{", start + 1)
+    return ParseResult(None)
+
+
+def shape_problems(value: Any, sample: Any, path: str = "") -> List[str]:
+    """
+    Where value departs from the structure of a sample document
+
+    Objects must have every key the sample has, lists must be lists (their
+    items are checked against the sample's first item) and placeholders may
+    be any scalar or null, since the sample's leaves are instructions rather
+    than types.
+
+    Returns:
+        Problems as "path: description", empty when the shape matches
+    """
+    if isinstance(sample, dict):
+        if not isinstance(value, dict):
+            return [f"{path or '<root>'}: expected an object, got {type(value).__name__}"]
+        problems = []
+        for key, child in sample.items():
+            child_path = f"{path}.{key}" if path else key
+            if key not in value:
+                problems.append(f"{child_path}: missing")
+            else:
+                problems.extend(shape_problems(value[key], child, child_path))
+        return problems
+    if isinstance(sample, list):
+        if value is None:
+            return []
+        if not isinstance(value, list):
+            return [f"{path}: expected a list, got {type(value).__name__}"]
+        if sample:
+            problems = []
+            for index, item in enumerate(value):
+                problems.extend(shape_problems(item, sample[0], f"{path}[{index}]"))
+            return problems
+        return []
+    if isinstance(value, (dict, list)):
+        return [f"{path}: expected a value, got {type(value).__name__}"]
+    return []
+
+
+def missing_parts(value: Any, sample: Any) -> Any:
+    """
+    The part of a sample document that value lacks or gets wrong
+
+    The result is shaped like the sample but holds only the missing or
+    mis-typed members, so a follow-up request can ask for exactly those.
+    A list with a bad item is returned whole.
+
+    Returns:
+        The missing part of the sample, or None when value matches it
+    """
+    if isinstance(sample, dict):
+        if not isinstance(value, dict):
+            return sample
+        missing = {}
+        for key, child in sample.items():
+            part = missing_parts(value[key], child) if key in value else child
+            if part is not None:
+                missing[key] = part
+        return missing or None
+    if isinstance(sample, list):
+        if value is None:
+            return None
+        if not isinstance(value, list) or (sample and any(missing_parts(item, sample[0]) is not None for item in value)):
+            return sample
+        return None
+    return sample if isinstance(value, (dict, list)) else None
+
+
+def deep_merge(base: Any, patch: Any) -> Any:
+    """patch merged into base: objects are merged key by key, anything else is replaced"""
+    if isinstance(base, dict) and isinstance(patch, dict):
+        merged = dict(base)
+        for key, value in patch.items():
+            merged[key] = deep_merge(base.get(key), value)
+        return merged
+    return patch
@@ -0,0 +1,248 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import tempfile
+import logging
+import threading
+import traceback
+from collections import deque
+from typing import Dict, List, Optional
+from metrics import REGISTRY
+
+# Diagnostic mode: time every event-loop callback and report the ones that block
+LOOP_MONITOR = os.getenv("LOOP_MONITOR", "false").lower() in ("1", "true", "yes")
+# A callback running longer than this (ms) without yielding is a stall
+LOOP_SLOW_MS = float(os.getenv("LOOP_SLOW_MS", "100"))
+# JSON report, rewritten periodically and on shutdown (in the temp dir, not the working tree)
+LOOP_REPORT_FILE = os.getenv("LOOP_REPORT_FILE", os.path.join(tempfile.gettempdir(), "nft_agent_loop_report.json"))
+# Optional sampling profiler of the loop thread while it is busy, and its sample interval (ms)
+LOOP_PROFILE = os.getenv("LOOP_PROFILE", "false").lower() in ("1", "true", "yes")
+LOOP_PROFILE_INTERVAL_MS = float(os.getenv("LOOP_PROFILE_INTERVAL_MS", "10"))
+# Optional folded-stack file of the samples (flamegraph.pl / speedscope input)
+LOOP_PROFILE_FILE = os.getenv("LOOP_PROFILE_FILE", "")
+# Individual stalls kept for the report (aggregates cover all of them)
+LOOP_MAX_STALLS = int(os.getenv("LOOP_MAX_STALLS", "100"))
+
+STALL_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+LOOP_STALLS = REGISTRY.counter(
+    "nft_agent_loop_stalls_total", "Event-loop callbacks that ran past LOOP_SLOW_MS", ("callback",))
+LOOP_STALL_SECONDS = REGISTRY.histogram(
+    "nft_agent_loop_stall_seconds", "Duration of event-loop stalls", (), STALL_BUCKETS)
+
+logger = logging.getLogger("loop_monitor")
+
+_original_run = asyncio.events.Handle._run
+
+
+def describe_callback(handle: asyncio.Handle) -> str:
+    """Coroutine name for task steps, otherwise the callback's qualified name"""
+    callback = getattr(handle, "_callback", None)
+    owner = getattr(callback, "__self__", None)
+    if isinstance(owner, asyncio.Task):
+        coro = owner.get_coro()
+        return getattr(coro, "__qualname__", None) or repr(coro)
+    return getattr(callback, "__qualname__", None) or repr(callback)
+
+
+def _frames(frame) -> List[traceback.FrameSummary]:
+    """Stack of the loop thread below the monitored callback, outermost first"""
+    stack = traceback.extract_stack(frame)
+    for index in range(len(stack) - 1, -1, -1):
+        if stack[index].filename == __file__:
+            # Skip asyncio's own Handle._run frame as well
+            return stack[index + 2:]
+    return stack
+
+
+def _site(frame: traceback.FrameSummary) -> str:
+    return f"{os.path.basename(frame.filename)}:{frame.lineno} {frame.name}"
+
+
+class LoopMonitor:
+    """
+    Times every callback the event loop runs and reports the ones that block it
+
+    asyncio runs each task step and callback through Handle._run; while the
+    monitor is installed, that call is timed on the monitored loop's thread
+    (two clock reads per callback). A watchdog thread notices a callback
+    still running after the threshold and grabs the loop thread's stack at
+    that moment, which points at the blocking call itself (a synchronous
+    HTTP request, a large json.loads, image decoding). With profile=True the
+    watchdog also samples that stack every profile_interval while the loop
+    is busy, so hot handlers show up even when no single call is slow.
+    """
+
+    def __init__(self, threshold: float = LOOP_SLOW_MS / 1000, profile: bool = LOOP_PROFILE,
+                 profile_interval: float = LOOP_PROFILE_INTERVAL_MS / 1000, max_stalls: int = LOOP_MAX_STALLS):
+        self.threshold = threshold
+        self.profile = profile
+        self.profile_interval = profile_interval
+        self.thread_id: Optional[int] = None
+        self.started_at = time.time()
+        self.callbacks = 0
+        self.busy_seconds = 0.0
+        self.stalls: deque = deque(maxlen=max_stalls)
+        self.by_site: Dict[str, Dict] = {}
+        self.samples: Dict[str, int] = {}
+        self.sample_count = 0
+        # (sequence, perf_counter at start) of the callback now running, or None
+        self._running = None
+        self._seq = 0
+        self._captured: Dict[int, List[traceback.FrameSummary]] = {}
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self):
+        """Install on the current thread's event loop (call from inside it)"""
+        global _monitor
+        self.thread_id = threading.get_ident()
+        self.started_at = time.time()
+        _monitor = self
+        asyncio.events.Handle._run = _timed_run
+        self._stop.clear()
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._watchdog.start()
+
+    def stop(self):
+        global _monitor
+        if _monitor is self:
+            _monitor = None
+            asyncio.events.Handle._run = _original_run
+        self._stop.set()
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    def _finished(self, handle: asyncio.Handle, seq: int, elapsed: float):
+        self.callbacks += 1
+        self.busy_seconds += elapsed
+        stack = None
+        if self._captured:
+            stack = self._captured.pop(seq, None)
+            # Only one callback runs at a time; anything else is a late capture
+            self._captured.clear()
+        if elapsed < self.threshold:
+            return
+        callback = describe_callback(handle)
+        site = _site(stack[-1]) if stack else "?"
+        LOOP_STALLS.inc(callback=callback)
+        LOOP_STALL_SECONDS.observe(elapsed)
+        self.stalls.append({
+            "at": time.time() - elapsed,
+            "duration_ms": round(elapsed * 1000, 1),
+            "callback": callback,
+            "site": site,
+            "stack": [f"{frame.filename}:{frame.lineno} in {frame.name}" for frame in stack or []],
+        })
+        entry = self.by_site.setdefault(f"{callback} @ {site}", {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        entry["count"] += 1
+        entry["total_ms"] += elapsed * 1000
+        entry["max_ms"] = max(entry["max_ms"], elapsed * 1000)
+        logger.warning(f"🐢 Event loop blocked {elapsed * 1000:.0f} ms by {callback} at {site}")
+
+    def _watch(self):
+        interval = min(self.threshold / 4, self.profile_interval) if self.profile else self.threshold / 4
+        while not self._stop.wait(interval):
+            running = self._running
+            if running is None:
+                continue
+            seq, started = running
+            overdue = time.perf_counter() - started >= self.threshold and seq not in self._captured
+            if not (overdue or self.profile):
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = _frames(frame)
+            del frame
+            if overdue and self._running is running:
+                self._captured[seq] = stack
+            if self.profile:
+                folded = ";".join(f"{frame.name} ({os.path.basename(frame.filename)}:{frame.lineno})" for frame in stack)
+                self.samples[folded] = self.samples.get(folded, 0) + 1
+                self.sample_count += 1
+
+    def report(self) -> Dict:
+        """Totals, worst blocking sites, recent stalls and (if profiling) the hottest stacks"""
+        uptime = max(time.time() - self.started_at, 1e-9)
+        sites = sorted(self.by_site.items(), key=lambda item: item[1]["total_ms"], reverse=True)
+        report = {
+            "generated_at": time.time(),
+            "threshold_ms": self.threshold * 1000,
+            "uptime_seconds": round(uptime, 1),
+            "callbacks": self.callbacks,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "busy_ratio": round(self.busy_seconds / uptime, 4),
+            "stalls": sum(entry["count"] for entry in self.by_site.values()),
+            "blocked_seconds": round(sum(entry["total_ms"] for entry in self.by_site.values()) / 1000, 3),
+            "worst": [
+                {"where": where, "count": entry["count"], "total_ms": round(entry["total_ms"], 1),
+                 "max_ms": round(entry["max_ms"], 1)}
+                for where, entry in sites[:20]
+            ],
+            "recent_stalls": list(self.stalls),
+        }
+        if self.profile:
+            hottest = sorted(self.samples.items(), key=lambda item: item[1], reverse=True)[:30]
+            report["profile"] = {
+                "interval_ms": self.profile_interval * 1000,
+                "samples": self.sample_count,
+                "hottest": [{"stack": stack, "samples": count} for stack, count in hottest],
+            }
+        return report
+
+    def write_report(self, path: str = LOOP_REPORT_FILE, profile_path: str = LOOP_PROFILE_FILE):
+        """Atomically replace path with report() (and profile_path with folded stacks)"""
+        for target, text in (
+            (path, json.dumps(self.report(), indent=2)),
+            (profile_path, "".join(f"{stack} {count}\n" for stack, count in self.samples.items())),
+        ):
+            if not target:
+                continue
+            tmp = target + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, target)
+
+
+_monitor: Optional[LoopMonitor] = None
+
+
+def _timed_run(handle: asyncio.Handle):
+    monitor = _monitor
+    # Other loops (e.g. in helper threads) run untimed
+    if monitor is None or threading.get_ident() != monitor.thread_id:
+        return _original_run(handle)
+    monitor._seq += 1
+    seq = monitor._seq
+    started = time.perf_counter()
+    monitor._running = (seq, started)
+    try:
+        return _original_run(handle)
+    finally:
+        monitor._running = None
+        monitor._finished(handle, seq, time.perf_counter() - started)
+
+
+def start_loop_monitor(enabled: bool = LOOP_MONITOR) -> Optional[LoopMonitor]:
+    """Start monitoring the running event loop (no-op unless LOOP_MONITOR is set)"""
+    if enabled and _monitor is None:
+        LoopMonitor().start()
+    return _monitor
+
+
+def write_loop_report():
+    """Rewrite LOOP_REPORT_FILE (and LOOP_PROFILE_FILE) if the monitor is running"""
+    if _monitor is not None:
+        _monitor.write_report()
+
+
+def stop_loop_monitor():
+    """Write the final report and uninstall the monitor (call on shutdown)"""
+    monitor = _monitor
+    if monitor is not None:
+        monitor.write_report()
+        monitor.stop()
@@ -0,0 +1,343 @@
+import os
+import json
+import time
+import asyncio
+import contextvars
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+# Prometheus text endpoint (GET /metrics, plus GET /traces); 0 disables it
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+# Optional snapshot of the same text, rewritten periodically (node_exporter textfile style)
+METRICS_FILE = os.getenv("METRICS_FILE", "")
+# Optional JSONL file receiving one trace per finished job, and how many traces stay in memory
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+TRACE_HISTORY = int(os.getenv("TRACE_HISTORY", "200"))
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 5000, 10000, 20000, 50000, 100000)
+
+
+def _label_text(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    """Monotonic count per label combination"""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        self.values[key] = self.values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_label_text(self.labels, key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label combination (p95 via histogram_quantile)"""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts (last one is +Inf), sum, count]
+        self.values: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        series = self.values.get(key)
+        if series is None:
+            series = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                labels = _label_text(self.labels, key, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {total:g}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, key)} {count}")
+        return lines
+
+
+class Registry:
+    """Every metric the agent exports, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self.metrics: Dict[str, Any] = {}
+
+    def counter(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self.metrics.setdefault(name, Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self.metrics.setdefault(name, Histogram(name, help, labels, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "nft_agent_stage_seconds", "Wall time of a pipeline stage", ("stage", "outcome"))
+UPSTREAM_SECONDS = REGISTRY.histogram(
+    "nft_agent_upstream_request_seconds", "Time to response of one upstream attempt", ("endpoint", "outcome"))
+UPSTREAM_RETRIES = REGISTRY.counter(
+    "nft_agent_upstream_retries_total", "Upstream attempts that were retried", ("endpoint",))
+CIRCUIT_OPEN = REGISTRY.counter(
+    "nft_agent_circuit_open_total", "Calls refused by an open circuit breaker", ("endpoint",))
+LLM_TOKENS = REGISTRY.counter(
+    "nft_agent_llm_tokens_total", "Tokens reported in the API usage field", ("model", "kind"))
+LLM_REQUEST_TOKENS = REGISTRY.histogram(
+    "nft_agent_llm_request_tokens", "Tokens per completion", ("model", "kind"), TOKEN_BUCKETS)
+CACHE_REQUESTS = REGISTRY.counter(
+    "nft_agent_cache_requests_total", "Cache lookups by result (hit, stale, miss)", ("cache", "result"))
+PARSE_OUTCOMES = REGISTRY.counter(
+    "nft_agent_parse_outcomes_total", "How LLM JSON was recovered", ("target", "outcome"))
+JOBS = REGISTRY.counter(
+    "nft_agent_jobs_total", "Finished jobs", ("kind", "outcome"))
+JOB_SECONDS = REGISTRY.histogram(
+    "nft_agent_job_seconds", "Wall time of a whole job", ("kind", "outcome"))
+
+
+class Trace:
+    """Timeline of one job: stage spans, upstream calls, token usage and parse outcomes"""
+
+    def __init__(self, job_id: str, kind: str, **attrs):
+        self.job_id = job_id
+        self.kind = kind
+        self.attrs = attrs
+        self.started_at = time.time()
+        self.outcome: Optional[str] = None
+        self.seconds: Optional[float] = None
+        self.spans: List[Dict] = []
+        self.tokens = {"prompt": 0, "completion": 0}
+        self.events: List[Dict] = []
+        self._t0 = time.monotonic()
+
+    def span(self, name: str, started: float, seconds: float, outcome: str, **attrs):
+        self.spans.append(dict(name=name, start=round(started - self._t0, 3),
+                               seconds=round(seconds, 3), outcome=outcome, **attrs))
+
+    def event(self, name: str, **attrs):
+        self.events.append(dict(name=name, at=round(time.monotonic() - self._t0, 3), **attrs))
+
+    def stage_seconds(self) -> Dict[str, float]:
+        """Total seconds per stage span (upstream calls excluded)"""
+        totals: Dict[str, float] = {}
+        for span in self.spans:
+            if span.get("type") != "upstream":
+                totals[span["name"]] = round(totals.get(span["name"], 0.0) + span["seconds"], 3)
+        return totals
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            **self.attrs,
+            "started_at": self.started_at,
+            "seconds": self.seconds,
+            "outcome": self.outcome,
+            "tokens": self.tokens,
+            "stages": self.stage_seconds(),
+            "spans": self.spans,
+            "events": self.events,
+        }
+
+
+_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("job_trace", default=None)
+recent_traces: "deque[Dict]" = deque(maxlen=TRACE_HISTORY)
+
+
+def current_trace() -> Optional[Trace]:
+    return _trace.get()
+
+
+@contextmanager
+def job_trace(job_id: str, kind: str, **attrs):
+    """
+    Collect everything recorded inside the block (and tasks it starts) into one Trace
+
+    On exit the trace is kept in recent_traces and appended to TRACE_FILE.
+    """
+    trace = Trace(job_id, kind, **attrs)
+    token = _trace.set(trace)
+    try:
+        yield trace
+        trace.outcome = trace.outcome or "ok"
+    except BaseException as e:
+        trace.outcome = "cancelled" if isinstance(e, asyncio.CancelledError) else "error"
+        raise
+    finally:
+        _trace.reset(token)
+        trace.seconds = round(time.monotonic() - trace._t0, 3)
+        JOBS.inc(kind=kind, outcome=trace.outcome)
+        JOB_SECONDS.observe(trace.seconds, kind=kind, outcome=trace.outcome)
+        record = trace.to_dict()
+        recent_traces.append(record)
+        if TRACE_FILE:
+            try:
+                with open(TRACE_FILE, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            except OSError:
+                pass
+
+
+@contextmanager
+def timed(stage: str, **attrs):
+    """
+    Time a pipeline stage into nft_agent_stage_seconds and the current trace
+
+    Yields a dict; set its "outcome" for stages that report failure without
+    raising (e.g. analyze_nft_data returning an error dict).
+    """
+    span = {"outcome": "ok"}
+    started = time.monotonic()
+    try:
+        yield span
+    except BaseException:
+        span["outcome"] = "error"
+        raise
+    finally:
+        seconds = time.monotonic() - started
+        STAGE_SECONDS.observe(seconds, stage=stage, outcome=span["outcome"])
+        trace = _trace.get()
+        if trace is not None:
+            trace.span(stage, started, seconds, span["outcome"], **attrs)
+
+
+def record_upstream(endpoint: str, started: float, outcome: str):
+    """One upstream attempt (started is a time.monotonic() value)"""
+    seconds = time.monotonic() - started
+    UPSTREAM_SECONDS.observe(seconds, endpoint=endpoint, outcome=outcome)
+    trace = _trace.get()
+    if trace is not None:
+        trace.span(endpoint, started, seconds, outcome, type="upstream")
+
+
+def record_tokens(model: str, usage: Any):
+    """Token counts from a completion's usage field (object or dict); ignores None"""
+    if usage is None:
+        return
+    get = usage.get if isinstance(usage, dict) else lambda name: getattr(usage, name, None)
+    trace = _trace.get()
+    for kind in ("prompt", "completion"):
+        count = get(f"{kind}_tokens")
+        if not count:
+            continue
+        LLM_TOKENS.inc(count, model=model, kind=kind)
+        LLM_REQUEST_TOKENS.observe(count, model=model, kind=kind)
+        if trace is not None:
+            trace.tokens[kind] += count
+
+
+def record_cache(cache: str, result: str):
+    """A cache lookup: result is "hit", "stale" or "miss" """
+    CACHE_REQUESTS.inc(cache=cache, result=result)
+    trace = _trace.get()
+    if trace is not None:
+        trace.event("cache", cache=cache, result=result)
+
+
+def parse_outcome(parsed) -> str:
+    """Outcome label for an llm_json.ParseResult"""
+    if parsed.value is None:
+        return "failed"
+    if parsed.truncated:
+        return "truncated"
+    return "repaired" if parsed.repaired else "direct"
+
+
+def record_parse(target: str, outcome: str):
+    """How LLM output for target ("analysis", "curation", ...) was recovered"""
+    PARSE_OUTCOMES.inc(target=target, outcome=outcome)
+    trace = _trace.get()
+    if trace is not None:
+        trace.event("parse", target=target, outcome=outcome)
+
+
+def write_metrics_file(path: str = METRICS_FILE):
+    """Atomically replace path with the current metrics text"""
+    if not path:
+        return
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(REGISTRY.render())
+    os.replace(tmp, path)
+
+
+async def _serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        request = await asyncio.wait_for(reader.readline(), 5)
+        parts = request.decode("latin-1").split()
+        path = parts[1].split("?")[0] if len(parts) > 1 else "/"
+        # Headers are not needed; drain them so the client sees a clean response
+        while (await asyncio.wait_for(reader.readline(), 5)) not in (b"\r\n", b"\n", b""):
+            pass
+        if path == "/metrics":
+            status, content_type, body = "200 OK", "text/plain; version=0.0.4", REGISTRY.render()
+        elif path == "/traces":
+            status, content_type, body = "200 OK", "application/json", json.dumps(list(recent_traces), default=str)
+        else:
+            status, content_type, body = "404 Not Found", "text/plain", "not found\n"
+        data = body.encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode("latin-1") + data
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+_server: Optional[asyncio.AbstractServer] = None
+
+
+async def start_metrics_server(port: int = METRICS_PORT, host: str = METRICS_HOST) -> Optional[asyncio.AbstractServer]:
+    """Serve /metrics and /traces on host:port (no-op when port is 0)"""
+    global _server
+    if port and _server is None:
+        _server = await asyncio.start_server(_serve, host, port)
+    return _server
+
+
+async def stop_metrics_server():
+    """Stop the metrics endpoint (call on agent shutdown)"""
+    global _server
+    if _server is not None:
+        _server.close()
+        await _server.wait_closed()
+        _server = None
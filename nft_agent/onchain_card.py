@@ -0,0 +1,144 @@
+import json
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from artwork import chain_id_for
+
+# The contract that records awakenings (curation updates)
+AWAKENING_CONTRACT = "0xFAA5869c1d027E48a2618440a06E90656F16Bb3F"
+
+# Block explorers and display names by chain id
+EXPLORERS = {
+    1: "https://etherscan.io",
+    10: "https://optimistic.etherscan.io",
+    56: "https://bscscan.com",
+    137: "https://polygonscan.com",
+    8453: "https://basescan.org",
+    42161: "https://arbiscan.io",
+    7777777: "https://explorer.zora.energy",
+    11155111: "https://sepolia.etherscan.io",
+}
+CHAIN_NAMES = {
+    1: "Ethereum",
+    10: "Optimism",
+    56: "BNB Chain",
+    137: "Polygon",
+    8453: "Base",
+    42161: "Arbitrum",
+    7777777: "Zora",
+    11155111: "Sepolia",
+}
+
+# Sections filled here rather than by the LLM
+DETERMINISTIC_SECTIONS = ("card_1_onchain", "card_8_curation_notes", "metadata")
+
+# Keys of the indexer's Art entity that carry on-chain facts
+ART_FIELDS = ("chainId", "contract", "tokenId", "minter", "blockNumber", "txHash")
+
+
+def art_fields_from_dump(data_dump: Optional[str]) -> Dict:
+    """
+    Pull indexer Art fields (minter, blockNumber, txHash, ...) out of a data dump
+
+    Looks at the top level and the usual wrappers (token, art, Art_by_pk).
+    Returns an empty dict for anything that is not JSON.
+    """
+    if not data_dump:
+        return {}
+    try:
+        data = json.loads(data_dump)
+    except (json.JSONDecodeError, TypeError):
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    art = {}
+    for item in [data] + [data[k] for k in ("token", "art", "Art_by_pk") if isinstance(data.get(k), dict)]:
+        for field in ART_FIELDS:
+            if field not in art and item.get(field) not in (None, ""):
+                art[field] = item[field]
+    return art
+
+
+def _clean(value) -> Optional[str]:
+    """Treat the analysis placeholders ("Unknown", "null", "0x... or null") as missing"""
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text or text.lower() in ("unknown", "null", "none", "n/a") or "..." in text:
+        return None
+    return text
+
+
+def utc_timestamp() -> str:
+    """Current time as metadata.generated_at expects it, e.g. 2025-01-15T10:30:00Z"""
+    return datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
+
+
+def build_onchain_sections(analysis: Dict, awakened_by: str = "Unknown", art: Optional[Dict] = None) -> Dict:
+    """
+    Build card_1_onchain, card_8_curation_notes and metadata without the LLM
+
+    Every value is a literal or a lookup: indexer Art fields win over
+    analysis["extracted_info"], since the indexer reads them from the chain.
+
+    Args:
+        analysis: Step 1 output
+        awakened_by: Address that triggered the awakening
+        art: Indexer Art fields (see art_fields_from_dump), if known
+
+    Returns:
+        Dict with the three sections, shaped like FINAL_JSON_SAMPLE
+    """
+    info = analysis.get("extracted_info") or {}
+    art = art or {}
+
+    chain_id = chain_id_for(art.get("chainId")) or chain_id_for(_clean(info.get("chain")))
+    contract = _clean(art.get("contract")) or _clean(info.get("contract"))
+    token_id = _clean(art.get("tokenId")) or _clean(info.get("token_id"))
+    minter = _clean(art.get("minter")) or _clean(info.get("minter"))
+    block_number = _clean(art.get("blockNumber"))
+    tx_hash = _clean(art.get("txHash"))
+
+    explorer = EXPLORERS.get(chain_id)
+    links = {
+        "etherscan_minter": f"{explorer}/address/{minter}" if explorer and minter else None,
+        "etherscan_tx": f"{explorer}/tx/{tx_hash}" if explorer and tx_hash else None,
+        "etherscan_contract": f"{explorer}/address/{contract}" if explorer and contract else None,
+        "etherscan_token": f"{explorer}/token/{contract}?a={token_id}" if explorer and contract and token_id else None,
+    }
+
+    return {
+        "card_1_onchain": {
+            "preview": {
+                "minted_by": minter,
+                "contract": contract,
+                "chain_id": chain_id,
+                "token_id": token_id,
+                "awakened_by": awakened_by or "Unknown",
+            },
+            "extended": {
+                "awakening_contract": AWAKENING_CONTRACT,
+                "chain_name": CHAIN_NAMES.get(chain_id) or _clean(info.get("chain")),
+                "block_number": block_number,
+                "mint_date": None,
+                "links": links,
+            },
+        },
+        "card_8_curation_notes": {
+            "sources_used": {
+                "high_trust": ["analysis.extracted_info", "analysis.image_analysis", "analysis.categorized_links"],
+                "medium_trust": ["search_results.twitter_data", "search_results.google_searches", "search_results.website_content"],
+            },
+            "curatorial_voice": "meticulous, authentic, and poetic",
+            "trust_hierarchy": "analysis > web_searches > twitter",
+            "analysis_depth": "high art curator with attention to missed details",
+        },
+        "metadata": {
+            "version": "1.0",
+            "application": "stream-of-consciousness",
+            "awakening_contract": AWAKENING_CONTRACT,
+            "generated_at": utc_timestamp(),
+            "nft_contract": contract,
+            "token_id": token_id,
+            "chain_id": chain_id,
+        },
+    }
@@ -0,0 +1,148 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+from analyzer import analyze_nft_data
+from search import search_links, search_queries
+from curator import generate_curation
+from onchain_card import build_onchain_sections
+from artwork import artwork_id_from_analysis, artwork_id_from_dump
+from collection_context import get_collection_contexts
+from metrics import timed
+
+# Analysis sections that are enough to start part of the search
+SEARCH_SECTIONS = {
+    "categorized_links": search_links,    # Twitter profile + project websites
+    "search_queries": search_queries,     # Google
+}
+# What an empty search looks like (see perform_all_searches)
+EMPTY_SEARCH_RESULTS = {"twitter_data": None, "website_content": [], "google_searches": []}
+
+
+class AwakeningError(Exception):
+    """A pipeline stage failed; stage is "analysis", "search" or "curation" """
+
+    def __init__(self, stage: str, message: str):
+        super().__init__(message)
+        self.stage = stage
+
+
+async def awaken(
+    ctx,
+    data_dump: str,
+    awakened_by: str = "Unknown",
+    art: Optional[Dict] = None,
+    artwork_id: Optional[str] = None,
+    on_stage: Optional[Callable[[str, Any], Awaitable[None]]] = None,
+    on_card: Optional[Callable[[str, Any], Awaitable[None]]] = None,
+    on_response: Optional[Callable[[str, int], Awaitable[None]]] = None,
+) -> Dict:
+    """
+    Analysis → search → curation for one artwork, with the stages overlapped
+
+    The analysis is streamed: as soon as categorized_links closes, the
+    Twitter and website fetches start, and search_queries starts the Google
+    searches, while the model is still describing the artwork. Once the
+    analysis is done the deterministic cards (card_1_onchain, ...) are
+    built and sent during the search, and curation starts the moment the
+    last search returns.
+
+    Tokens of a collection whose artist was already researched (see
+    collection_context) get a token-only analysis, reuse the collection's
+    search results instead of searching, and reuse its artist cards. The
+    first token of a collection stores those for the rest.
+
+    Args:
+        ctx: Anything with a .logger (uagents Context, or a batch stand-in)
+        data_dump: NFT data as sent by the user
+        awakened_by: Address credited in card_1_onchain
+        art: Indexer Art fields if known
+        artwork_id: Id from artwork_id_from_dump, if already computed; a
+            content-hash id is replaced by the one in the analysis
+        on_stage: Optional async callback(stage, payload) for progress:
+            ("search_started", section_name), ("analyzed", analysis),
+            ("searched", search_results)
+        on_card: Optional async callback(section_name, section), see generate_curation
+        on_response: Optional async callback(raw_result, estimated_input_tokens)
+
+    Returns:
+        Dict with artwork_id, analysis, search_results, curation and cached
+
+    Raises:
+        AwakeningError: the analysis or search stage failed
+        CurationParseError: the curation response could not be parsed
+    """
+    searches: Dict[str, asyncio.Task] = {}
+    contexts = get_collection_contexts()
+    context = None
+
+    async def notify(stage: str, payload: Any):
+        if on_stage is not None:
+            await on_stage(stage, payload)
+
+    async def start_search(key: str, value: Any):
+        if context and context.get("search_results"):
+            return
+        if key in SEARCH_SECTIONS and key not in searches and isinstance(value, dict):
+            searches[key] = asyncio.create_task(SEARCH_SECTIONS[key](ctx, value))
+            ctx.logger.info(f"🔍 {key} ready - starting its searches")
+            await notify("search_started", key)
+
+    try:
+        async with contexts.claim(data_dump, art) as context:
+            analysis = await analyze_nft_data(ctx, data_dump, on_section=start_search, context=context)
+            if "error" in analysis:
+                raise AwakeningError("analysis", analysis["error"])
+            context_id = context["id"] if context else contexts.remember_analysis(data_dump, analysis, art)
+
+        # Sections the stream never closed (e.g. a cut-off response) start now
+        for key in SEARCH_SECTIONS:
+            await start_search(key, analysis.get(key) or {})
+        artwork_id = artwork_id or artwork_id_from_dump(data_dump)
+        if artwork_id.startswith("dump_"):
+            artwork_id = artwork_id_from_analysis(analysis) or artwork_id
+        await notify("analyzed", analysis)
+
+        # Deterministic cards overlap the search
+        onchain = build_onchain_sections(analysis, awakened_by, art)
+        if on_card is not None:
+            for key, value in onchain.items():
+                await on_card(key, value)
+
+        if context and context.get("search_results"):
+            search_results = context["search_results"]
+            ctx.logger.info(f"♻️ Search results shared from collection {context_id}")
+        else:
+            try:
+                # Only the part of the search the analysis did not already cover
+                with timed("search.wait"):
+                    parts = await asyncio.gather(*searches.values())
+            except Exception as e:
+                raise AwakeningError("search", str(e)) from e
+            search_results = dict(EMPTY_SEARCH_RESULTS)
+            for part in parts:
+                search_results.update(part)
+            missing = [key for key in SEARCH_SECTIONS if key not in searches]
+            if missing:
+                # A malformed section (e.g. a list) leaves its part of the search empty
+                ctx.logger.warning(f"⚠️ No usable {', '.join(missing)} in the analysis; searched without them")
+            else:
+                contexts.remember_search(context_id, search_results)
+            ctx.logger.info("✨ All searches completed")
+        await notify("searched", search_results)
+    finally:
+        # An analysis failure leaves early searches with nobody to read them
+        for task in searches.values():
+            task.cancel()
+
+    curation, cached = await generate_curation(
+        ctx, artwork_id, analysis, search_results, awakened_by,
+        on_response=on_response, on_card=on_card, art=art, onchain=onchain,
+        shared_cards=context.get("cards") if context else None
+    )
+    contexts.remember_cards(context_id, curation)
+    return {
+        "artwork_id": artwork_id,
+        "analysis": analysis,
+        "search_results": search_results,
+        "curation": curation,
+        "cached": cached,
+    }
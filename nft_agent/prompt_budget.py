@@ -0,0 +1,295 @@
+import os
+import re
+import json
+import logging
+from typing import Any, Dict, List, Optional
+from html_extract import html_to_text
+
+try:
+    import tiktoken
+except ImportError:  # optional: fall back to a character-based estimate
+    tiktoken = None
+
+# Input-token ceiling for the analysis + search_results part of a curation prompt
+CURATION_INPUT_TOKEN_BUDGET = int(os.getenv("CURATION_INPUT_TOKEN_BUDGET", "12000"))
+MAX_TWEETS = int(os.getenv("PROMPT_MAX_TWEETS", "8"))
+MAX_WEBSITE_CHARS = int(os.getenv("PROMPT_MAX_WEBSITE_CHARS", "4000"))
+MAX_GOOGLE_RESULTS = int(os.getenv("PROMPT_MAX_GOOGLE_RESULTS", "5"))
+# Text is cut by this much more than the measured overshoot, so one pass usually suffices
+SHRINK_MARGIN = 1.1
+
+logger = logging.getLogger("prompt_budget")
+
+_encoding = None
+_estimating = False
+
+
+def _load_encoding():
+    """tiktoken encoding, or None (logged once) when token counts must be estimated"""
+    global _encoding, _estimating
+    if _encoding is None and not _estimating:
+        try:
+            if tiktoken is None:
+                raise ImportError("tiktoken is not installed")
+            try:
+                _encoding = tiktoken.get_encoding("o200k_base")
+            except ValueError:
+                _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            _estimating = True
+            logger.warning(f"⚠️ Estimating prompt tokens as characters / 4 ({e}); "
+                           "CURATION_INPUT_TOKEN_BUDGET is approximate (pip install tiktoken)")
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """
+    Token count for a prompt string
+
+    Uses tiktoken when it is installed (o200k_base, falling back to
+    cl100k_base), otherwise ~4 characters per token.
+    """
+    encoding = _load_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def to_prompt_json(value: Any) -> str:
+    """JSON without indentation: whitespace costs tokens and adds nothing for the model"""
+    return json.dumps(value, ensure_ascii=False, separators=(", ", ": "))
+
+
+def _prune(value: Any) -> Any:
+    """Drop None, empty strings/containers and 'Unknown' placeholders, recursively"""
+    if isinstance(value, dict):
+        pruned = {k: _prune(v) for k, v in value.items()}
+        return {k: v for k, v in pruned.items() if v not in (None, "", [], {}, "Unknown")}
+    if isinstance(value, list):
+        pruned = [_prune(v) for v in value]
+        return [v for v in pruned if v not in (None, "", [], {})]
+    return value
+
+
+def compact_analysis(analysis: Dict) -> Dict:
+    """
+    The analysis without fields curation never uses
+
+    search_queries only drive Step 2, and needs_metadata_fetch / errors are
+    pipeline bookkeeping.
+    """
+    compact = {k: v for k, v in analysis.items() if k not in ("search_queries", "error")}
+    image = compact.get("image_analysis")
+    if isinstance(image, dict):
+        compact["image_analysis"] = {k: v for k, v in image.items() if k != "needs_metadata_fetch"}
+    return _prune(compact)
+
+
+_POST_TEXT_KEYS = ("description", "text", "full_text", "content", "post_text")
+_POST_KEEP = {
+    "date_posted": "date", "date": "date", "created_at": "date",
+    "url": "url", "post_url": "url",
+    "likes": "likes", "reposts": "reposts", "retweets": "reposts", "replies": "replies",
+}
+_PROFILE_KEEP = ("name", "profile_name", "user_posted", "biography", "bio", "description",
+                 "followers", "following", "location", "external_link", "url", "is_verified")
+_WORD = re.compile(r"[a-z0-9#@']{3,}")
+
+
+def _post_text(post: Dict) -> str:
+    for key in _POST_TEXT_KEYS:
+        if isinstance(post.get(key), str) and post[key].strip():
+            return post[key].strip()
+    return ""
+
+
+def rank_posts(posts: List[Dict], key_themes: List[str], limit: int = MAX_TWEETS) -> List[Dict]:
+    """
+    Most relevant posts first: overlap with key_themes, engagement as tiebreak
+
+    Returns compact post dicts (text, date, url, engagement), at most `limit`.
+    """
+    theme_words = set()
+    for theme in key_themes or []:
+        theme_words.update(_WORD.findall(str(theme).lower()))
+
+    scored = []
+    seen = set()
+    for index, post in enumerate(posts):
+        if not isinstance(post, dict):
+            continue
+        text = _post_text(post)
+        if not text or text in seen:
+            continue
+        seen.add(text)
+        words = set(_WORD.findall(text.lower()))
+        relevance = len(words & theme_words)
+        engagement = sum(v for v in (post.get("likes"), post.get("reposts"), post.get("replies")) if isinstance(v, (int, float)))
+        compact = {"text": text}
+        for key, name in _POST_KEEP.items():
+            if post.get(key) not in (None, "") and name not in compact:
+                compact[name] = post[key]
+        scored.append((-relevance, -engagement, index, compact))
+    scored.sort(key=lambda item: item[:3])
+    return [compact for *_, compact in scored[:limit]]
+
+
+def compact_twitter(twitter_data: Optional[Dict], key_themes: List[str], max_tweets: int = MAX_TWEETS) -> Optional[Dict]:
+    """Profile essentials plus the most theme-relevant posts from a Bright Data payload"""
+    if not twitter_data or not twitter_data.get("success"):
+        return None
+    payload = twitter_data.get("data")
+    profiles = payload if isinstance(payload, list) else [payload]
+
+    profile: Dict = {}
+    posts: List[Dict] = []
+    for item in profiles:
+        if not isinstance(item, dict):
+            continue
+        for key in _PROFILE_KEEP:
+            if key not in profile and item.get(key) not in (None, "", []):
+                profile[key] = item[key]
+        for key in ("posts", "tweets"):
+            if isinstance(item.get(key), list):
+                posts.extend(item[key])
+        if _post_text(item) and ("post_id" in item or "date_posted" in item):
+            # Some datasets return posts as top-level rows
+            posts.append(item)
+
+    return _prune({
+        "source": twitter_data.get("source"),
+        "profile": profile,
+        "posts": rank_posts(posts, key_themes, max_tweets),
+    })
+
+
+def compact_websites(website_content: Optional[List[Dict]], max_chars: int = MAX_WEBSITE_CHARS) -> List[Dict]:
+    """Readable text, title, description and outbound links of each fetched site; failed fetches dropped"""
+    sites = []
+    for site in website_content or []:
+        if not isinstance(site, dict) or not site.get("success"):
+            continue
+        # Older cache entries still hold raw HTML
+        text = html_to_text(site.get("content") or "")
+        meta = site.get("meta") or {}
+        compact = _prune({
+            "source": site.get("source"),
+            "title": site.get("title") or meta.get("og:title"),
+            "description": meta.get("og:description") or meta.get("description"),
+            "links": (site.get("links") or [])[:10],
+            "text": text[:max_chars],
+        })
+        if compact.get("text") or compact.get("description"):
+            sites.append(compact)
+    return sites
+
+
+def compact_google(google_searches: Optional[List[Dict]], max_results: int = MAX_GOOGLE_RESULTS) -> List[Dict]:
+    """Title / url / snippet per organic result, de-duplicated across queries"""
+    searches = []
+    seen_urls = set()
+    for search in google_searches or []:
+        if not isinstance(search, dict) or not search.get("success"):
+            continue
+        results = []
+        for result in search.get("results") or []:
+            if not isinstance(result, dict):
+                continue
+            url = result.get("link") or result.get("url")
+            if url in seen_urls:
+                continue
+            seen_urls.add(url)
+            results.append(_prune({
+                "title": result.get("title"),
+                "url": url,
+                "snippet": result.get("description") or result.get("snippet"),
+            }))
+        if results:
+            searches.append({"query": search.get("query"), "results": results[:max_results]})
+    return searches
+
+
+def compact_search_results(search_results: Optional[Dict], key_themes: List[str]) -> Dict:
+    """Search results reduced to what a curator would actually read"""
+    search_results = search_results or {}
+    return _prune({
+        "twitter_data": compact_twitter(search_results.get("twitter_data"), key_themes),
+        "website_content": compact_websites(search_results.get("website_content")),
+        "google_searches": compact_google(search_results.get("google_searches")),
+    })
+
+
+def _cost(value: Any) -> int:
+    """Tokens one item adds to the prompt JSON (plus its separator)"""
+    return count_tokens(to_prompt_json(value)) + 1
+
+
+def _pop_tokens(items: List, tokens: int, keep: int = 0) -> int:
+    """Pop items off the end until about `tokens` are gone or `keep` remain; returns the tokens removed"""
+    removed = 0
+    while len(items) > keep and removed < tokens:
+        removed += _cost(items.pop())
+    return removed
+
+
+def _cut_text(text: str, tokens: int, floor: int) -> str:
+    """Shorten text by about `tokens` tokens (scaled from its own chars-per-token), to no less than `floor` chars"""
+    chars = max(1, int(len(text) * min(1.0, tokens * SHRINK_MARGIN / max(1, count_tokens(text)))))
+    return text[: max(floor, len(text) - chars)]
+
+
+def fit_inputs(analysis: Dict, search_results: Optional[Dict],
+               budget: int = CURATION_INPUT_TOKEN_BUDGET) -> Dict:
+    """
+    Compact analysis and search results and shrink them until they fit the budget
+
+    Medium-trust sources give way first (Google results, then website text,
+    then tweets), the high-trust analysis last. Each pass removes about as
+    many tokens as the inputs are over, so a source usually takes one pass.
+    Inputs that are still over budget once nothing more can go are returned
+    as they are, with a warning.
+
+    Returns:
+        {"analysis": ..., "search_results": ..., "tokens": n}
+    """
+    compact = compact_analysis(analysis or {})
+    key_themes = compact.get("key_themes") or []
+    search = compact_search_results(search_results, key_themes)
+
+    def measure() -> int:
+        return count_tokens(to_prompt_json(compact)) + count_tokens(to_prompt_json(search))
+
+    tokens = measure()
+    while tokens > budget:
+        over = tokens - budget
+        google = search.get("google_searches")
+        sites = search.get("website_content")
+        posts = (search.get("twitter_data") or {}).get("posts")
+        long_sites = [site for site in sites or [] if len(site.get("text", "")) > 500]
+        image = compact.get("image_analysis") or {}
+        description = image.get("visual_description")
+        if google:
+            removed = 0
+            while google and removed < over:
+                last = google[-1]
+                removed += _pop_tokens(last["results"], over - removed)
+                if not last["results"]:
+                    google.pop()
+        elif long_sites:
+            # Spread the cut over the long texts in proportion to their length
+            total = sum(len(site["text"]) for site in long_sites)
+            for site in long_sites:
+                site["text"] = _cut_text(site["text"], over * len(site["text"]) // total + 1, 500)
+        elif posts and len(posts) > 2:
+            _pop_tokens(posts, over, keep=2)
+        elif sites:
+            _pop_tokens(sites, over)
+        elif isinstance(description, str) and len(description) > 1000:
+            image["visual_description"] = _cut_text(description, over, 1000)
+        else:
+            logger.warning(f"⚠️ Curation inputs are {tokens} tokens, over the {budget} budget "
+                           "even with every search result cut")
+            break
+        tokens = measure()
+
+    return {"analysis": compact, "search_results": search, "tokens": tokens}
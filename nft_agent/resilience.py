@@ -0,0 +1,273 @@
+import os
+import time
+import random
+import asyncio
+import contextvars
+import httpx
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional, Tuple, Type, TypeVar
+from metrics import record_upstream, UPSTREAM_RETRIES, CIRCUIT_OPEN
+
+T = TypeVar("T")
+
+# Retry schedule: full-jitter exponential backoff, capped
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "4"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "20"))
+# A breaker opens after this many consecutive failures and probes again after the reset timeout
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))
+# Overall budget for one pipeline step (analysis, search or curation)
+JOB_DEADLINE_SECONDS = float(os.getenv("JOB_DEADLINE_SECONDS", "900"))
+
+# Statuses worth another attempt: throttling and upstream trouble
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """The endpoint's breaker is open: fail fast instead of waiting on a dead upstream"""
+
+    def __init__(self, endpoint: str, retry_in: float):
+        super().__init__(f"Circuit open for {endpoint}; retrying in {retry_in:.0f}s")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+class DeadlineExceeded(Exception):
+    """The job deadline ran out before the call could succeed"""
+
+
+class RetryableStatus(Exception):
+    """An HTTP response with a status in RETRY_STATUSES (the response is kept for the caller)"""
+
+    def __init__(self, response: httpx.Response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+        self.retry_after = parse_retry_after(response.headers.get("retry-after"))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float = RETRY_BASE_DELAY, cap: float = RETRY_MAX_DELAY,
+                  retry_after: Optional[float] = None) -> float:
+    """
+    Delay before retry number `attempt` (0-based)
+
+    Full jitter (uniform between 0 and base * 2^attempt, capped) spreads
+    retries from many concurrent jobs. A server-sent Retry-After is the
+    minimum wait.
+    """
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one upstream endpoint
+
+    closed: calls pass. After `failure_threshold` failures in a row it opens
+    and every call fails fast with CircuitOpenError. Once `reset_timeout`
+    has passed it is half-open: one probe call goes through, and its
+    outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        """Raise CircuitOpenError unless a call may go through now"""
+        state = self.state
+        if state == "closed":
+            return
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return
+        retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+        raise CircuitOpenError(self.name, retry_in)
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+    def release(self):
+        """Give up a call without a verdict (e.g. cancelled) so the next caller may probe"""
+        self._probing = False
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(endpoint: str) -> CircuitBreaker:
+    """Return the shared breaker for an endpoint, creating it on first use"""
+    breaker = _breakers.get(endpoint)
+    if breaker is None:
+        breaker = _breakers[endpoint] = CircuitBreaker(endpoint)
+    return breaker
+
+
+def breaker_states() -> Dict[str, str]:
+    """Current state per endpoint, for logging"""
+    return {name: breaker.state for name, breaker in _breakers.items()}
+
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("job_deadline", default=None)
+
+
+@contextmanager
+def job_deadline(seconds: float = JOB_DEADLINE_SECONDS):
+    """
+    Bound every retried call made inside the block (and in tasks it starts)
+
+    Nested deadlines can only shorten the enclosing one.
+    """
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left before the job deadline, or None without one"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def _retry_after_for(error: BaseException, retry_on: Tuple[Type[BaseException], ...]) -> Tuple[bool, Optional[float]]:
+    """(retryable, retry_after) for a failed attempt"""
+    if isinstance(error, RetryableStatus):
+        return True, error.retry_after
+    if isinstance(error, (httpx.TransportError, asyncio.TimeoutError, ConnectionError) + retry_on):
+        return True, None
+    # SDK errors (e.g. openai.APIStatusError) carry the status and response
+    status = getattr(error, "status_code", None)
+    if status in RETRY_STATUSES:
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        return True, parse_retry_after(headers.get("retry-after"))
+    return False, None
+
+
+def _outcome(result) -> str:
+    """Metrics label for an attempt: status class (2xx, 4xx, ...), timeout or error"""
+    if isinstance(result, asyncio.TimeoutError):
+        return "timeout"
+    if isinstance(result, RetryableStatus):
+        result = result.response
+    status = getattr(result, "status_code", None)
+    if isinstance(status, int):
+        return f"{status // 100}xx"
+    return "error" if isinstance(result, BaseException) else "2xx"
+
+
+async def call_with_retry(
+    endpoint: str,
+    attempt: Callable[[], Awaitable[T]],
+    max_attempts: int = RETRY_MAX_ATTEMPTS,
+    attempt_timeout: Optional[float] = None,
+    retry_on: Tuple[Type[BaseException], ...] = (),
+) -> T:
+    """
+    Run attempt() behind the endpoint's circuit breaker, retrying transient failures
+
+    Transport errors, timeouts, RetryableStatus and SDK errors with a
+    RETRY_STATUSES status are retried with jittered backoff that honours
+    Retry-After. Each attempt gets at most `attempt_timeout` seconds and
+    never more than the job deadline has left. Other exceptions count as
+    the upstream being up and are re-raised at once. Every attempt's
+    latency is recorded per endpoint (see metrics.record_upstream).
+
+    Args:
+        endpoint: Breaker name, e.g. "api.brightdata.com/request" or "asi1:chat"
+        attempt: Zero-argument coroutine function making one call
+        max_attempts: Total tries including the first
+        attempt_timeout: Per-attempt limit in seconds (None: only the deadline)
+        retry_on: Extra exception types to treat as transient
+
+    Raises:
+        CircuitOpenError: the breaker is open
+        DeadlineExceeded: the job deadline ran out
+        The last attempt's exception when every attempt failed
+    """
+    breaker = get_breaker(endpoint)
+    for number in range(max_attempts):
+        remaining = remaining_time()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded(f"Job deadline exceeded before calling {endpoint}")
+        try:
+            breaker.allow()
+        except CircuitOpenError:
+            CIRCUIT_OPEN.inc(endpoint=endpoint)
+            raise
+        timeout = attempt_timeout
+        if remaining is not None:
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        started = time.monotonic()
+        try:
+            if timeout is None:
+                result = await attempt()
+            else:
+                result = await asyncio.wait_for(attempt(), timeout)
+        except asyncio.CancelledError:
+            # Cancellation says nothing about the upstream; don't leave a probe pending
+            breaker.release()
+            raise
+        except Exception as e:
+            record_upstream(endpoint, started, _outcome(e))
+            retryable, retry_after = _retry_after_for(e, retry_on)
+            if not retryable:
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            if number + 1 >= max_attempts or breaker.state == "open":
+                raise
+            delay = backoff_delay(number, retry_after=retry_after)
+            remaining = remaining_time()
+            if remaining is not None and delay >= remaining:
+                raise
+            UPSTREAM_RETRIES.inc(endpoint=endpoint)
+            await asyncio.sleep(delay)
+        else:
+            record_upstream(endpoint, started, _outcome(result))
+            breaker.record_success()
+            return result
+    raise ValueError("max_attempts must be at least 1")
@@ -1,22 +1,232 @@
 import os
 import json
-import requests
+import codecs
+import asyncio
+import httpx
 from typing import Dict, List, Optional
+from contextlib import asynccontextmanager
+from urllib.parse import parse_qs, urlsplit, urlunsplit
+from disk_cache import DiskCache
+from metrics import timed
+from singleflight import SingleFlight
+from html_extract import HtmlExtractor, WEBSITE_TEXT_BUDGET
+from gateways import get_resolver, is_content_uri
+from resilience import call_with_retry, RetryableStatus, RETRY_STATUSES
+
+# Bright Data API root (overridable, e.g. to point benchmarks at a local stand-in)
+BRIGHTDATA_BASE_URL = os.getenv("BRIGHTDATA_BASE_URL", "https://api.brightdata.com").rstrip("/")
+TWITTER_DATASET_ID = os.getenv("TWITTER_DATASET_ID", "gd_lwxmeb2u1cniijd7t4")
+SERP_DATASET_ID = os.getenv("SERP_DATASET_ID", "gd_mfz5x93lmsjjjylob")
+
+# Connection pool settings (shared by every search in the agent)
+MAX_CONNECTIONS = int(os.getenv("SEARCH_MAX_CONNECTIONS", "32"))
+MAX_PER_HOST = int(os.getenv("SEARCH_MAX_PER_HOST", "8"))
+KEEPALIVE_EXPIRY = float(os.getenv("SEARCH_KEEPALIVE_EXPIRY", "30"))
+REQUEST_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT", "60"))
+
+# Response cache: tweets go stale quickly, artist/project sites rarely change
+TWITTER_CACHE_TTL = int(os.getenv("TWITTER_CACHE_TTL", str(6 * 3600)))
+WEBSITE_CACHE_TTL = int(os.getenv("WEBSITE_CACHE_TTL", str(7 * 24 * 3600)))
+GOOGLE_CACHE_TTL = int(os.getenv("GOOGLE_CACHE_TTL", str(24 * 3600)))
+HTTP_CACHE_MAX_ENTRIES = int(os.getenv("HTTP_CACHE_MAX_ENTRIES", "5000"))
+# Hard cap on (decompressed) bytes read per fetched page
+MAX_WEBSITE_BYTES = int(os.getenv("MAX_WEBSITE_BYTES", str(2 * 1024 * 1024)))
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of a URL for cache keys
+
+    Lower-cases scheme and host, drops "www." and fragments, folds twitter.com
+    into x.com and strips trailing slashes, so every spelling of an artist's
+    profile shares one cache entry.
+    """
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if host in ("twitter.com", "mobile.twitter.com", "mobile.x.com"):
+        host = "x.com"
+    path = parts.path.rstrip("/")
+    if host == "x.com":
+        path = path.lower()
+    return urlunsplit(((parts.scheme or "https").lower(), host, path, parts.query, ""))
+
+
+def endpoint_name(url: str) -> str:
+    """
+    Circuit breaker name for a Bright Data call
+
+    Each dataset is its own endpoint, so a broken Twitter scraper does not
+    trip the breaker for Google searches or the Web Unlocker.
+    """
+    parts = urlsplit(url)
+    dataset = parse_qs(parts.query).get("dataset_id")
+    return f"{parts.netloc}{parts.path}" + (f"?dataset_id={dataset[0]}" if dataset else "")
 
-# Load API keys from environment
-api_key = os.getenv("SERP_API_KEY")  
 
 class NFTSearcher:
     """Handles all search operations for NFT curation"""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, max_connections: int = MAX_CONNECTIONS,
+                 max_per_host: int = MAX_PER_HOST):
         self.api_key = api_key
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
         }
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self.cache = DiskCache(
+            "http",
+            ttl=WEBSITE_CACHE_TTL,
+            max_entries=HTTP_CACHE_MAX_ENTRIES,
+            max_bytes=HTTP_CACHE_MAX_BYTES,
+        )
+        # Concurrent requests for the same URL/query share one upstream call
+        self._flights = SingleFlight()
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared keep-alive client, created on first use"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=KEEPALIVE_EXPIRY,
+                ),
+            )
+        return self._client
+    
+    async def aclose(self):
+        """Close the pooled HTTP client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = self._host_limits[host] = asyncio.Semaphore(self.max_per_host)
+        return limit
+    
+    async def _post(self, url: str, **kwargs) -> httpx.Response:
+        """
+        POST through the shared client, bounded per upstream host
+        
+        Throttling / 5xx responses and transport errors are retried with
+        backoff behind the endpoint's circuit breaker. The last response is
+        returned if every attempt got a retryable status.
+        """
+        async def attempt():
+            async with self._host_limit(url):
+                response = await self.client.post(url, **kwargs)
+            if response.status_code in RETRY_STATUSES:
+                raise RetryableStatus(response)
+            return response
+        
+        try:
+            return await call_with_retry(endpoint_name(url), attempt)
+        except RetryableStatus as e:
+            return e.response
+    
+    async def _cached(self, key: str, ttl: int, fetch) -> Dict:
+        """
+        Serve a response from the on-disk cache, refreshing it when stale.
+        Cache misses for the same key are coalesced into one in-flight fetch,
+        so a cold-cache stampede still makes a single upstream request.
+
+        Args:
+            key: Cache key for this request
+            ttl: Freshness lifetime in seconds for this source
+            fetch: async callable(validators) -> (result, meta); result is None
+                when the upstream answered 304 Not Modified
+
+        Returns:
+            The (possibly cached) result dict
+        """
+        entry = await self.cache.aget_entry(key, allow_stale=True)
+        if entry and not entry["stale"]:
+            return entry["value"]
+        return await self._flights.do(key, lambda: self._refresh(key, ttl, fetch, entry))
+
+    async def _refresh(self, key: str, ttl: int, fetch, entry: Optional[Dict]) -> Dict:
+        """Fetch (or revalidate) one cache entry from upstream"""
+        validators = entry["meta"] if entry else {}
+        result, meta = await fetch(validators)
+
+        if result is None and entry:
+            # Revalidated: the cached copy is still current
+            await self.cache.atouch(key, ttl=ttl, meta=meta)
+            return entry["value"]
+        if result.get("success"):
+            await self.cache.aset(key, result, ttl=ttl, meta=meta)
+        elif entry:
+            # Upstream failed; a stale answer beats none
+            return entry["value"]
+        return result
     
-    def search_twitter_profile(self, twitter_url: str, max_posts: int = 10) -> Dict:
+    @asynccontextmanager
+    async def _stream_post(self, url: str, **kwargs):
+        """
+        Streaming POST through the shared client, bounded per upstream host
+        
+        Opening the response is retried like _post; once the body starts
+        streaming it is handed to the caller as-is.
+        """
+        limit = self._host_limit(url)
+        
+        async def attempt():
+            # The host slot is held while the body streams, but not between retries
+            await limit.acquire()
+            try:
+                response = await self.client.send(self.client.build_request("POST", url, **kwargs), stream=True)
+                if response.status_code in RETRY_STATUSES:
+                    await response.aread()
+                    await response.aclose()
+                    raise RetryableStatus(response)
+            except BaseException:
+                limit.release()
+                raise
+            return response
+        
+        try:
+            response = await call_with_retry(endpoint_name(url), attempt)
+        except RetryableStatus as e:
+            # Already read and closed; no slot held
+            yield e.response
+            return
+        try:
+            yield response
+        finally:
+            await response.aclose()
+            limit.release()
+    
+    async def search_twitter_profile(self, twitter_url: str, max_posts: int = 10) -> Dict:
+        """
+        Fetch tweets and bio from a Twitter profile, served from cache when fresh
+        
+        Args:
+            twitter_url: Full Twitter URL (e.g., "https://x.com/username")
+            max_posts: Number of posts to fetch (default: 10)
+        
+        Returns:
+            Dict containing twitter data or error message
+        """
+        async def fetch(validators):
+            return await self._scrape_twitter_profile(twitter_url, max_posts), {}
+        
+        key = f"twitter:{normalize_url(twitter_url)}:{max_posts}"
+        return await self._cached(key, TWITTER_CACHE_TTL, fetch)
+    
+    async def _scrape_twitter_profile(self, twitter_url: str, max_posts: int = 10) -> Dict:
         """
         Fetch tweets and bio from a Twitter profile using BrightData Twitter API
         
@@ -35,11 +245,9 @@ class NFTSearcher:
                 }]
             })
             
-            response = requests.post(
-                "https://api.brightdata.com/datasets/v3/scrape?dataset_id=gd_lwxmeb2u1cniijd7t4&notify=false&include_errors=true",
-                headers=self.headers,
-                data=data,
-                timeout=60
+            response = await self._post(
+                f"{BRIGHTDATA_BASE_URL}/datasets/v3/scrape?dataset_id={TWITTER_DATASET_ID}&notify=false&include_errors=true",
+                content=data
             )
             
             if response.status_code == 200:
@@ -63,9 +271,10 @@ class NFTSearcher:
                 "error": str(e)
             }
     
-    def fetch_website_content(self, url: str) -> Dict:
+    async def fetch_website_content(self, url: str) -> Dict:
         """
-        Fetch website content using BrightData Web Unlocker API
+        Fetch website content, served from cache when fresh and revalidated
+        with ETag/Last-Modified when stale
         
         Args:
             url: Website URL to fetch
@@ -73,44 +282,138 @@ class NFTSearcher:
         Returns:
             Dict containing website content or error message
         """
+        async def fetch(validators):
+            if is_content_uri(url):
+                return await self._fetch_from_gateway(url)
+            return await self._unlock_website(url, validators)
+        
+        return await self._cached(f"website:{normalize_url(url)}", WEBSITE_CACHE_TTL, fetch)
+    
+    @staticmethod
+    async def _extract_page(url: str, response: httpx.Response) -> Dict:
+        """
+        Extract readable text while the page streams in, and stop reading
+        once the text budget or byte cap is reached
+        """
+        extractor = HtmlExtractor(url, max_chars=WEBSITE_TEXT_BUDGET)
+        try:
+            decoder = codecs.getincrementaldecoder(response.charset_encoding or "utf-8")(errors="replace")
+        except LookupError:
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        # Counted before decoding, so the cap is in bytes whatever the charset
+        received = 0
+        async for chunk in response.aiter_bytes():
+            received += len(chunk)
+            extractor.feed(decoder.decode(chunk))
+            if extractor.done or received >= MAX_WEBSITE_BYTES:
+                break
+        else:
+            extractor.feed(decoder.decode(b"", final=True))
+        page = extractor.result()
+        return {
+            "success": True,
+            "source": url,
+            "title": page["title"],
+            "meta": page["meta"],
+            "links": page["links"],
+            "content": page["text"],
+            "truncated": page["truncated"] or received >= MAX_WEBSITE_BYTES
+        }
+    
+    async def _fetch_from_gateway(self, url: str):
+        """
+        Fetch an IPFS / Arweave hosted page straight from the fastest gateway
+        
+        Content-addressed pages need no unlocking and never change, so there
+        is nothing to revalidate.
+        """
+        try:
+            async with get_resolver().open(url) as response:
+                return await self._extract_page(url, response), {}
+        except Exception as e:
+            return {
+                "success": False,
+                "source": url,
+                "error": str(e)
+            }, {}
+    
+    async def _unlock_website(self, url: str, validators: Optional[Dict] = None):
+        """
+        Fetch website content using BrightData Web Unlocker API
+        
+        The page is streamed through HtmlExtractor, so only readable text
+        (plus title, OpenGraph/meta tags and outbound links) is kept and the
+        download stops as soon as the text budget is filled.
+        
+        Args:
+            url: Website URL to fetch
+            validators: Cached "etag" / "last_modified" for a conditional request
+        
+        Returns:
+            (result, meta) - result is None on 304 Not Modified; meta holds the
+            validators from this response
+        """
         try:
             data = {
                 "zone": "web_unlocker1",
                 "url": url,
                 "format": "raw"
             }
+            conditional = {}
+            if validators and validators.get("etag"):
+                conditional["If-None-Match"] = validators["etag"]
+            if validators and validators.get("last_modified"):
+                conditional["If-Modified-Since"] = validators["last_modified"]
+            if conditional:
+                data["headers"] = conditional
             
-            response = requests.post(
-                "https://api.brightdata.com/request",
-                json=data,
-                headers=self.headers,
-                timeout=60
-            )
-            
-            if response.status_code == 200:
-                # Limit content size to prevent overwhelming response
-                content = response.text[:10000] if len(response.text) > 10000 else response.text
-                return {
-                    "success": True,
-                    "source": url,
-                    "content": content,
-                    "truncated": len(response.text) > 10000
-                }
-            else:
-                return {
-                    "success": False,
-                    "source": url,
-                    "error": f"HTTP {response.status_code}: {response.text}"
+            async with self._stream_post(
+                f"{BRIGHTDATA_BASE_URL}/request",
+                json=data
+            ) as response:
+                meta = {
+                    "etag": response.headers.get("etag"),
+                    "last_modified": response.headers.get("last-modified"),
                 }
+                if response.status_code == 304 and conditional:
+                    return None, meta
+                if response.status_code == 200:
+                    return await self._extract_page(url, response), meta
+                if not (conditional and response.status_code in (400, 412)):
+                    body = (await response.aread()).decode("utf-8", "replace")
+                    return {
+                        "success": False,
+                        "source": url,
+                        "error": f"HTTP {response.status_code}: {body[:1000]}"
+                    }, {}
+            # Conditional request not accepted; fall back to a full fetch
+            return await self._unlock_website(url)
                 
         except Exception as e:
             return {
                 "success": False,
                 "source": url,
                 "error": str(e)
-            }
+            }, {}
+    
+    async def search_google(self, query: str, num_results: int = 7) -> Dict:
+        """
+        Perform Google search, served from cache when fresh
+        
+        Args:
+            query: Search query string
+            num_results: Number of results to return (default: 7)
+        
+        Returns:
+            Dict containing search results or error message
+        """
+        async def fetch(validators):
+            return await self._scrape_google(query, num_results), {}
+        
+        key = f"google:{' '.join(query.lower().split())}:{num_results}"
+        return await self._cached(key, GOOGLE_CACHE_TTL, fetch)
     
-    def search_google(self, query: str, num_results: int = 7) -> Dict:
+    async def _scrape_google(self, query: str, num_results: int = 7) -> Dict:
         """
         Perform Google search using BrightData SERP API
         
@@ -132,11 +435,9 @@ class NFTSearcher:
                 }]
             })
             
-            response = requests.post(
-                "https://api.brightdata.com/datasets/v3/scrape?dataset_id=gd_mfz5x93lmsjjjylob&notify=false&include_errors=true",
-                headers=self.headers,
-                data=data,
-                timeout=60
+            response = await self._post(
+                f"{BRIGHTDATA_BASE_URL}/datasets/v3/scrape?dataset_id={SERP_DATASET_ID}&notify=false&include_errors=true",
+                content=data
             )
             
             if response.status_code == 200:
@@ -179,30 +480,45 @@ class NFTSearcher:
             }
 
 
-async def perform_all_searches(ctx, analysis_result: Dict) -> Dict:
+_searcher: Optional[NFTSearcher] = None
+
+
+def get_searcher() -> NFTSearcher:
     """
-    Orchestrate all search operations based on initial analysis
-    
-    Args:
-        ctx: uagents Context object for logging
-        analysis_result: The JSON result from initial analysis
-    
+    Return the agent-wide searcher so every request shares one connection pool
+    """
+    global _searcher
+    if _searcher is None:
+        _searcher = NFTSearcher(os.getenv("SERP_API_KEY"))
+    return _searcher
+
+
+async def close_searcher():
+    """Release pooled connections (call on agent shutdown)"""
+    global _searcher
+    if _searcher is not None:
+        await _searcher.aclose()
+        _searcher = None
+
+
+async def search_links(ctx, categorized_links: Dict) -> Dict:
+    """
+    Fetch the artist's Twitter profile and up to 2 project websites
+
+    Needs only the analysis' categorized_links, so it can start while the
+    rest of the analysis is still being generated.
+
     Returns:
-        Dict containing all search results organized by type
+        Dict with twitter_data and website_content
     """
-    searcher = NFTSearcher(SERP_API_KEY)
-    
+    searcher = get_searcher()
     search_results = {
         "twitter_data": None,
         "website_content": [],
-        "google_searches": []
     }
-    
-    categorized_links = analysis_result.get("categorized_links", {})
-    search_queries = analysis_result.get("search_queries", {})
+    categorized_links = categorized_links or {}
     
     # 1. Twitter Profile Search
-    ctx.logger.info("🐦 Starting Twitter profile search...")
     artist_social = categorized_links.get("artist_social", [])
     twitter_url = None
     
@@ -213,38 +529,22 @@ async def perform_all_searches(ctx, analysis_result: Dict) -> Dict:
             break
     
     if twitter_url:
-        ctx.logger.info(f"Found Twitter URL: {twitter_url}")
-        twitter_result = searcher.search_twitter_profile(twitter_url, max_posts=10)
-        search_results["twitter_data"] = twitter_result
-        
-        if twitter_result.get("success"):
-            ctx.logger.info("✅ Twitter data fetched successfully")
-        else:
-            ctx.logger.warning(f"⚠️ Twitter fetch failed: {twitter_result.get('error')}")
+        ctx.logger.info(f"🐦 Found Twitter URL: {twitter_url}")
+        twitter_task = searcher.search_twitter_profile(twitter_url, max_posts=10)
     else:
         ctx.logger.info("No Twitter URL found in artist_social")
+        twitter_task = None
         search_results["twitter_data"] = {
             "success": False,
             "error": "No Twitter URL found in analysis"
         }
     
     # 2. Website Content Fetch (up to 2 websites)
-    ctx.logger.info("🌐 Starting website content fetch...")
     project_websites = categorized_links.get("project_websites", [])
+    websites_to_fetch = project_websites[:2]  # Limit to 2
     
-    if project_websites:
-        websites_to_fetch = project_websites[:2]  # Limit to 2
-        ctx.logger.info(f"Fetching {len(websites_to_fetch)} website(s)")
-        
-        for website_url in websites_to_fetch:
-            ctx.logger.info(f"Fetching: {website_url}")
-            website_result = searcher.fetch_website_content(website_url)
-            search_results["website_content"].append(website_result)
-            
-            if website_result.get("success"):
-                ctx.logger.info(f"✅ Successfully fetched {website_url}")
-            else:
-                ctx.logger.warning(f"⚠️ Failed to fetch {website_url}: {website_result.get('error')}")
+    if websites_to_fetch:
+        ctx.logger.info(f"🌐 Fetching {len(websites_to_fetch)} website(s)")
     else:
         ctx.logger.info("No project websites found")
         search_results["website_content"] = [{
@@ -252,29 +552,85 @@ async def perform_all_searches(ctx, analysis_result: Dict) -> Dict:
             "error": "No project websites found in analysis"
         }]
     
+    # Each searcher method already converts failures into {"success": False, ...}
+    with timed("search.links"):
+        twitter_result, website_results = await asyncio.gather(
+            twitter_task if twitter_task else asyncio.sleep(0),
+            asyncio.gather(*(searcher.fetch_website_content(url) for url in websites_to_fetch)),
+        )
+    
+    if twitter_task:
+        search_results["twitter_data"] = twitter_result
+        if twitter_result.get("success"):
+            ctx.logger.info("✅ Twitter data fetched successfully")
+        else:
+            ctx.logger.warning(f"⚠️ Twitter fetch failed: {twitter_result.get('error')}")
+    
+    for website_url, website_result in zip(websites_to_fetch, website_results):
+        search_results["website_content"].append(website_result)
+        if website_result.get("success"):
+            ctx.logger.info(f"✅ Successfully fetched {website_url}")
+        else:
+            ctx.logger.warning(f"⚠️ Failed to fetch {website_url}: {website_result.get('error')}")
+    
+    return search_results
+
+
+async def search_queries(ctx, queries: Dict) -> Dict:
+    """
+    Run the first 3 web queries of the analysis' search_queries on Google
+
+    Returns:
+        Dict with google_searches
+    """
+    searcher = get_searcher()
+    search_results = {"google_searches": []}
+    
     # 3. Google Search (first 3 web queries, 7 results each)
-    # ctx.logger.info("🔍 Starting Google searches...")
-    # web_queries = search_queries.get("web", [])
+    web_queries = (queries or {}).get("web", [])
+    queries_to_search = web_queries[:3]  # Limit to first 3
     
-    # if web_queries:
-    #     queries_to_search = web_queries[:3]  # Limit to first 3
-    #     ctx.logger.info(f"Performing {len(queries_to_search)} Google search(es)")
-        
-    #     for query in queries_to_search:
-    #         ctx.logger.info(f"Searching: {query}")
-    #         google_result = searcher.search_google(query, num_results=7)
-    #         search_results["google_searches"].append(google_result)
-            
-    #         if google_result.get("success"):
-    #             ctx.logger.info(f"✅ Search completed: {google_result.get('total_results', 0)} results")
-    #         else:
-    #             ctx.logger.warning(f"⚠️ Search failed: {google_result.get('error')}")
-    # else:
-    #     ctx.logger.info("No web search queries found")
-    #     search_results["google_searches"] = [{
-    #         "success": False,
-    #         "error": "No web search queries found in analysis"
-    #     }]
+    if queries_to_search:
+        ctx.logger.info(f"🔍 Performing {len(queries_to_search)} Google search(es)")
+    else:
+        ctx.logger.info("No web search queries found")
+        search_results["google_searches"] = [{
+            "success": False,
+            "error": "No web search queries found in analysis"
+        }]
+    
+    with timed("search.queries"):
+        google_results = await asyncio.gather(*(searcher.search_google(query, num_results=7) for query in queries_to_search))
+    
+    for google_result in google_results:
+        search_results["google_searches"].append(google_result)
+        if google_result.get("success"):
+            ctx.logger.info(f"✅ Search completed: {google_result.get('total_results', 0)} results")
+        else:
+            ctx.logger.warning(f"⚠️ Search failed: {google_result.get('error')}")
+    
+    return search_results
+
+
+async def perform_all_searches(ctx, analysis_result: Dict) -> Dict:
+    """
+    Orchestrate all search operations based on initial analysis
+    
+    Twitter, website and Google requests are fanned out concurrently over the
+    shared connection pool, so wall-clock time is roughly the slowest single call.
+    
+    Args:
+        ctx: uagents Context object for logging
+        analysis_result: The JSON result from initial analysis
+    
+    Returns:
+        Dict containing all search results organized by type
+    """
+    with timed("search"):
+        link_results, query_results = await asyncio.gather(
+            search_links(ctx, analysis_result.get("categorized_links", {})),
+            search_queries(ctx, analysis_result.get("search_queries", {})),
+        )
     
     ctx.logger.info("✨ All searches completed")
-    return search_results
\ No newline at end of file
+    return dict(link_results, **query_results)
@@ -0,0 +1,50 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into one upstream call
+
+    The first caller for a key starts the work as a task; everyone who asks
+    for the same key while it is running awaits that task and gets the same
+    result (or exception). The key is released as soon as the call finishes,
+    so later callers go through whatever cache sits underneath.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.started = 0
+        self.shared = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn() for this key unless an identical call is already in flight
+
+        Args:
+            key: Identity of the request (e.g. normalized URL or query)
+            fn: Zero-argument coroutine function doing the real work
+
+        Returns:
+            The shared result
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            self.started += 1
+            task.add_done_callback(lambda t, key=key: self._release(key, t))
+        else:
+            self.shared += 1
+        # Shield so one caller giving up does not cancel the call for the others
+        return await asyncio.shield(task)
+
+    def _release(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the exception retrieved even if every waiter went away
+            task.exception()
+
+    def in_flight(self) -> int:
+        return len(self._calls)
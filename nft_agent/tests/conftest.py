@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+# The agent's modules import each other by bare name (run from nft_agent/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep on-disk caches out of the working tree
+os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp(prefix="nft_agent_tests_"))
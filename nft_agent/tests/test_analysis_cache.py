@@ -0,0 +1,30 @@
+import json
+from analysis_cache import AnalysisCache, is_volatile_key, normalize_dump
+
+
+def test_market_data_and_fetch_times_are_volatile():
+    for key in ("price", "last_sale", "floorPrice", "updated_at", "lastRefreshed", "timestamp"):
+        assert is_volatile_key(key), key
+
+
+def test_stable_fields_that_look_volatile_are_kept():
+    for key in ("mint_timestamp", "mintPrice", "created_at", "description", "image"):
+        assert not is_volatile_key(key), key
+
+
+def test_key_ignores_volatile_fields_order_and_whitespace():
+    a = json.dumps({"nft": {"name": "A", "description": "d", "last_sale": {"price": 1}, "updated_at": 1}})
+    b = json.dumps({"nft": {"updated_at": 2, "description": "d ", "name": "A", "last_sale": {"price": 2}}}, indent=2)
+    assert AnalysisCache.key(a, "hash") == AnalysisCache.key(b, "hash")
+
+
+def test_key_changes_with_content_image_and_variant():
+    dump = json.dumps({"name": "A", "mint_timestamp": 1})
+    key = AnalysisCache.key(dump, "hash")
+    assert key != AnalysisCache.key(json.dumps({"name": "A", "mint_timestamp": 2}), "hash")
+    assert key != AnalysisCache.key(dump, "other")
+    assert key != AnalysisCache.key(dump, "hash", variant="collection:1")
+
+
+def test_non_json_dumps_compare_with_collapsed_whitespace():
+    assert normalize_dump("name:  A\n\ttoken 1") == normalize_dump("name: A token 1")
@@ -0,0 +1,24 @@
+import json
+import asyncio
+import logging
+import analyzer
+from analysis_cache import get_analysis_cache
+
+
+class Ctx:
+    logger = logging.getLogger("test")
+
+
+def test_url_keyed_analysis_is_used_before_refetching_the_image(monkeypatch):
+    dump = json.dumps({"name": "Unfetchable", "image": "https://gateway.example/dead.png"})
+    image_url = analyzer.extract_image_url(dump)
+    assert image_url
+    # What an earlier analysis stored after the image could not be fetched
+    get_analysis_cache().set(dump, image_url, {"extracted_info": {"name": "Unfetchable"}})
+
+    async def prepare_image(ctx, url):
+        raise AssertionError("image fetched again")
+
+    monkeypatch.setattr(analyzer, "prepare_image", prepare_image)
+    analysis = asyncio.run(analyzer.analyze_nft_data(Ctx(), dump))
+    assert analysis["extracted_info"]["name"] == "Unfetchable"
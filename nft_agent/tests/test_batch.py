@@ -0,0 +1,79 @@
+import json
+import asyncio
+import pytest
+import batch
+from batch import Checkpoint, run_batch, split_dump, ANALYZED, SEARCHED, CURATED, FAILED
+
+
+def test_checkpoint_keeps_last_success_and_skips_failures_and_cut_lines(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    path.write_text("\n".join([
+        json.dumps({"source_id": "a", "stage": ANALYZED}),
+        json.dumps({"source_id": "a", "stage": SEARCHED}),
+        json.dumps({"source_id": "b", "stage": FAILED, "error": "search: boom"}),
+        '{"source_id": "c", "stage": "cur',
+    ]))
+    checkpoint = Checkpoint(str(path))
+    checkpoint.close()
+    assert checkpoint.progress == {"a": {"source_id": "a", "stage": SEARCHED}}
+
+
+@pytest.fixture
+def stages(monkeypatch):
+    calls = {"analysis": [], "search": [], "curation": []}
+    failing = set()
+
+    async def analyze(ctx, data_dump, context=None):
+        calls["analysis"].append(data_dump)
+        return {"extracted_info": {"name": data_dump}}
+
+    async def search(ctx, analysis):
+        calls["search"].append(analysis["extracted_info"]["name"])
+        return {"twitter_data": None, "website_content": [], "google_searches": []}
+
+    async def curate(ctx, artwork_id, analysis, search_results, awakened_by, **kwargs):
+        name = analysis["extracted_info"]["name"]
+        calls["curation"].append(name)
+        if name in failing:
+            raise RuntimeError("model unavailable")
+        return {"card_2_artwork": {"title": name}}, False
+
+    monkeypatch.setattr(batch, "analyze_nft_data", analyze)
+    monkeypatch.setattr(batch, "perform_all_searches", search)
+    monkeypatch.setattr(batch, "generate_curation", curate)
+    return calls, failing
+
+
+def items(*names):
+    return [{"source_id": name, "artwork_id": f"dump_{name}", "data_dump": name} for name in names]
+
+
+def test_interrupted_run_resumes_after_the_last_finished_stage(tmp_path, stages):
+    calls, failing = stages
+    path = str(tmp_path / "checkpoint.jsonl")
+
+    failing.add("b")
+    checkpoint = Checkpoint(path)
+    summary = asyncio.run(run_batch(items("a", "b"), checkpoint))
+    checkpoint.close()
+    assert (summary[CURATED], summary[FAILED]) == (1, 1)
+
+    failing.clear()
+    for stage in calls.values():
+        stage.clear()
+    checkpoint = Checkpoint(path)
+    summary = asyncio.run(run_batch(items("a", "b", "c"), checkpoint))
+    checkpoint.close()
+    assert (summary["skipped"], summary[CURATED], summary[FAILED]) == (1, 2, 0)
+    # "b" failed during curation, so only its curation runs again
+    assert calls["analysis"] == ["c"]
+    assert calls["search"] == ["c"]
+    assert sorted(calls["curation"]) == ["b", "c"]
+
+
+def test_split_dump_splits_batch_pages_only():
+    page = json.dumps({"nfts": [{"identifier": "1", "contract": "0xabc"}, {"identifier": "2", "contract": "0xabc"}]})
+    assert [json.loads(d)["identifier"] for d in split_dump(page)] == ["1", "2"]
+    single = json.dumps({"nft": {"identifier": "1"}})
+    assert split_dump(single) == [single]
+    assert split_dump("not json") == ["not json"]
@@ -0,0 +1,74 @@
+import json
+import asyncio
+import pytest
+from collection_context import CollectionContexts, identify
+
+CONTRACT = "0x" + "ab" * 20
+MINTER = "0x" + "cd" * 20
+
+
+def dump(token_id: int, **extra) -> str:
+    return json.dumps({"nft": dict({"identifier": str(token_id), "contract": CONTRACT, "creator": MINTER}, **extra)})
+
+
+ANALYSIS = {
+    "extracted_info": {"chain": "ethereum", "contract": CONTRACT, "minter": MINTER},
+    "categorized_links": {"twitter": "https://x.com/artist"},
+    "key_themes": ["light"],
+}
+
+
+@pytest.fixture
+def contexts(tmp_path):
+    store = CollectionContexts(wait=1)
+    store.cache.directory = str(tmp_path)
+    return store
+
+
+def test_identify_reads_wrapped_dumps_and_the_analysis():
+    assert identify(dump(1), {}) == (None, CONTRACT, MINTER)
+    assert identify(dump(1), {}, ANALYSIS) == (1, CONTRACT, MINTER)
+
+
+def test_later_tokens_find_the_stored_context(contexts):
+    context_id = contexts.remember_analysis(dump(1), ANALYSIS, {})
+    assert context_id == f"1_{CONTRACT}:{MINTER}"
+    context = contexts.lookup(dump(2), {})
+    assert context["analysis"]["key_themes"] == ["light"]
+    assert "extracted_info" not in context["analysis"]
+
+
+def test_followers_wait_for_the_first_token(contexts):
+    seen = []
+
+    async def token(token_id: int, delay: float):
+        await asyncio.sleep(delay)
+        async with contexts.claim(dump(token_id, chain="ethereum"), {}) as context:
+            seen.append((token_id, context and context["id"]))
+            if context is None:
+                await asyncio.sleep(0.05)
+                contexts.remember_analysis(dump(token_id, chain="ethereum"), ANALYSIS, {})
+
+    async def run():
+        await asyncio.gather(token(1, 0), token(2, 0.01), token(3, 0.01))
+
+    asyncio.run(run())
+    assert seen[0] == (1, None)
+    assert sorted(seen[1:]) == [(2, f"1_{CONTRACT}:{MINTER}"), (3, f"1_{CONTRACT}:{MINTER}")]
+
+
+def test_tokens_of_an_unknown_chain_do_not_wait_on_each_other(contexts):
+    inside = []
+
+    async def token(token_id: int):
+        async with contexts.claim(dump(token_id), {}) as context:
+            assert context is None
+            inside.append(token_id)
+            await asyncio.sleep(0.05)
+            return len(inside)
+
+    async def run():
+        return await asyncio.gather(token(1), token(2))
+
+    # Both build their own context at the same time instead of one waiting for the other
+    assert asyncio.run(run()) == [2, 2]
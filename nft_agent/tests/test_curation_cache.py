@@ -0,0 +1,30 @@
+import time
+import pytest
+from curation_cache import CurationCache
+
+ANALYSIS = {"extracted_info": {"name": "Token"}}
+SEARCH = {"google_searches": []}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    store = CurationCache()
+    store.cache.directory = str(tmp_path)
+    return store
+
+
+def test_hit_is_restamped_with_caller_and_time(cache):
+    cache.set("1_0xabc_1", ANALYSIS, SEARCH, {
+        "card_1_onchain": {"preview": {"awakened_by": "0xfirst"}},
+        "metadata": {"generated_at": "2025-01-15T10:30:00Z"},
+    })
+    before = time.strftime("%Y-%m-%dT%H:%M", time.gmtime())
+    curation = cache.get("1_0xabc_1", ANALYSIS, SEARCH, "0xsecond")
+    assert curation["card_1_onchain"]["preview"]["awakened_by"] == "0xsecond"
+    assert curation["metadata"]["generated_at"] >= before
+
+
+def test_changed_inputs_miss(cache):
+    cache.set("1_0xabc_1", ANALYSIS, SEARCH, {"metadata": {}})
+    assert cache.get("1_0xabc_1", ANALYSIS, {"google_searches": [{"query": "new"}]}) is None
+    assert cache.get("1_0xabc_2", ANALYSIS, SEARCH) is None
@@ -0,0 +1,112 @@
+import json
+import asyncio
+import logging
+import pytest
+from types import SimpleNamespace
+import curator
+from curator import CARD_SAMPLES, LLM_SECTIONS
+from llm_json import missing_parts
+
+ANALYSIS = {"extracted_info": {"name": "Token"}, "image_analysis": {"visual_description": "Blue light"},
+            "key_themes": ["light"]}
+
+
+class Ctx:
+    logger = logging.getLogger("test")
+
+
+@pytest.fixture(autouse=True)
+def plain_prompt(monkeypatch):
+    monkeypatch.setattr(curator, "CARD_CURATION_PROMPT", "INPUTS {inputs}\nSAMPLE {CARD_JSON_SAMPLE}")
+
+
+class FakeLLM:
+    """Answers each card prompt with the sample it asked for, after a short delay"""
+
+    def __init__(self, fail=()):
+        self.fail = fail
+        self.calls = []
+        self.in_flight = self.peak = 0
+
+    async def chat(self, **kwargs):
+        prompt = kwargs["messages"][-1]["content"]
+        sample = json.loads(prompt.split("\nSAMPLE ", 1)[1])
+        cards = list(sample)
+        self.calls.append((cards, kwargs["max_tokens"], prompt))
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if any(card in self.fail for card in cards):
+            content = "Sorry, I cannot help with that."
+        else:
+            content = json.dumps(sample)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def test_card_groups_run_concurrently_and_a_failed_group_is_dropped(monkeypatch):
+    llm = FakeLLM(fail=("card_6_social_discourse",))
+    monkeypatch.setattr(curator, "get_llm", lambda: llm)
+    sent = []
+
+    async def on_card(key, value):
+        sent.append(key)
+
+    cards = asyncio.run(curator._generate_parallel(Ctx(), ANALYSIS, {}, "Unknown", None, on_card))
+    assert llm.peak == len(curator.CARD_GROUPS)
+    assert sorted(cards) == sorted(sent) == sorted(key for key in LLM_SECTIONS if key != "card_6_social_discourse")
+    assert cards["card_2_art_visuals"] == CARD_SAMPLES["card_2_art_visuals"]
+    # Each group only sees the inputs it needs
+    social = next(prompt for cards, _, prompt in llm.calls if cards == ["card_6_social_discourse"])
+    assert "Blue light" not in social
+
+
+def test_only_the_requested_sections_are_generated(monkeypatch):
+    llm = FakeLLM()
+    monkeypatch.setattr(curator, "get_llm", lambda: llm)
+    cards = asyncio.run(curator._generate_parallel(Ctx(), ANALYSIS, {}, "Unknown", None, None,
+                                                   sections=("card_2_art_visuals", "card_3_transfer_history")))
+    assert sorted(cards) == ["card_2_art_visuals", "card_3_transfer_history"]
+    assert len(llm.calls) == 2
+
+
+def test_missing_parts_lists_only_what_a_card_lacks():
+    sample = CARD_SAMPLES["card_2_art_visuals"]
+    card = json.loads(json.dumps(sample))
+    assert missing_parts(card, sample) is None
+    del card["extended"]["visual_elements"]["technique"]
+    card["preview"]["summary"] = {"not": "a string"}
+    assert missing_parts(card, sample) == {
+        "preview": {"summary": sample["preview"]["summary"]},
+        "extended": {"visual_elements": {"technique": sample["extended"]["visual_elements"]["technique"]}},
+    }
+    assert missing_parts(None, sample) == sample
+
+
+def test_repair_regenerates_only_missing_cards_and_fields(monkeypatch):
+    llm = FakeLLM()
+    monkeypatch.setattr(curator, "get_llm", lambda: llm)
+    curation = {key: json.loads(json.dumps(CARD_SAMPLES[key])) for key in LLM_SECTIONS}
+    del curation["card_6_social_discourse"]
+    curation["card_2_art_visuals"]["preview"]["name"] = "Kept"
+    del curation["card_2_art_visuals"]["extended"]["interesting_detail"]
+
+    repaired = asyncio.run(curator._repair_cards(Ctx(), curation, ANALYSIS, {}, "Unknown"))
+    assert sorted(repaired) == ["card_2_art_visuals", "card_6_social_discourse"]
+    # One follow-up request, asking for the whole missing card but only the missing field of the other
+    [(cards, max_tokens, prompt)] = llm.calls
+    requested = json.loads(prompt.split("\nSAMPLE ", 1)[1])
+    assert requested["card_2_art_visuals"] == {"extended": {"interesting_detail": CARD_SAMPLES["card_2_art_visuals"]["extended"]["interesting_detail"]}}
+    assert requested["card_6_social_discourse"] == CARD_SAMPLES["card_6_social_discourse"]
+    assert max_tokens == 4000 + 500
+    # The patch is merged into the fields the first pass got right
+    assert repaired["card_2_art_visuals"]["preview"]["name"] == "Kept"
+    assert missing_parts(repaired["card_2_art_visuals"], CARD_SAMPLES["card_2_art_visuals"]) is None
+
+
+def test_nothing_to_repair_makes_no_request(monkeypatch):
+    llm = FakeLLM()
+    monkeypatch.setattr(curator, "get_llm", lambda: llm)
+    curation = {key: CARD_SAMPLES[key] for key in LLM_SECTIONS}
+    assert asyncio.run(curator._repair_cards(Ctx(), curation, ANALYSIS, {}, "Unknown")) == {}
+    assert llm.calls == []
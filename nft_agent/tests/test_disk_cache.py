@@ -0,0 +1,106 @@
+import os
+import time
+import asyncio
+import pytest
+from disk_cache import DiskCache, stable_hash
+
+
+def make(tmp_path, **kwargs) -> DiskCache:
+    return DiskCache("test", **dict({"ttl": 60, "directory": str(tmp_path)}, **kwargs))
+
+
+def test_stable_hash_ignores_key_order():
+    assert stable_hash({"a": 1, "b": [1, 2]}) == stable_hash({"b": [1, 2], "a": 1})
+    assert stable_hash({"a": 1}) != stable_hash({"a": 2})
+
+
+def test_round_trip_and_hit_rate(tmp_path):
+    cache = make(tmp_path)
+    assert cache.get("k") is None
+    cache.set("k", {"value": [1, "two"]})
+    assert cache.get("k") == {"value": [1, "two"]}
+    assert cache.hit_rate == 0.5
+
+
+def test_expired_entries_miss_unless_stale_is_allowed(tmp_path):
+    cache = make(tmp_path)
+    cache.set("k", "v", ttl=-1, meta={"etag": "abc"})
+    entry = cache.get_entry("k", allow_stale=True)
+    assert entry["stale"] and entry["meta"] == {"etag": "abc"}
+    assert cache.get("k") is None
+    # A plain miss removed the expired file
+    assert cache.get_entry("k", allow_stale=True) is None
+
+
+def test_touch_extends_a_stale_entry(tmp_path):
+    cache = make(tmp_path)
+    cache.set("k", "v", ttl=-1, meta={"etag": "abc"})
+    assert cache.touch("k", meta={"checked": True})
+    entry = cache.get_entry("k")
+    assert (entry["value"], entry["stale"], entry["meta"]) == ("v", False, {"etag": "abc", "checked": True})
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = make(tmp_path, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+    assert len(cache) == 2
+
+
+def test_byte_limit_evicts_oldest(tmp_path):
+    cache = make(tmp_path, max_bytes=1000)
+    for i in range(5):
+        cache.set(f"k{i}", "x" * 300)
+    assert cache.get("k4") == "x" * 300
+    assert cache.get("k0") is None
+    assert sum(os.path.getsize(os.path.join(cache.directory, f)) for f in os.listdir(cache.directory)) <= 1000
+
+
+def test_lru_order_survives_a_restart(tmp_path):
+    cache = make(tmp_path, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    time.sleep(0.01)
+    cache.get("a")
+    reopened = make(tmp_path, max_entries=2)
+    reopened.set("c", 3)
+    assert (reopened.get("a"), reopened.get("b")) == (1, None)
+
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    cache = make(tmp_path)
+    cache.set("k", "v")
+    with open(os.path.join(cache.directory, DiskCache._filename("k")), "w") as f:
+        f.write("{not json")
+    assert cache.get("k") is None
+    assert len(cache) == 0
+
+
+def test_async_methods_round_trip_and_evict(tmp_path):
+    cache = make(tmp_path, max_entries=2)
+
+    async def run():
+        await cache.aset("a", 1, meta={"etag": "x"})
+        await cache.aset("b", 2)
+        assert await cache.aget("a") == 1
+        assert await cache.atouch("a", meta={"checked": True})
+        await cache.aset("c", 3)
+        return await cache.aget_entry("a"), await cache.aget("b")
+
+    entry, evicted = asyncio.run(run())
+    assert (entry["value"], entry["meta"]) == (1, {"etag": "x", "checked": True})
+    assert evicted is None
+    assert sorted(os.listdir(cache.directory)) == sorted(DiskCache._filename(k) for k in ("a", "c"))
+
+
+def test_misses_and_known_expiry_are_answered_from_the_index(tmp_path, monkeypatch):
+    cache = make(tmp_path)
+    cache.set("k", "v", ttl=-1)
+    monkeypatch.setattr(cache, "_read", lambda filename: pytest.fail("read from disk"))
+    assert cache.get("absent") is None
+    assert cache.get("k") is None
+    assert asyncio.run(cache.aget("k")) is None
+    assert os.listdir(cache.directory) == []
@@ -0,0 +1,69 @@
+import asyncio
+import httpx
+import pytest
+from gateways import GatewayResolver, parse_content_uri
+
+CID = "bafybeigdyrzt5sfp7udm7hu76uh7y26nf3efuylqabf3oclgtqy55fbzdi"
+TX = "a" * 43
+
+SLOW = "http://slow.example/ipfs/"
+FAST = "http://fast.example/ipfs/"
+BROKEN = "http://broken.example/ipfs/"
+
+
+def test_parse_content_uri_spellings():
+    assert parse_content_uri(f"ipfs://{CID}/1.png") == ("ipfs", f"{CID}/1.png")
+    assert parse_content_uri(f"ipfs://ipfs/{CID}") == ("ipfs", CID)
+    assert parse_content_uri(f"https://ipfs.io/ipfs/{CID}/1.png") == ("ipfs", f"{CID}/1.png")
+    assert parse_content_uri(f"https://{CID}.ipfs.dweb.link/1.png") == ("ipfs", f"{CID}/1.png")
+    assert parse_content_uri(f"https://arweave.net/{TX}") == ("ar", TX)
+    assert parse_content_uri(f"ar://{TX}") == ("ar", TX)
+    assert parse_content_uri("https://example.com/1.png") is None
+
+
+def resolver_for(gateways, race_width=3) -> GatewayResolver:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        if host == "broken.example":
+            return httpx.Response(503)
+        await asyncio.sleep(0.3 if host == "slow.example" else 0.01)
+        return httpx.Response(200, content=host.encode())
+
+    resolver = GatewayResolver(ipfs_gateways=gateways, arweave_gateways=[], race_width=race_width)
+    resolver._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return resolver
+
+
+async def fetch(resolver: GatewayResolver, url: str) -> str:
+    async with resolver.open(url) as response:
+        return (await response.aread()).decode()
+
+
+def test_fastest_gateway_wins_and_failures_are_ranked_last():
+    resolver = resolver_for([SLOW, BROKEN, FAST])
+
+    async def run():
+        return await fetch(resolver, f"ipfs://{CID}")
+
+    assert asyncio.run(run()) == "fast.example"
+    # The loser is scored as at least as slow as the winner, the failure drops to the end
+    assert resolver.stats[FAST].successes == 1
+    assert resolver.stats[SLOW].latency >= resolver.stats[FAST].latency
+    assert resolver.stats[BROKEN].failures == 1
+    assert resolver.ranked("ipfs")[-1] == BROKEN
+
+
+def test_a_failure_lets_the_next_gateway_into_the_race():
+    resolver = resolver_for([BROKEN, FAST], race_width=1)
+    assert asyncio.run(fetch(resolver, f"ipfs://{CID}")) == "fast.example"
+
+
+def test_all_gateways_failing_raises():
+    resolver = resolver_for([BROKEN])
+    with pytest.raises(httpx.HTTPError, match="All gateways failed"):
+        asyncio.run(fetch(resolver, f"ipfs://{CID}"))
+
+
+def test_ordinary_urls_are_fetched_directly():
+    resolver = resolver_for([BROKEN])
+    assert asyncio.run(fetch(resolver, "http://fast.example/1.png")) == "fast.example"
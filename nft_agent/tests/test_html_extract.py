@@ -0,0 +1,51 @@
+from html_extract import HtmlExtractor, html_to_text
+
+PAGE = """<html><head><title> Artist &amp; Studio </title>
+<meta property="og:description" content="Light studies">
+<meta name="viewport" content="width=device-width">
+<script>var tracking = 1;</script><style>p { color: red }</style></head>
+<body><nav><a href="/about">About</a></nav><p>Biography outside main</p>
+<main><h1>Statement</h1><p>{body}</p>
+<a href="https://x.com/artist">X</a> <a href="/local">Local</a> <a href="mailto:a@b.c">Mail</a></main>
+<footer>Copyright</footer></body></html>"""
+
+
+def extract(html: str, **kwargs) -> dict:
+    extractor = HtmlExtractor("https://artist.example/", **kwargs)
+    extractor.feed(html)
+    extractor.close()
+    return extractor.result()
+
+
+def test_main_text_title_meta_and_outbound_links():
+    result = extract(PAGE.replace("{body}", "Works about light and time. " * 10))
+    assert result["title"] == "Artist & Studio"
+    assert result["meta"] == {"og:description": "Light studies"}
+    assert result["links"] == ["https://x.com/artist"]
+    assert result["text"].startswith("Statement\nWorks about light")
+    for chrome in ("tracking", "color", "About", "Copyright", "Biography"):
+        assert chrome not in result["text"]
+    assert not result["truncated"]
+
+
+def test_short_main_falls_back_to_the_whole_page():
+    result = extract(PAGE.replace("{body}", "Short."))
+    assert result["text"].startswith("Biography outside main\nStatement\nShort.")
+    assert "Copyright" not in result["text"]
+
+
+def test_a_long_page_stops_the_stream_at_the_budget():
+    extractor = HtmlExtractor("https://artist.example/", max_chars=100)
+    chunks = 0
+    while not extractor.done and chunks < 100:
+        extractor.feed("<p>" + "word " * 20 + "</p>")
+        chunks += 1
+    result = extractor.result()
+    assert chunks < 10
+    assert len(result["text"]) == 100 and result["truncated"]
+
+
+def test_html_to_text_passes_plain_text_through():
+    assert html_to_text("  plain statement  ") == "plain statement"
+    assert html_to_text("<p>one</p><p>two</p>") == "one\ntwo"
+    assert html_to_text("plain statement", max_chars=5) == "plain"
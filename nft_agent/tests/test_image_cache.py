@@ -0,0 +1,22 @@
+import image_cache
+from image_cache import process_image
+from benchmarks.stub_servers import tiny_png
+
+GIF = b"GIF89a" + b"\x00" * 64
+
+
+def test_without_pillow_small_stills_pass_through(monkeypatch):
+    monkeypatch.setattr(image_cache, "Image", None)
+    image = process_image(tiny_png(), None)
+    assert image["data_url"].startswith("data:image/png;base64,")
+
+
+def test_without_pillow_gifs_and_large_stills_fall_back_to_the_url(monkeypatch):
+    monkeypatch.setattr(image_cache, "Image", None)
+    monkeypatch.setattr(image_cache, "IMAGE_PASSTHROUGH_BYTES", 100)
+    assert process_image(GIF, "image/gif") is None
+    assert process_image(tiny_png(), None) is None
+
+
+def test_unsupported_formats_are_not_inlined():
+    assert process_image(b"<svg xmlns='http://www.w3.org/2000/svg'/>", "image/svg+xml") is None
@@ -0,0 +1,40 @@
+import json
+from image_extract import extract_image_url, extract_image_urls, find_image_candidates, split_batch
+
+CID = "bafybeigdyrzt5sfp7udm7hu76uh7y26nf3efuylqabf3oclgtqy55fbzdi"
+
+
+def test_originals_on_permanent_storage_beat_cdn_copies():
+    nft = {
+        "display_image_url": "https://i.seadn.io/abc.png",
+        "image_url": f"ipfs://{CID}/1.png",
+        "thumbnail_url": "https://example.com/thumb.png",
+        "animation_url": "https://example.com/anim.mp4",
+    }
+    candidates = find_image_candidates(nft)
+    assert [c.url for c in candidates] == [
+        f"ipfs://{CID}/1.png", "https://i.seadn.io/abc.png", "https://example.com/thumb.png",
+    ]
+    assert extract_image_url(json.dumps(nft)) == f"ipfs://{CID}/1.png"
+
+
+def test_nested_media_objects_inherit_the_image_key():
+    nft = {"metadata": {"image": {"gateway": "https://example.com/a.png"}}, "traits": {"image": "https://x/skip.png"}}
+    assert [c.key for c in find_image_candidates(nft)] == ["image"]
+    assert extract_image_url(nft) == "https://example.com/a.png"
+
+
+def test_batch_dumps_yield_one_url_per_nft_in_order():
+    dump = {"nfts": [{"image_url": "https://example.com/1.png"}, {"name": "no image"},
+                     {"image_url": "https://example.com/3.png"}], "next": "cursor"}
+    assert len(split_batch(dump)) == 3
+    assert split_batch({"name": "single"}) == [{"name": "single"}]
+    assert extract_image_urls(json.dumps(dump)) == ["https://example.com/1.png", None, "https://example.com/3.png"]
+    assert extract_image_url(dump) == "https://example.com/1.png"
+
+
+def test_free_text_prefers_content_uris_then_the_first_url():
+    text = "see https://example.com/a.png and https://example.com/b.png"
+    assert extract_image_url(text) == "https://example.com/a.png"
+    assert extract_image_url(text + f" or ipfs://{CID}.") == f"ipfs://{CID}"
+    assert extract_image_url("no urls here") is None
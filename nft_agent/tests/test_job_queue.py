@@ -0,0 +1,77 @@
+import asyncio
+from job_queue import JobQueue, worker_released, DONE, CANCELLED, PRIORITY_BATCH, PRIORITY_INTERACTIVE
+
+
+def test_jobs_run_by_priority_then_submission_order():
+    order = []
+
+    async def run():
+        queue = JobQueue(workers=1)
+        blocker = asyncio.Event()
+
+        async def step(name):
+            order.append(name)
+            if name == "first":
+                await blocker.wait()
+
+        queue.submit("analysis", lambda: step("first"), "alice")
+        await asyncio.sleep(0)
+        queue.submit("analysis", lambda: step("backfill"), "bob", priority=PRIORITY_BATCH)
+        queue.submit("analysis", lambda: step("interactive"), "carol", priority=PRIORITY_INTERACTIVE)
+        blocker.set()
+        await queue.join()
+        await queue.stop()
+
+    asyncio.run(run())
+    assert order == ["first", "interactive", "backfill"]
+
+
+def test_waiting_job_releases_its_slot():
+    async def run():
+        queue = JobQueue(workers=1)
+        other_done = asyncio.Event()
+
+        async def waiter():
+            async with worker_released():
+                await asyncio.wait_for(other_done.wait(), 1)
+
+        async def other():
+            other_done.set()
+
+        waiting = queue.submit("awaken", waiter, "alice")
+        second = queue.submit("awaken", other, "bob")
+        await asyncio.wait_for(queue.join(), 2)
+        await queue.stop()
+        return waiting, second
+
+    waiting, second = asyncio.run(run())
+    assert (waiting["state"], second["state"]) == (DONE, DONE)
+
+
+def test_stop_cancels_running_and_queued_jobs():
+    async def run():
+        queue = JobQueue(workers=1)
+        running = queue.submit("curate", lambda: asyncio.sleep(10), "alice")
+        queued = queue.submit("curate", lambda: asyncio.sleep(10), "bob")
+        await asyncio.sleep(0.01)
+        await queue.stop()
+        return running, queued
+
+    running, queued = asyncio.run(run())
+    assert (running["state"], queued["state"]) == (CANCELLED, CANCELLED)
+
+
+def test_worker_released_outside_the_queue_is_a_no_op():
+    async def run():
+        async with worker_released():
+            return "ok"
+
+    assert asyncio.run(run()) == "ok"
+
+
+
+def test_default_workers_do_not_cap_llm_concurrency():
+    import os
+    import job_queue
+    from llm import LLM_MAX_CONCURRENCY
+    assert "JOB_WORKERS" in os.environ or job_queue.JOB_WORKERS >= LLM_MAX_CONCURRENCY
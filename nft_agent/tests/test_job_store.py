@@ -0,0 +1,136 @@
+import json
+import time
+import pytest
+from disk_cache import DiskCache
+from job_store import (
+    JobStore, InvalidTransition, JobRunning, ANALYZING, ANALYZED, SEARCHING, SEARCHED, CURATING, CURATED, FAILED,
+)
+
+
+class MemoryStorage:
+    """The subset of the uagents key-value storage the store uses"""
+
+    def __init__(self):
+        self.data = {}
+        self.writes = []
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value):
+        self.data[key] = value
+        self.writes.append(key)
+
+    def has(self, key):
+        return key in self.data
+
+    def remove(self, key):
+        del self.data[key]
+
+
+@pytest.fixture
+def jobs(tmp_path):
+    return JobStore(MemoryStorage(), payloads=DiskCache("jobs", ttl=3600, directory=str(tmp_path)))
+
+
+def test_pipeline_transitions(jobs):
+    job = jobs.create("alice", "1_0xabc_1", "{}")
+    for state in (ANALYZED, SEARCHING, SEARCHED, CURATING, CURATED, SEARCHING):
+        job = jobs.transition(job, state)
+    assert jobs.get("alice")["state"] == SEARCHING
+
+
+def test_running_step_cannot_be_entered_again(jobs):
+    job = jobs.transition(jobs.create("alice", "1_0xabc_1", "{}"), ANALYZED)
+    job = jobs.transition(job, SEARCHING)
+    with pytest.raises(InvalidTransition):
+        jobs.transition(job, CURATING)
+
+
+def test_jobs_are_per_sender_and_artwork(jobs):
+    jobs.create("alice", "1_0xabc_1", "a")
+    jobs.create("alice", "1_0xabc_2", "b")
+    jobs.create("bob", "1_0xabc_1", "c")
+    assert jobs.active_artwork("alice") == "1_0xabc_2"
+    assert jobs.get("alice", "1_0xabc_1")["data_dump"] == "a"
+    assert jobs.get("bob")["data_dump"] == "c"
+    assert {job["artwork_id"] for job in jobs.list("alice")} == {"1_0xabc_1", "1_0xabc_2"}
+
+
+def test_create_refuses_to_replace_a_running_job(jobs):
+    jobs.create("alice", "1_0xabc_1", "a")
+    with pytest.raises(JobRunning):
+        jobs.create("alice", "1_0xabc_1", "b")
+    jobs.transition(jobs.get("alice"), ANALYZED)
+    assert jobs.create("alice", "1_0xabc_1", "b")["data_dump"] == "b"
+
+
+def test_interrupt_fails_running_jobs_only(jobs):
+    job = jobs.interrupt(jobs.create("alice", "1_0xabc_1", "{}"), "Cancelled")
+    assert (job["state"], job["error"]) == (FAILED, "Cancelled")
+    job = jobs.transition(jobs.transition(job, SEARCHING), SEARCHED)
+    assert jobs.interrupt(job, "Cancelled")["state"] == SEARCHED
+
+
+def test_recover_interrupted_on_startup(jobs):
+    jobs.create("alice", "1_0xabc_1", "{}")
+    jobs.transition(jobs.create("bob", "1_0xabc_1", "{}"), ANALYZED)
+    restarted = JobStore(jobs.storage, payloads=jobs.payloads)
+    assert restarted.recover_interrupted() == 1
+    assert restarted.get("alice")["state"] == FAILED
+    assert restarted.get("bob")["state"] == ANALYZED
+    # The step can be run again
+    restarted.transition(restarted.get("alice"), ANALYZING)
+
+
+def test_stale_running_job_is_failed_on_read(jobs):
+    jobs.create("alice", "1_0xabc_1", "{}")
+    jobs.stale_after = 0
+    time.sleep(0.01)
+    assert jobs.get("alice")["state"] == FAILED
+
+
+def test_expired_jobs_are_evicted(jobs):
+    jobs.create("alice", "1_0xabc_1", "{}")
+    jobs.ttl = -1
+    assert jobs.evict_expired() == 1
+    assert jobs.get("alice", "1_0xabc_1") is None
+
+
+def test_rename_rekeys_the_job(jobs):
+    job = jobs.transition(jobs.create("alice", "dump_1234", "{}"), ANALYZED)
+    jobs.rename(job, "1_0xabc_1")
+    assert jobs.get("alice", "dump_1234") is None
+    assert jobs.get("alice")["artwork_id"] == "1_0xabc_1"
+
+
+def test_payloads_stay_out_of_the_agent_storage(jobs):
+    job = jobs.create("alice", "1_0xabc_1", "dump")
+    jobs.storage.writes.clear()
+    job = jobs.transition(job, ANALYZED, analysis={"key_themes": ["light"] * 100})
+    job = jobs.transition(jobs.transition(job, SEARCHING), SEARCHED, search_results={"google_searches": []})
+    # Only the job record is rewritten; the index and active artwork are unchanged
+    assert set(jobs.storage.writes) == {"job:alice:1_0xabc_1"}
+    assert "light" not in json.dumps(jobs.storage.data)
+    job = jobs.get("alice")
+    assert (job["data_dump"], job["analysis"]["key_themes"][0], job["curation"]) == ("dump", "light", None)
+
+
+def test_a_rerun_drops_the_previous_payloads(jobs):
+    job = jobs.transition(jobs.create("alice", "1_0xabc_1", "a"), ANALYZED, analysis={"old": True})
+    jobs.create("alice", "1_0xabc_1", "b")
+    assert jobs.get("alice")["analysis"] is None
+    assert len(jobs.payloads) == 1
+
+
+def test_records_with_inline_payloads_are_migrated(jobs):
+    jobs.storage.data["job:alice:1_0xabc_1"] = json.dumps({
+        "sender": "alice", "artwork_id": "1_0xabc_1", "state": ANALYZING, "created_at": 0,
+        "updated_at": time.time(), "data_dump": "dump", "analysis": None, "search_results": None,
+        "curation": None, "error": None,
+    })
+    jobs.storage.data["jobs:index"] = json.dumps({"job:alice:1_0xabc_1": time.time()})
+    assert jobs.recover_interrupted() == 1
+    job = jobs.get("alice", "1_0xabc_1")
+    assert (job["state"], job["data_dump"]) == (FAILED, "dump")
+    assert "dump" not in jobs.storage.data["job:alice:1_0xabc_1"]
@@ -0,0 +1,92 @@
+import asyncio
+import httpx
+import openai
+from types import SimpleNamespace
+from llm import LLMClient
+
+
+def chunk(text=None, finish_reason=None, usage=None):
+    choices = [] if usage else [SimpleNamespace(delta=SimpleNamespace(content=text), finish_reason=finish_reason)]
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+class FakeStream:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for item in self.chunks:
+            yield item
+
+    async def close(self):
+        self.closed = True
+
+
+def client_with(create, max_concurrency: int = 2) -> LLMClient:
+    client = LLMClient("test-key", base_url="http://llm.invalid/v1", max_concurrency=max_concurrency)
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    return client
+
+
+def test_chat_caps_in_flight_completions():
+    in_flight = peak = 0
+
+    async def create(**kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return SimpleNamespace(usage=None, text=kwargs["messages"])
+
+    client = client_with(create, max_concurrency=2)
+
+    async def run():
+        return await asyncio.gather(*(client.chat(model="llm-test-cap", messages=i) for i in range(6)))
+
+    assert [response.text for response in asyncio.run(run())] == list(range(6))
+    assert peak == 2
+
+
+def test_stream_chat_yields_deltas_and_releases_its_slot():
+    stream = FakeStream([chunk("Hel"), chunk("lo"), chunk(finish_reason="stop"),
+                         chunk(usage=SimpleNamespace(prompt_tokens=3, completion_tokens=2))])
+    seen = {}
+
+    async def create(**kwargs):
+        seen.update(kwargs)
+        return stream
+
+    client = client_with(create, max_concurrency=1)
+
+    async def run():
+        return [delta async for delta in client.stream_chat(model="llm-test-stream", messages=[])]
+
+    assert asyncio.run(run()) == [("Hel", None), ("lo", None), ("", "stop")]
+    assert seen["stream"] and seen["stream_options"] == {"include_usage": True}
+    assert stream.closed and not client._slots.locked()
+
+
+def test_stream_usage_is_dropped_when_the_endpoint_rejects_it():
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        if "stream_options" in kwargs:
+            response = httpx.Response(400, request=httpx.Request("POST", "http://llm.invalid/v1/chat/completions"))
+            raise openai.BadRequestError("Unrecognized field stream_options", response=response, body=None)
+        return FakeStream([chunk("ok", "stop")])
+
+    client = client_with(create)
+
+    async def run():
+        first = [delta async for delta in client.stream_chat(model="llm-test-usage", messages=[])]
+        second = [delta async for delta in client.stream_chat(model="llm-test-usage", messages=[])]
+        return first, second
+
+    assert asyncio.run(run()) == ([("ok", "stop")], [("ok", "stop")])
+    assert ["stream_options" in call for call in calls] == [True, False, False]
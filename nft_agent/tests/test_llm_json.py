@@ -0,0 +1,89 @@
+import json
+from llm_json import IncrementalObjectParser, ParseResult, parse_llm_json, repair_json, shape_problems
+
+DOCUMENT = {
+    "card_2_artwork": {"title": "Dawn, {braces} and \"quotes\"", "tags": ["light", "sea"]},
+    "card_3_context": {"notes": "a, b, c"},
+    "card_4_about_artist": {"bio": "back\\slash"},
+}
+
+
+def feed_in_chunks(text: str, size: int):
+    parser = IncrementalObjectParser()
+    completed = []
+    for start in range(0, len(text), size):
+        completed += parser.feed(text[start:start + size])
+    return parser, completed
+
+
+def test_members_are_emitted_as_they_close_whatever_the_chunking():
+    text = "```json\n" + json.dumps(DOCUMENT, indent=2) + "\n```"
+    for size in (1, 3, 7, 64, len(text)):
+        parser, completed = feed_in_chunks(text, size)
+        assert completed == list(DOCUMENT.items()), size
+        assert parser.closed
+
+
+def test_member_is_emitted_before_the_object_ends():
+    parser = IncrementalObjectParser()
+    assert parser.feed('{"card_2_artwork": {"title": "A"}') == []
+    assert parser.feed(', "card_3') == [("card_2_artwork", {"title": "A"})]
+
+
+def test_truncated_stream_keeps_completed_members():
+    text = json.dumps(DOCUMENT)
+    parser, completed = feed_in_chunks(text[: text.index('"card_4_about_artist"') + 30], 16)
+    assert [key for key, _ in completed] == ["card_2_artwork", "card_3_context"]
+    assert not parser.closed
+    assert set(parser.members) == {"card_2_artwork", "card_3_context"}
+
+
+def test_text_after_the_object_is_ignored():
+    parser = IncrementalObjectParser()
+    assert parser.feed('{"a": 1} {"b": 2}') == [("a", 1)]
+    assert parser.feed('{"c": 3}') == []
+
+
+def test_well_formed_output_is_not_repaired():
+    result = parse_llm_json('Here you go:\n```json\n{"a": {"b": [1, 2]}}\n```')
+    assert result == ParseResult({"a": {"b": [1, 2]}})
+
+
+def test_trailing_commas_and_stray_braces_are_repaired():
+    result = parse_llm_json('Sure {see below}: {"a": [1, 2,], "b": {"c": "x",},}')
+    assert result.value == {"a": [1, 2], "b": {"c": "x"}}
+    assert result.repaired and not result.truncated
+
+
+def test_cut_off_output_keeps_complete_members():
+    result = parse_llm_json('{"card_2": {"title": "Dawn"}, "card_3": {"notes": "unfinished sent')
+    assert result.truncated
+    assert result.value["card_2"] == {"title": "Dawn"}
+    assert result.incomplete_key == "card_3"
+
+
+def test_cut_off_inside_a_key_or_literal_drops_the_partial_token():
+    assert parse_llm_json('{"a": 1, "b": tr').value == {"a": 1}
+    assert parse_llm_json('{"a": 1, "unfinished_ke').value == {"a": 1}
+    assert parse_llm_json('{"a": "caf\\u00').value == {"a": "caf"}
+
+
+def test_text_without_an_object():
+    assert parse_llm_json("I cannot help with that.").value is None
+    assert parse_llm_json("").value is None
+
+
+def test_repair_json_returns_valid_json():
+    text, truncated, key = repair_json('{"a": [1, {"b": 2')
+    assert json.loads(text) == {"a": [1, {"b": 2}]}
+    assert truncated and key == "a"
+
+
+def test_shape_problems_against_a_sample():
+    sample = {"card": {"title": "...", "tags": ["..."], "links": [{"url": "..."}]}}
+    assert shape_problems({"card": {"title": None, "tags": [], "links": [{"url": "x"}]}}, sample) == []
+    assert shape_problems({"card": {"title": {}, "tags": "x", "links": [{}]}}, sample) == [
+        "card.title: expected a value, got dict",
+        "card.tags: expected a list, got str",
+        "card.links[0].url: missing",
+    ]
@@ -0,0 +1,31 @@
+import os
+import json
+import time
+import asyncio
+import tempfile
+from loop_monitor import LoopMonitor, LOOP_REPORT_FILE
+
+
+def test_default_report_goes_to_the_temp_dir():
+    assert "LOOP_REPORT_FILE" in os.environ or os.path.dirname(LOOP_REPORT_FILE) == tempfile.gettempdir()
+
+
+def test_blocking_callback_is_reported(tmp_path):
+    async def run():
+        monitor = LoopMonitor(threshold=0.05)
+        monitor.start()
+        try:
+            await asyncio.sleep(0)
+            time.sleep(0.12)  # blocks the loop
+            await asyncio.sleep(0)
+        finally:
+            monitor.stop()
+        return monitor
+
+    monitor = asyncio.run(run())
+    path = tmp_path / "report.json"
+    monitor.write_report(str(path), "")
+    report = json.loads(path.read_text())
+    assert report["stalls"] == 1
+    assert report["recent_stalls"][0]["callback"].endswith("run")
+    assert "test_loop_monitor.py" in report["recent_stalls"][0]["site"]
@@ -0,0 +1,64 @@
+import json
+import asyncio
+import pytest
+import metrics
+from metrics import Registry, job_trace, timed, record_tokens, record_cache, recent_traces
+
+
+def test_counters_and_histograms_render_the_prometheus_text_format():
+    registry = Registry()
+    requests = registry.counter("demo_requests_total", "Requests", ("endpoint",))
+    latency = registry.histogram("demo_seconds", "Latency", ("endpoint",), buckets=(0.1, 1))
+    requests.inc(endpoint='a"b')
+    requests.inc(2, endpoint='a"b')
+    for seconds in (0.05, 0.5, 5):
+        latency.observe(seconds, endpoint="x")
+    assert registry.counter("demo_requests_total", "Requests again") is requests
+    assert registry.render().splitlines() == [
+        "# HELP demo_requests_total Requests",
+        "# TYPE demo_requests_total counter",
+        'demo_requests_total{endpoint="a\\"b"} 3',
+        "# HELP demo_seconds Latency",
+        "# TYPE demo_seconds histogram",
+        'demo_seconds_bucket{endpoint="x",le="0.1"} 1',
+        'demo_seconds_bucket{endpoint="x",le="1"} 2',
+        'demo_seconds_bucket{endpoint="x",le="+Inf"} 3',
+        'demo_seconds_sum{endpoint="x"} 5.55',
+        'demo_seconds_count{endpoint="x"} 3',
+    ]
+
+
+def test_a_job_trace_collects_stages_tokens_and_cache_events_across_tasks(tmp_path, monkeypatch):
+    trace_file = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(metrics, "TRACE_FILE", str(trace_file))
+
+    async def stage():
+        with timed("analysis"):
+            record_tokens("model-a", {"prompt_tokens": 120, "completion_tokens": 30})
+            record_cache("analyses", "miss")
+
+    async def run():
+        with job_trace("job-1", "awaken", artwork_id="1_0xabc_1") as trace:
+            await asyncio.gather(asyncio.ensure_future(stage()), stage())
+        return trace
+
+    trace = asyncio.run(run())
+    record = recent_traces[-1]
+    assert record["job_id"] == "job-1" and record["artwork_id"] == "1_0xabc_1"
+    assert (record["outcome"], record["tokens"]) == ("ok", {"prompt": 240, "completion": 60})
+    assert [span["name"] for span in record["spans"]] == ["analysis", "analysis"]
+    assert set(record["stages"]) == {"analysis"}
+    assert [event["result"] for event in record["events"]] == ["miss", "miss"]
+    assert json.loads(trace_file.read_text())["job_id"] == "job-1"
+    assert trace.to_dict() == record
+
+
+def test_failed_and_cancelled_jobs_are_labelled():
+    for error, outcome in ((ValueError("boom"), "error"), (asyncio.CancelledError(), "cancelled")):
+        with pytest.raises(type(error)):
+            with job_trace("job-2", "search"):
+                with timed("search"):
+                    raise error
+        assert recent_traces[-1]["outcome"] == outcome
+        assert recent_traces[-1]["spans"][0]["outcome"] == "error"
+    assert metrics.JOBS.values[("search", "cancelled")] >= 1
@@ -0,0 +1,36 @@
+import json
+import re
+from onchain_card import AWAKENING_CONTRACT, art_fields_from_dump, build_onchain_sections
+
+CONTRACT = "0x" + "ab" * 20
+MINTER = "0x" + "cd" * 20
+TX = "0x" + "ef" * 32
+
+
+def test_art_fields_come_from_the_top_level_and_wrappers():
+    dump = json.dumps({"name": "Token", "contract": CONTRACT, "Art_by_pk": {"minter": MINTER, "txHash": TX, "contract": "0x0"}})
+    assert art_fields_from_dump(dump) == {"contract": CONTRACT, "minter": MINTER, "txHash": TX}
+    assert art_fields_from_dump("not json") == {} and art_fields_from_dump("[1, 2]") == {}
+
+
+def test_indexer_fields_win_over_the_analysis():
+    analysis = {"extracted_info": {"chain": "ethereum", "contract": "0x" + "11" * 20, "token_id": "7", "minter": "Unknown"}}
+    art = {"chainId": 8453, "contract": CONTRACT, "tokenId": "42", "minter": MINTER, "blockNumber": 123, "txHash": TX}
+    sections = build_onchain_sections(analysis, "0xawakener", art)
+    preview = sections["card_1_onchain"]["preview"]
+    assert preview == {"minted_by": MINTER, "contract": CONTRACT, "chain_id": 8453, "token_id": "42", "awakened_by": "0xawakener"}
+    extended = sections["card_1_onchain"]["extended"]
+    assert (extended["chain_name"], extended["block_number"]) == ("Base", "123")
+    assert extended["links"]["etherscan_tx"] == f"https://basescan.org/tx/{TX}"
+    assert extended["links"]["etherscan_token"] == f"https://basescan.org/token/{CONTRACT}?a=42"
+    metadata = sections["metadata"]
+    assert (metadata["awakening_contract"], metadata["nft_contract"], metadata["chain_id"]) == (AWAKENING_CONTRACT, CONTRACT, 8453)
+    assert re.fullmatch(r"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\dZ", metadata["generated_at"])
+
+
+def test_placeholders_become_missing_values_and_no_links():
+    analysis = {"extracted_info": {"chain": "Unknown", "contract": "0x... or null", "token_id": "null", "minter": "n/a"}}
+    sections = build_onchain_sections(analysis, awakened_by="")
+    preview = sections["card_1_onchain"]["preview"]
+    assert preview == {"minted_by": None, "contract": None, "chain_id": None, "token_id": None, "awakened_by": "Unknown"}
+    assert set(sections["card_1_onchain"]["extended"]["links"].values()) == {None}
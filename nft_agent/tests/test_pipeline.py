@@ -0,0 +1,28 @@
+import asyncio
+import logging
+import pipeline
+
+
+class Ctx:
+    logger = logging.getLogger("test")
+
+
+def test_malformed_links_section_degrades_to_empty_search(monkeypatch):
+    async def analyze(ctx, data_dump, on_section=None, context=None):
+        return {"categorized_links": ["https://artist.example"], "search_queries": {"artist_name": "A"}}
+
+    async def search_queries(ctx, value):
+        return {"google_searches": [{"query": "A", "success": True, "results": []}]}
+
+    async def generate_curation(ctx, artwork_id, analysis, search_results, awakened_by, **kwargs):
+        return {"card_2_artwork": {}}, False
+
+    monkeypatch.setattr(pipeline, "analyze_nft_data", analyze)
+    monkeypatch.setattr(pipeline, "generate_curation", generate_curation)
+    monkeypatch.setattr(pipeline, "build_onchain_sections", lambda analysis, awakened_by, art: {})
+    monkeypatch.setitem(pipeline.SEARCH_SECTIONS, "search_queries", search_queries)
+
+    result = asyncio.run(pipeline.awaken(Ctx(), '{"name": "Token"}'))
+    assert result["search_results"]["twitter_data"] is None
+    assert result["search_results"]["website_content"] == []
+    assert result["search_results"]["google_searches"][0]["query"] == "A"
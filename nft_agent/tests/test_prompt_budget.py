@@ -0,0 +1,59 @@
+import logging
+import prompt_budget
+from prompt_budget import count_tokens, fit_inputs
+
+
+def test_fallback_estimate_warns_once(monkeypatch, caplog):
+    monkeypatch.setattr(prompt_budget, "tiktoken", None)
+    monkeypatch.setattr(prompt_budget, "_encoding", None)
+    monkeypatch.setattr(prompt_budget, "_estimating", False)
+    with caplog.at_level(logging.WARNING, logger="prompt_budget"):
+        assert count_tokens("x" * 40) == 10
+        assert count_tokens("x" * 41) == 11
+    assert len([r for r in caplog.records if "Estimating prompt tokens" in r.message]) == 1
+
+
+def test_fit_inputs_drops_google_results_first():
+    search_results = {
+        "google_searches": [{"query": "artist", "success": True, "results": [
+            {"title": f"Result {i}", "link": f"https://example.com/{i}", "snippet": "word " * 100} for i in range(5)
+        ]}],
+        "website_content": [{"source": "https://artist.example", "success": True, "content": "statement " * 50}],
+    }
+    analysis = {"extracted_info": {"name": "Token"}, "key_themes": ["light"]}
+    full = fit_inputs(analysis, search_results, budget=100000)
+    fitted = fit_inputs(analysis, search_results, budget=full["tokens"] - 50)
+    assert fitted["tokens"] <= full["tokens"] - 50
+    assert fitted["search_results"]["website_content"] == full["search_results"]["website_content"]
+    assert len(fitted["search_results"]["google_searches"][0]["results"]) < 5
+
+
+def test_fit_inputs_cuts_website_text_in_proportion_to_the_overshoot(monkeypatch):
+    passes = []
+    to_prompt_json = prompt_budget.to_prompt_json
+
+    def counting(value):
+        if isinstance(value, dict) and "website_content" in value:
+            passes.append(value)
+        return to_prompt_json(value)
+
+    monkeypatch.setattr(prompt_budget, "to_prompt_json", counting)
+    search_results = {"website_content": [
+        {"source": f"https://site{i}.example", "success": True, "content": f"statement {i} " * 400} for i in range(4)
+    ]}
+    analysis = {"extracted_info": {"name": "Token"}}
+    full = fit_inputs(analysis, search_results, budget=100000)
+    passes.clear()
+    budget = full["tokens"] // 2
+    fitted = fit_inputs(analysis, search_results, budget=budget)
+    assert budget * 0.8 < fitted["tokens"] <= budget
+    assert len(passes) <= 3
+    assert len(fitted["search_results"]["website_content"]) == 4
+
+
+def test_fit_inputs_warns_when_the_budget_cannot_be_met(caplog):
+    analysis = {"extracted_info": {"name": "Token", "description": "word " * 400}}
+    with caplog.at_level(logging.WARNING, logger="prompt_budget"):
+        fitted = fit_inputs(analysis, None, budget=50)
+    assert fitted["tokens"] > 50
+    assert any("over the 50 budget" in r.message for r in caplog.records)
@@ -0,0 +1,96 @@
+import asyncio
+import httpx
+import pytest
+import resilience
+from resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, call_with_retry, job_deadline
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers(monkeypatch):
+    monkeypatch.setattr(resilience, "_breakers", {})
+    monkeypatch.setattr(resilience, "backoff_delay", lambda attempt, retry_after=None: 0)
+
+
+def open_breaker(breaker: CircuitBreaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+
+def test_breaker_opens_after_threshold_and_probes_once():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "half_open"
+    breaker.allow()
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    breaker.reset_timeout = 0
+    breaker.allow()
+    breaker.record_failure()
+    breaker.reset_timeout = 60
+    assert breaker.state == "open"
+
+
+def test_retries_transient_errors_then_succeeds():
+    calls = []
+
+    async def attempt():
+        calls.append(1)
+        if len(calls) < 3:
+            raise httpx.ConnectError("down")
+        return "ok"
+
+    assert asyncio.run(call_with_retry("retry-ok", attempt, max_attempts=4)) == "ok"
+    assert len(calls) == 3
+    assert resilience.get_breaker("retry-ok").failures == 0
+
+
+def test_non_retryable_error_is_raised_at_once():
+    calls = []
+
+    async def attempt():
+        calls.append(1)
+        raise KeyError("bad input")
+
+    with pytest.raises(KeyError):
+        asyncio.run(call_with_retry("no-retry", attempt, max_attempts=4))
+    assert len(calls) == 1
+
+
+def test_deadline_stops_retries():
+    async def run():
+        with job_deadline(0):
+            await call_with_retry("deadline", lambda: asyncio.sleep(0), max_attempts=2)
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(run())
+
+
+def test_cancelled_probe_releases_half_open_breaker():
+    breaker = resilience.get_breaker("cancelled-probe")
+    breaker.reset_timeout = 0
+    open_breaker(breaker)
+
+    async def run():
+        probe = asyncio.create_task(call_with_retry("cancelled-probe", lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0.01)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        # No verdict: still half-open, and the next caller gets to probe
+        assert breaker.state == "half_open"
+        return await call_with_retry("cancelled-probe", lambda: asyncio.sleep(0, "ok"))
+
+    assert asyncio.run(run()) == "ok"
+    assert breaker.state == "closed"
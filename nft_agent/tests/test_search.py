@@ -0,0 +1,54 @@
+import asyncio
+import httpx
+import search
+from search import NFTSearcher, normalize_url
+
+
+def page(body: str, charset: str = "utf-8") -> httpx.Response:
+    html = f"<html><head><title>Artist</title></head><body><p>{body}</p></body></html>"
+    return httpx.Response(200, content=html.encode(charset), headers={"content-type": f"text/html; charset={charset}"})
+
+
+def test_page_text_is_decoded_with_the_declared_charset():
+    result = asyncio.run(NFTSearcher._extract_page("https://artist.example", page("Café résumé", "latin-1")))
+    assert "Café résumé" in result["content"]
+    assert not result["truncated"]
+
+
+def test_byte_cap_counts_encoded_bytes(monkeypatch):
+    body = "é" * 3000  # 3000 characters, 6000 bytes in UTF-8
+    size = len(page(body).content)
+    monkeypatch.setattr(search, "MAX_WEBSITE_BYTES", size - 1)
+    assert asyncio.run(NFTSearcher._extract_page("https://artist.example", page(body)))["truncated"]
+    monkeypatch.setattr(search, "MAX_WEBSITE_BYTES", size + 1)
+    assert not asyncio.run(NFTSearcher._extract_page("https://artist.example", page(body)))["truncated"]
+
+
+def test_normalize_url_folds_spellings_of_one_profile():
+    assert normalize_url("https://www.Twitter.com/Artist/#top") == normalize_url("https://x.com/Artist")
+
+
+def test_requests_share_one_pool_and_are_bounded_per_host():
+    in_flight = {}
+    peak = {}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        in_flight[host] = in_flight.get(host, 0) + 1
+        peak[host] = max(peak.get(host, 0), in_flight[host])
+        await asyncio.sleep(0.02)
+        in_flight[host] -= 1
+        return httpx.Response(200, json={"ok": True})
+
+    async def run():
+        searcher = NFTSearcher("key", max_per_host=2)
+        searcher._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        urls = [f"http://{host}.example/scrape" for host in ("a", "b") for _ in range(5)]
+        responses = await asyncio.gather(*(searcher._post(url, json={}) for url in urls))
+        await searcher.aclose()
+        return responses
+
+    responses = asyncio.run(run())
+    assert all(response.status_code == 200 for response in responses)
+    # Hosts run side by side, each capped at max_per_host
+    assert peak == {"a.example": 2, "b.example": 2}
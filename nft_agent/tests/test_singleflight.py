@@ -0,0 +1,58 @@
+import asyncio
+import pytest
+from singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flights = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"value": 42}
+
+    async def run():
+        return await asyncio.gather(*(flights.do("key", fetch) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert results == [{"value": 42}] * 5 and len(calls) == 1
+    assert (flights.started, flights.shared, flights.in_flight()) == (1, 4, 0)
+
+
+def test_errors_reach_every_waiter_and_the_key_is_released():
+    flights = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def succeed():
+        return "ok"
+
+    async def run():
+        results = await asyncio.gather(*(flights.do("key", fail) for _ in range(3)), return_exceptions=True)
+        return results, await flights.do("key", succeed)
+
+    results, retried = asyncio.run(run())
+    assert [str(result) for result in results] == ["upstream down"] * 3
+    assert retried == "ok"
+
+
+def test_a_cancelled_waiter_does_not_cancel_the_call():
+    flights = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def run():
+        first = asyncio.ensure_future(flights.do("key", fetch))
+        second = asyncio.ensure_future(flights.do("key", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "done"